@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+almacen_imagenes.py
+Almacén de imágenes direccionado por contenido.
+
+- Cada descarga se guarda una sola vez como objeto, en directorios por hash
+  (objetos/ab/cd/abcd….ext), con la extensión de su formato real detectado por
+  firma (JPEG, PNG, GIF, WebP, TIFF, BMP, AVIF), no por la URL.
+- Las carpetas por consulta pasan a ser vistas livianas: enlaces simbólicos
+  (o duros, o copia si el sistema no los permite) hacia el objeto. El mismo
+  afiche bajado por dos consultas ocupa disco una sola vez.
+- transcodificar() convierte en un pool de procesos los objetos pendientes a un
+  formato canónico (JPEG por defecto) con lado máximo acotado, y re-apunta las
+  vistas. La clave del objeto sigue siendo el MD5 del contenido descargado.
+  El EXIF del original (fecha, cámara…) se copia al objeto transcodificado.
+  Un objeto que no se puede decodificar (truncado, formato roto) queda marcado
+  como fallido (canonico = -1) con sus vistas intactas, y no se reintenta.
+
+Uso:
+  python3 python/almacen_imagenes.py --root poster_dataset/_almacen --transcode
+  python3 python/almacen_imagenes.py --root poster_dataset/_almacen --stats
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+# === CONFIGURACIÓN ===
+NOMBRE_ALMACEN = "_almacen"   # dentro de la carpeta del dataset (renombrar_afiches lo ignora)
+FORMATO_CANONICO = "JPEG"
+LADO_MAX = 2400               # px; los afiches más grandes se reducen
+CALIDAD = 90
+PROCESOS = None               # None = os.cpu_count()
+
+EXT_FORMATO = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp",
+               "TIFF": ".tiff", "BMP": ".bmp", "AVIF": ".avif"}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS objetos (
+    hash              TEXT PRIMARY KEY,
+    formato_original  TEXT,
+    ruta              TEXT NOT NULL,
+    canonico          INTEGER NOT NULL DEFAULT 0,   -- 0 pendiente, 1 canónico, -1 fallido
+    ancho             INTEGER,
+    alto              INTEGER,
+    bytes             INTEGER
+);
+CREATE TABLE IF NOT EXISTS vistas (
+    carpeta  TEXT NOT NULL,
+    nombre   TEXT NOT NULL,
+    hash     TEXT NOT NULL,
+    PRIMARY KEY (carpeta, nombre)
+);
+CREATE INDEX IF NOT EXISTS idx_vistas_hash ON vistas(hash);
+"""
+
+
+# === DETECCIÓN DE FORMATO ===
+def detectar_formato(cabecera):
+    """Formato por firma de los primeros bytes; None si no se reconoce."""
+    if cabecera[:3] == b"\xff\xd8\xff":
+        return "JPEG"
+    if cabecera[:8] == b"\x89PNG\r\n\x1a\n":
+        return "PNG"
+    if cabecera[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return "WEBP"
+    if cabecera[:4] in (b"II*\x00", b"MM\x00*"):
+        return "TIFF"
+    if cabecera[:2] == b"BM":
+        return "BMP"
+    if cabecera[4:8] == b"ftyp" and cabecera[8:12] in (b"avif", b"avis"):
+        return "AVIF"
+    return None
+
+
+def detectar_formato_archivo(ruta):
+    with open(ruta, "rb") as f:
+        return detectar_formato(f.read(32))
+
+
+def enlazar(origen, destino):
+    """Enlace simbólico relativo; si no se puede, enlace duro; si no, copia."""
+    destino = Path(destino)
+    if destino.is_symlink() or destino.exists():
+        destino.unlink()
+    try:
+        destino.symlink_to(os.path.relpath(origen, destino.parent))
+    except (OSError, NotImplementedError):
+        try:
+            os.link(origen, destino)
+        except OSError:
+            shutil.copy2(origen, destino)
+
+
+# === TRANSCODIFICACIÓN (en procesos) ===
+def _transcodificar_uno(args):
+    """Convierte un objeto al formato canónico. Corre en un proceso del pool.
+    Devuelve (hash, destino, ancho, alto, bytes, error); si falla, destino es None y
+    error trae el motivo."""
+    h, ruta, destino, formato, lado_max, calidad = args
+    tmp = destino + ".tmp"
+    try:
+        with Image.open(ruta) as img:
+            img.draft("RGB", (lado_max, lado_max))
+            origen_fmt = img.format
+            img = ImageOps.exif_transpose(img)
+            exif = img.getexif()      # sin Orientation: el giro ya quedó aplicado
+            if origen_fmt == formato and max(img.size) <= lado_max and ruta == destino:
+                return h, destino, img.size[0], img.size[1], os.path.getsize(ruta), None
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                fondo = Image.new("RGB", img.size, (255, 255, 255))
+                fondo.paste(img, mask=img.split()[-1])
+                img = fondo
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+            img.thumbnail((lado_max, lado_max), Image.LANCZOS)
+            extra = {"exif": exif} if len(exif) else {}
+            img.save(tmp, formato, quality=calidad, optimize=True, **extra)
+            w, hh = img.size
+        os.replace(tmp, destino)
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        return h, None, None, None, None, f"{type(e).__name__}: {e}"
+    if ruta != destino:
+        os.unlink(ruta)
+    return h, destino, w, hh, os.path.getsize(destino), None
+
+
+# === ALMACÉN ===
+class AlmacenImagenes:
+    """Objetos por hash + vistas por carpeta, con catálogo SQLite."""
+
+    def __init__(self, raiz, formato=FORMATO_CANONICO, lado_max=LADO_MAX, calidad=CALIDAD):
+        self.raiz = Path(raiz)
+        (self.raiz / "objetos").mkdir(parents=True, exist_ok=True)
+        self.formato = formato
+        self.lado_max = lado_max
+        self.calidad = calidad
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(str(self.raiz / "almacen.sqlite3"), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.executescript(ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def ruta_objeto(self, h, ext):
+        return self.raiz / "objetos" / h[:2] / h[2:4] / f"{h}{ext}"
+
+    def objeto(self, h):
+        with self._lock:
+            fila = self._con.execute("SELECT ruta FROM objetos WHERE hash = ?", (h,)).fetchone()
+        return Path(fila[0]) if fila else None
+
+    def ingresar(self, archivo, h):
+        """Mueve un archivo al almacén (o lo descarta si el objeto ya existe)."""
+        existente = self.objeto(h)
+        if existente is not None and existente.exists():
+            os.unlink(archivo)
+            return existente
+        formato = detectar_formato_archivo(archivo)
+        destino = self.ruta_objeto(h, EXT_FORMATO.get(formato, ".bin"))
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(archivo, destino)
+        with self._lock, self._con:
+            self._con.execute(
+                "INSERT OR REPLACE INTO objetos (hash, formato_original, ruta, canonico, bytes) "
+                "VALUES (?, ?, ?, 0, ?)", (h, formato, str(destino), destino.stat().st_size))
+        return destino
+
+    def vincular(self, carpeta, h):
+        """Crea (o repara) la vista carpeta/<hash>.<ext> hacia el objeto."""
+        objeto = self.objeto(h)
+        if objeto is None:
+            raise KeyError(h)
+        carpeta = Path(carpeta)
+        carpeta.mkdir(parents=True, exist_ok=True)
+        vista = carpeta / f"{h}{objeto.suffix}"
+        enlazar(objeto, vista)
+        with self._lock, self._con:
+            self._con.execute("INSERT OR REPLACE INTO vistas (carpeta, nombre, hash) VALUES (?, ?, ?)",
+                              (str(carpeta), vista.name, h))
+        return vista
+
+    def pendientes(self):
+        with self._lock:
+            return self._con.execute("SELECT hash, ruta FROM objetos WHERE canonico = 0").fetchall()
+
+    def transcodificar(self, procesos=PROCESOS):
+        """Lleva los objetos pendientes al formato canónico y re-apunta sus vistas.
+        Los que no se pueden decodificar quedan como fallidos. Devuelve cuántos se convirtieron."""
+        pendientes = self.pendientes()
+        if not pendientes:
+            return 0
+        ext = EXT_FORMATO[self.formato]
+        trabajos = [(h, ruta, str(self.ruta_objeto(h, ext)), self.formato, self.lado_max, self.calidad)
+                    for h, ruta in pendientes]
+        hechos = 0
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            for h, destino, w, alto, n, error in pool.map(_transcodificar_uno, trabajos, chunksize=8):
+                if error is not None:
+                    self._marcar_fallido(h, error)
+                    continue
+                self._actualizar_objeto(h, destino, w, alto, n)
+                hechos += 1
+        return hechos
+
+    def _marcar_fallido(self, h, error):
+        print(f"⚠️ No se pudo transcodificar {h}: {error}")
+        with self._lock, self._con:
+            self._con.execute("UPDATE objetos SET canonico = -1 WHERE hash = ?", (h,))
+
+    def _actualizar_objeto(self, h, destino, w, alto, n):
+        with self._lock, self._con:
+            self._con.execute("UPDATE objetos SET ruta = ?, canonico = 1, ancho = ?, alto = ?, bytes = ? "
+                              "WHERE hash = ?", (destino, w, alto, n, h))
+            vistas = self._con.execute("SELECT carpeta, nombre FROM vistas WHERE hash = ?", (h,)).fetchall()
+        for carpeta, nombre in vistas:
+            vieja = Path(carpeta) / nombre
+            nueva = vieja.with_suffix(Path(destino).suffix)
+            if not (vieja.is_symlink() or vieja.exists()):
+                continue  # la vista fue renombrada o borrada aguas abajo
+            if vieja != nueva:
+                vieja.unlink()
+            enlazar(destino, nueva)
+            with self._lock, self._con:
+                self._con.execute("UPDATE vistas SET nombre = ? WHERE carpeta = ? AND nombre = ?",
+                                  (nueva.name, carpeta, nombre))
+
+    def renombrar_vistas(self, renombres):
+        """Sigue en la tabla los renombres hechos aguas abajo (renombrar_afiches).
+        renombres: {(nombre de carpeta, nombre viejo): nombre nuevo}. Devuelve cuántas vistas cambió."""
+        with self._lock:
+            filas = self._con.execute("SELECT carpeta, nombre FROM vistas").fetchall()
+        cambios = [(renombres[(Path(c).name, n)], c, n) for c, n in filas if (Path(c).name, n) in renombres]
+        with self._lock, self._con:
+            self._con.executemany("UPDATE vistas SET nombre = ? WHERE carpeta = ? AND nombre = ?", cambios)
+        return len(cambios)
+
+    def estadisticas(self):
+        with self._lock:
+            objetos, canon, fallidos, total = self._con.execute(
+                "SELECT COUNT(*), COALESCE(SUM(canonico = 1), 0), COALESCE(SUM(canonico = -1), 0), "
+                "COALESCE(SUM(bytes), 0) FROM objetos").fetchone()
+            vistas = self._con.execute("SELECT COUNT(*) FROM vistas").fetchone()[0]
+        return {"objetos": objetos, "canonicos": canon, "fallidos": fallidos, "bytes": total, "vistas": vistas}
+
+    def cerrar(self):
+        with self._lock:
+            self._con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Almacén de imágenes direccionado por contenido.")
+    parser.add_argument("--root", type=str, default=os.path.join("poster_dataset", NOMBRE_ALMACEN))
+    parser.add_argument("--format", choices=sorted(EXT_FORMATO), default=FORMATO_CANONICO)
+    parser.add_argument("--max-side", type=int, default=LADO_MAX)
+    parser.add_argument("--quality", type=int, default=CALIDAD)
+    parser.add_argument("--processes", type=int, default=PROCESOS)
+    parser.add_argument("--transcode", action="store_true", help="Transcodifica los objetos pendientes.")
+    parser.add_argument("--stats", action="store_true", help="Muestra el estado del almacén.")
+    args = parser.parse_args()
+
+    with AlmacenImagenes(args.root, args.format, args.max_side, args.quality) as almacen:
+        if args.transcode:
+            n = almacen.transcodificar(args.processes)
+            print(f"🗜️ {n} objetos transcodificados a {args.format} (lado máx {args.max_side}px)")
+        if args.stats or not args.transcode:
+            e = almacen.estadisticas()
+            print(f"📦 {e['objetos']} objetos ({e['canonicos']} canónicos, {e['fallidos']} fallidos), "
+                  f"{e['bytes'] / 1e6:.1f} MB, {e['vistas']} vistas")
+
+
+if __name__ == "__main__":
+    main()
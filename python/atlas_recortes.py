@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+atlas_recortes.py
+Empaqueta los recortes publicados en atlas de textura potencia de dos.
+
+- Lee assets/recortes_web_index.json (la selección web, o sus derivados) y
+  agrupa por letra (o toda la selección con --global).
+- Empaqueta por estantes (FFDH: ordenados por alto decreciente) en la menor
+  textura potencia de dos que alcanza, hasta ATLAS_MAX; si no caben, abre
+  más páginas.
+- Emite assets/atlas/<grupo>_<página>.png y atlas_manifest.json con, por recorte:
+  página, rectángulo en píxeles, UV normalizado (origen abajo-izquierda, como
+  las texturas de Three.js con flipY) y metadatos de origen (letra, serie, afiche).
+- Si la selección no cambió (mismas rutas, tamaños y mtimes) no reescribe nada.
+
+Con esto las 40 letras de un grupo son una sola textura y una sola solicitud HTTP.
+
+Uso:
+  python3 python/atlas_recortes.py
+  python3 python/atlas_recortes.py --global --max-size 4096
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+from PIL import Image
+
+from generar_recortes_index import parsear_nombre
+
+# === CONFIGURACIÓN ===
+JSON_INDICE = "assets/recortes_web_index.json"
+CARPETA_ATLAS = "assets/atlas"
+MANIFIESTO = "atlas_manifest.json"
+ATLAS_MIN = 64
+ATLAS_MAX = 2048
+MARGEN = 2                    # px entre recortes (evita sangrado al filtrar)
+SUFIJO_DERIVADO = re.compile(r"\.\d+(?=\.\w+$)")   # derivados_web: <nombre>.<lado>.<ext>
+
+
+def letra_de(ruta):
+    partes = ruta.replace("\\", "/").split("/")
+    return partes[2] if len(partes) > 2 else "X"
+
+
+def metadatos_origen(ruta):
+    """serie/afiche/crop/índice del recorte original; los derivados web
+    (…_crop_002_0002.160.webp) se leen sin el sufijo .<lado>."""
+    nombre = SUFIJO_DERIVADO.sub("", os.path.basename(ruta))
+    campos = parsear_nombre(nombre)
+    return {k: campos[k] for k in ("serie", "afiche", "crop", "indice")}
+
+
+def potencias_de_dos(maximo):
+    p, lados = ATLAS_MIN, []
+    while p <= maximo:
+        lados.append(p)
+        p *= 2
+    return lados
+
+
+def empaquetar_estantes(tamanos, ancho, alto, margen=MARGEN):
+    """FFDH sobre una página ancho×alto. tamanos: [(id, w, h)] ya ordenados por alto desc.
+    Devuelve ({id: (x, y)}, [ids que no cupieron])."""
+    posiciones, sobrantes = {}, []
+    estantes = []  # [y, alto_estante, x_libre]
+    y_libre = 0
+    for ident, w, h in tamanos:
+        wm, hm = w + margen, h + margen
+        if wm > ancho or hm > alto:
+            sobrantes.append((ident, w, h))
+            continue
+        for estante in estantes:
+            if hm <= estante[1] and estante[2] + wm <= ancho:
+                posiciones[ident] = (estante[2], estante[0])
+                estante[2] += wm
+                break
+        else:
+            if y_libre + hm > alto:
+                sobrantes.append((ident, w, h))
+                continue
+            estantes.append([y_libre, hm, wm])
+            posiciones[ident] = (0, y_libre)
+            y_libre += hm
+    return posiciones, sobrantes
+
+
+def empaquetar(tamanos, maximo=ATLAS_MAX, margen=MARGEN):
+    """Reparte en páginas potencia de dos: [(ancho, alto, {id: (x, y)})]."""
+    pendientes = sorted(tamanos, key=lambda t: (t[2], t[1]), reverse=True)
+    paginas = []
+    lados = potencias_de_dos(maximo)
+    while pendientes:
+        area = sum((w + margen) * (h + margen) for _, w, h in pendientes)
+        # texturas candidatas de menor a mayor área (y más cuadradas primero)
+        candidatas = sorted(((a, b) for a in lados for b in lados if a * b >= area),
+                            key=lambda t: (t[0] * t[1], max(t) / min(t)))
+        for ancho, alto in candidatas or [(maximo, maximo)]:
+            posiciones, sobrantes = empaquetar_estantes(pendientes, ancho, alto, margen)
+            if not sobrantes:
+                break
+        else:
+            ancho, alto = maximo, maximo
+            posiciones, sobrantes = empaquetar_estantes(pendientes, ancho, alto, margen)
+        if not posiciones:
+            raise ValueError(f"Recortes más grandes que el atlas máximo ({maximo}px): "
+                             f"{[i for i, _, _ in sobrantes][:3]}")
+        paginas.append((ancho, alto, posiciones))
+        pendientes = sobrantes
+    return paginas
+
+
+def firma(rutas):
+    h = hashlib.md5()
+    for r in rutas:
+        st = os.stat(r)
+        h.update(f"{r}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def construir(rutas, salida=CARPETA_ATLAS, global_=False, maximo=ATLAS_MAX, margen=MARGEN):
+    grupos = {}
+    for r in rutas:
+        grupos.setdefault("todas" if global_ else letra_de(r), []).append(r)
+
+    manifiesto = {"generado": time.time(), "origen_uv": "abajo-izquierda", "atlas": [], "recortes": {}}
+    os.makedirs(salida, exist_ok=True)
+    vigentes = set()
+    for grupo in sorted(grupos):
+        imagenes = {}
+        for r in grupos[grupo]:
+            with Image.open(r) as img:
+                imagenes[r] = img.convert("RGBA")
+        paginas = empaquetar([(r, im.width, im.height) for r, im in imagenes.items()], maximo, margen)
+        for n, (ancho, alto, posiciones) in enumerate(paginas):
+            lienzo = Image.new("RGBA", (ancho, alto), (0, 0, 0, 0))
+            for r, (x, y) in posiciones.items():
+                lienzo.paste(imagenes[r], (x, y))
+            nombre = f"{grupo}_{n}.png"
+            tmp = os.path.join(salida, nombre + ".tmp")
+            lienzo.save(tmp, "PNG", optimize=True)
+            os.replace(tmp, os.path.join(salida, nombre))
+            vigentes.add(nombre)
+            indice_atlas = len(manifiesto["atlas"])
+            manifiesto["atlas"].append({"archivo": f"{salida}/{nombre}", "grupo": grupo, "pagina": n,
+                                        "ancho": ancho, "alto": alto, "recortes": len(posiciones)})
+            for r, (x, y) in posiciones.items():
+                w, h = imagenes[r].size
+                registro = {"atlas": indice_atlas, "x": x, "y": y, "w": w, "h": h,
+                            "uv": [round(x / ancho, 6), round(1 - (y + h) / alto, 6),
+                                   round((x + w) / ancho, 6), round(1 - y / alto, 6)],
+                            "letra": letra_de(r)}
+                registro.update(metadatos_origen(r))
+                manifiesto["recortes"][r] = registro
+
+    sin_origen = sum(1 for r in manifiesto["recortes"].values() if r["afiche"] is None)
+    if sin_origen:
+        print(f"⚠️ {sin_origen} recortes sin metadatos de origen (nombre fuera del patrón de generar_recortes_index)")
+    for nombre in os.listdir(salida):
+        if nombre.endswith(".png") and nombre not in vigentes:
+            os.remove(os.path.join(salida, nombre))
+    return manifiesto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atlas de textura por letra para los recortes publicados.")
+    parser.add_argument("--index", type=str, default=JSON_INDICE)
+    parser.add_argument("--out", type=str, default=CARPETA_ATLAS)
+    parser.add_argument("--global", dest="global_", action="store_true", help="Un solo grupo con toda la selección.")
+    parser.add_argument("--max-size", type=int, default=ATLAS_MAX)
+    parser.add_argument("--padding", type=int, default=MARGEN)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.index, "r", encoding="utf-8") as f:
+        rutas = [r for r in json.load(f) if os.path.exists(r)]
+
+    ruta_manifiesto = os.path.join(args.out, MANIFIESTO)
+    huella = firma(rutas) + f":{args.global_}:{args.max_size}:{args.padding}"
+    if not args.force and os.path.exists(ruta_manifiesto):
+        with open(ruta_manifiesto, "r", encoding="utf-8") as f:
+            if json.load(f).get("firma") == huella:
+                print("🧩 Atlas al día (la selección no cambió)")
+                return
+
+    manifiesto = construir(rutas, args.out, args.global_, args.max_size, args.padding)
+    manifiesto["firma"] = huella
+    tmp = ruta_manifiesto + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False)
+    os.replace(tmp, ruta_manifiesto)
+
+    ocupado = sum(r["w"] * r["h"] for r in manifiesto["recortes"].values())
+    total = sum(a["ancho"] * a["alto"] for a in manifiesto["atlas"])
+    print(f"🧩 {len(manifiesto['recortes'])} recortes en {len(manifiesto['atlas'])} atlas "
+          f"(ocupación {100 * ocupado / max(1, total):.0f}%) → {ruta_manifiesto}")
+
+
+if __name__ == "__main__":
+    main()
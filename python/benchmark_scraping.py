@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+benchmark_scraping.py
+Mide el camino de descarga de los scrapers contra servidor_simulado (sin red).
+
+Levanta el buscador/CDN falso en un puerto libre y corre el mismo motor que usan
+poster_scraper.py y scraper_imagenes_up.py (pipeline_scraping + descargador),
+con la configuración de cada script, para cada nivel de concurrencia pedido.
+
+Reporta por corrida:
+  - imágenes guardadas por segundo
+  - bytes desperdiciados (enviados por el servidor y no guardados: rechazadas,
+    duplicadas, truncadas) y bytes leídos de imágenes rechazadas
+  - latencia por imagen p50 / p95
+
+Uso:
+  python3 python/benchmark_scraping.py --concurrency 1 4 16 --queries 4 --max 100
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from bitacora import Bitacora
+from descargador import Descargador, TASA_POR_HOST
+from pipeline_scraping import PipelineScraping
+from servidor_simulado import (
+    ServidorSimulado, BackendSimulado, generar_corpus, cargar_corpus, parsear_rango,
+    IMAGENES, LATENCIA_MS, P_429, P_TRUNCADA, P_DUPLICADA,
+)
+
+# === CONFIGURACIÓN ===
+# Configuración de descarga de cada script sobre el motor común
+PERFILES = {
+    "poster_scraper": {"min_w": 0, "min_h": 0, "carpeta_por_consulta": True},
+    "scraper_imagenes_up": {"min_w": 400, "min_h": 400, "carpeta_por_consulta": False},
+}
+QUERIES = [
+    "afiches Unidad Popular Chile",
+    "carteles chicha Perú",
+    "political posters Latin America",
+    "Nueva Canción Chilena posters",
+    "afiches dictadura Chile 1980",
+    "carteles tipográficos revolucionarios",
+]
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    orden = sorted(valores)
+    k = min(len(orden) - 1, max(0, int(round(p / 100.0 * (len(orden) - 1)))))
+    return orden[k]
+
+
+def formatear_bytes(n):
+    for unidad in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unidad == "GB":
+            return f"{n:.1f} {unidad}" if unidad != "B" else f"{int(n)} B"
+        n /= 1024.0
+
+
+def correr(servidor, perfil, concurrencia, queries, maximo, tasa_por_host):
+    """Una corrida completa en un directorio temporal; devuelve métricas."""
+    latencias = []
+    bytes_rechazadas = [0]
+    lock = threading.Lock()
+
+    def observar(query, url, res, segundos):
+        with lock:
+            latencias.append(segundos)
+            if res is not None and not res["ok"]:
+                bytes_rechazadas[0] += res["bytes"]
+
+    enviados_antes = servidor.contadores["bytes"]
+    with tempfile.TemporaryDirectory(prefix="bench_scraping_") as tmp:
+        out_dir = Path(tmp) / "out"
+        with Bitacora(Path(tmp) / "bitacora.sqlite3") as bitacora, \
+                Descargador(concurrencia=concurrencia, tasa_por_host=tasa_por_host,
+                            headers=BackendSimulado.headers) as descargador:
+            pipeline = PipelineScraping(BackendSimulado(servidor.url), out_dir, descargador,
+                                        bitacora=bitacora, observador=observar,
+                                        headers=BackendSimulado.headers, **PERFILES[perfil])
+            t0 = time.perf_counter()
+            stats = pipeline.ejecutar(queries, maximo)
+            segundos = time.perf_counter() - t0
+        guardados = sum(p.stat().st_size for p in out_dir.rglob("*.jpg"))
+
+    enviados = servidor.contadores["bytes"] - enviados_antes
+    guardadas = sum(s["guardadas"] for s in stats.values())
+    return {
+        "perfil": perfil,
+        "concurrencia": concurrencia,
+        "segundos": segundos,
+        "guardadas": guardadas,
+        "img_s": guardadas / segundos if segundos else 0.0,
+        "desperdicio": max(0, enviados - guardados),
+        "leidos_rechazadas": bytes_rechazadas[0],
+        "p50": percentil(latencias, 50),
+        "p95": percentil(latencias, 95),
+        "rechazadas": sum(s["rechazadas"] for s in stats.values()),
+        "errores": sum(s["errores"] for s in stats.values()),
+    }
+
+
+def imprimir(resultados):
+    print("\n📊 Resultados")
+    print(f"{'perfil':<22}{'conc':>5}{'seg':>8}{'guard':>7}{'img/s':>8}"
+          f"{'desperdicio':>14}{'leído rech.':>14}{'p50 ms':>9}{'p95 ms':>9}{'rech':>6}{'err':>5}")
+    for r in resultados:
+        print(f"{r['perfil']:<22}{r['concurrencia']:>5}{r['segundos']:>8.2f}{r['guardadas']:>7}"
+              f"{r['img_s']:>8.1f}{formatear_bytes(r['desperdicio']):>14}"
+              f"{formatear_bytes(r['leidos_rechazadas']):>14}"
+              f"{r['p50'] * 1000:>9.0f}{r['p95'] * 1000:>9.0f}{r['rechazadas']:>6}{r['errores']:>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de los scrapers contra servidor_simulado.")
+    parser.add_argument("--profile", choices=sorted(PERFILES), nargs="+", default=sorted(PERFILES))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--queries", type=int, default=3, help="Cantidad de consultas intercaladas.")
+    parser.add_argument("--max", type=int, default=60, help="Resultados por consulta.")
+    parser.add_argument("--rate-per-host", type=float, default=TASA_POR_HOST * 40,
+                        help="Tasa por host (el servidor simulado es un único host).")
+    parser.add_argument("--corpus", type=str, default=None, help="Carpeta de imágenes reales (opcional).")
+    parser.add_argument("--images", type=int, default=IMAGENES)
+    parser.add_argument("--latency", type=parsear_rango, default=LATENCIA_MS)
+    parser.add_argument("--p429", type=float, default=P_429)
+    parser.add_argument("--ptrunc", type=float, default=P_TRUNCADA)
+    parser.add_argument("--pdup", type=float, default=P_DUPLICADA)
+    args = parser.parse_args()
+
+    print("🧪 Preparando corpus...")
+    corpus = cargar_corpus(args.corpus, args.images) if args.corpus else generar_corpus(args.images)
+    queries = (QUERIES * (args.queries // len(QUERIES) + 1))[:args.queries]
+
+    resultados = []
+    with ServidorSimulado(corpus, latencia_ms=args.latency, p_429=args.p429, p_truncada=args.ptrunc,
+                          p_duplicada=args.pdup, resultados_por_consulta=args.max) as servidor:
+        print(f"🌐 Servidor simulado en {servidor.url} ({len(corpus)} imágenes)")
+        for perfil in args.profile:
+            for conc in args.concurrency:
+                print(f"\n▶ {perfil} · concurrencia {conc}")
+                resultados.append(correr(servidor, perfil, conc, queries, args.max, args.rate_per_host))
+    imprimir(resultados)
+
+
+if __name__ == "__main__":
+    main()
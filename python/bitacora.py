@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bitacora.py
+Bitácora SQLite de descargas, indexada por URL.
+
+Cada URL procesada por los scrapers queda registrada con su resultado
+(hash del contenido, estado HTTP, tamaño y motivo de rechazo). En una nueva
+corrida se consulta antes de cualquier acceso a la red: las URLs ya guardadas,
+rechazadas o muertas se saltan, salvo que la entrada sea más antigua que la
+política --refresh-older-than.
+
+Los fallos transitorios (error de red, HTTP 429/5xx y otros rechazos HTTP que
+no sean 404/410) solo se saltan durante REINTENTAR_DESPUES; pasado ese plazo
+la URL se vuelve a pedir.
+
+Estados:
+  ok         → guardada (o duplicada de un hash ya guardado)
+  rechazada  → respuesta válida pero descartada (HTTP != 200, vacía, pequeña…)
+  error      → fallo de red sin respuesta
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# === CONFIGURACIÓN ===
+NOMBRE_BITACORA = "bitacora_descargas.sqlite3"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS descargas (
+    url          TEXT PRIMARY KEY,
+    estado       TEXT NOT NULL,
+    hash         TEXT,
+    http_status  INTEGER,
+    bytes        INTEGER,
+    motivo       TEXT,
+    ruta         TEXT,
+    actualizado  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_descargas_hash ON descargas(hash);
+"""
+
+REINTENTAR_DESPUES = 3600     # segundos que se salta un fallo transitorio (0 = reintentar siempre)
+HTTP_DEFINITIVOS = {404, 410}  # rechazos HTTP que no se reintentan
+
+UNIDADES = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parsear_duracion(texto):
+    """'90', '45m', '12h', '7d', '2w' → segundos. None/'' → None (no expira)."""
+    if texto is None or str(texto).strip() == "":
+        return None
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*", str(texto).lower())
+    if not m:
+        raise ValueError(f"Duración inválida: {texto!r} (usa p.ej. 30m, 12h, 7d)")
+    return float(m.group(1)) * UNIDADES[m.group(2) or "s"]
+
+
+def es_transitorio(entrada):
+    """True si la entrada registra un fallo que vale la pena reintentar."""
+    if entrada["estado"] == "error":
+        return True
+    return (entrada["estado"] == "rechazada" and entrada["motivo"] == "http"
+            and entrada["http_status"] not in HTTP_DEFINITIVOS)
+
+
+class Bitacora:
+    """Bitácora de descargas thread-safe (una conexión, un lock)."""
+
+    def __init__(self, ruta, refrescar_despues=None, reintentar_despues=REINTENTAR_DESPUES):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.refrescar_despues = refrescar_despues
+        self.reintentar_despues = reintentar_despues
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(str(self.ruta), check_same_thread=False)
+        self._con.row_factory = sqlite3.Row
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.executescript(ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def consultar(self, url):
+        """Entrada vigente para la URL (dict) o None si no existe o expiró."""
+        with self._lock:
+            fila = self._con.execute("SELECT * FROM descargas WHERE url = ?", (url,)).fetchone()
+        if fila is None:
+            return None
+        if self.refrescar_despues is not None and time.time() - fila["actualizado"] > self.refrescar_despues:
+            return None
+        return dict(fila)
+
+    def debe_saltar(self, url):
+        entrada = self.consultar(url)
+        if entrada is None:
+            return False
+        if es_transitorio(entrada):
+            return time.time() - entrada["actualizado"] < self.reintentar_despues
+        return True
+
+    def registrar(self, url, estado, hash=None, http_status=None, bytes=None, motivo=None, ruta=None):
+        with self._lock, self._con:
+            self._con.execute(
+                "INSERT OR REPLACE INTO descargas "
+                "(url, estado, hash, http_status, bytes, motivo, ruta, actualizado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, estado, hash, http_status, bytes, motivo, ruta, time.time()),
+            )
+
+    def hash_conocido(self, h):
+        with self._lock:
+            return self._con.execute(
+                "SELECT 1 FROM descargas WHERE hash = ? AND estado = 'ok' LIMIT 1", (h,)
+            ).fetchone() is not None
+
+    def resumen(self):
+        """Cantidad de entradas por estado."""
+        with self._lock:
+            filas = self._con.execute("SELECT estado, COUNT(*) FROM descargas GROUP BY estado").fetchall()
+        return {estado: n for estado, n in filas}
+
+    def cerrar(self):
+        with self._lock:
+            self._con.close()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+catalogo_afiches.py
+Catálogo indexado de afiches (SQLite) que reemplaza los volcados CSV/JSON.
+
+- Una fila por afiche, única por (carpeta, nombre_final), con índices sobre
+  país, década, carpeta e ideología: "Chile, 1980s" es una consulta indexada,
+  no un escaneo del JSON completo.
+- El scraping (pipeline_scraping) y el renombrado (renombrar_afiches) hacen
+  upserts; un campo que llega vacío no pisa el valor ya guardado.
+- poster_dataset_list.json / .csv se exportan desde aquí solo cuando se piden,
+  opcionalmente filtrados.
+
+Uso:
+  python3 python/catalogo_afiches.py --pais Chile --decada 1980s
+  python3 python/catalogo_afiches.py --export datasets/poster_dataset_list.json
+  python3 python/catalogo_afiches.py --import-json datasets/poster_dataset_list.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+# === CONFIGURACIÓN ===
+RUTA_CATALOGO = "datasets/catalogo_afiches.sqlite3"
+FILTROS = ("pais", "decada", "carpeta", "ideologia")
+# Columnas exportadas (mismo orden que el antiguo poster_dataset_list)
+CAMPOS_EXPORTACION = ("nombre_original", "nombre_final", "carpeta", "pais", "decada", "ideologia",
+                      "ruta_relativa", "ruta_absoluta", "hash", "url")
+CAMPOS = CAMPOS_EXPORTACION + ("actualizado",)
+# Hechos por contenido (los llena metadatos_afiches.py)
+CAMPOS_METADATOS = ("ancho", "alto", "formato", "bytes", "fecha_exif", "histograma", "dominantes", "phash")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS afiches (
+    id               INTEGER PRIMARY KEY,
+    carpeta          TEXT NOT NULL,
+    nombre_final     TEXT NOT NULL,
+    nombre_original  TEXT,
+    pais             TEXT,
+    decada           TEXT,
+    ideologia        TEXT,
+    ruta_relativa    TEXT,
+    ruta_absoluta    TEXT,
+    hash             TEXT,
+    url              TEXT,
+    actualizado      REAL NOT NULL,
+    contenido        TEXT,
+    archivo_mtime    REAL,
+    archivo_bytes    INTEGER,
+    UNIQUE (carpeta, nombre_final)
+);
+CREATE TABLE IF NOT EXISTS metadatos (
+    contenido   TEXT PRIMARY KEY,
+    ancho       INTEGER,
+    alto        INTEGER,
+    formato     TEXT,
+    bytes       INTEGER,
+    fecha_exif  TEXT,
+    histograma  TEXT,
+    dominantes  TEXT,
+    phash       TEXT,
+    extraido    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_afiches_pais ON afiches(pais, decada);
+CREATE INDEX IF NOT EXISTS idx_afiches_decada ON afiches(decada);
+CREATE INDEX IF NOT EXISTS idx_afiches_carpeta ON afiches(carpeta);
+CREATE INDEX IF NOT EXISTS idx_afiches_ideologia ON afiches(ideologia);
+CREATE INDEX IF NOT EXISTS idx_afiches_hash ON afiches(hash);
+CREATE INDEX IF NOT EXISTS idx_afiches_contenido ON afiches(contenido);
+"""
+# Columnas agregadas después de la primera versión del esquema
+COLUMNAS_NUEVAS = {"contenido": "TEXT", "archivo_mtime": "REAL", "archivo_bytes": "INTEGER"}
+
+
+def normalizar_nombre(nombre):
+    """Elimina tildes y ñ, reemplaza espacios y guiones por guiones bajos."""
+    nombre = nombre.lower()
+    nombre = unicodedata.normalize("NFD", nombre).encode("ascii", "ignore").decode("utf-8")
+    nombre = nombre.replace("ñ", "n")
+    nombre = nombre.replace(" ", "_").replace("-", "_")
+    return nombre
+
+
+class CatalogoAfiches:
+    """Catálogo SQLite de afiches con upserts y consultas por filtros indexados."""
+
+    def __init__(self, ruta=RUTA_CATALOGO):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(str(self.ruta), check_same_thread=False)
+        self._con.row_factory = sqlite3.Row
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._migrar()
+        self._con.executescript(ESQUEMA)
+
+    def _migrar(self):
+        existentes = {f[1] for f in self._con.execute("PRAGMA table_info(afiches)")}
+        if not existentes:
+            return  # catálogo nuevo: lo crea ESQUEMA
+        with self._con:
+            for columna, tipo in COLUMNAS_NUEVAS.items():
+                if columna not in existentes:
+                    self._con.execute(f"ALTER TABLE afiches ADD COLUMN {columna} {tipo}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # --- escritura ---
+    def upsert(self, registros):
+        """Inserta o actualiza por (carpeta, nombre_final). Los campos None conservan el valor previo."""
+        ahora = time.time()
+        filas = [tuple(r.get(c) for c in CAMPOS_EXPORTACION) + (ahora,) for r in registros]
+        actualizar = ", ".join(f"{c} = COALESCE(excluded.{c}, afiches.{c})"
+                               for c in CAMPOS_EXPORTACION if c not in ("carpeta", "nombre_final"))
+        with self._lock, self._con:
+            self._con.executemany(
+                f"INSERT INTO afiches ({', '.join(CAMPOS)}) VALUES ({', '.join('?' * len(CAMPOS))}) "
+                f"ON CONFLICT (carpeta, nombre_final) DO UPDATE SET {actualizar}, "
+                f"actualizado = excluded.actualizado", filas)
+        return len(filas)
+
+    def renombrar(self, carpeta, nombre_previo, nombre_final):
+        """Mueve la fila de un archivo renombrado (p.ej. <md5>.jpg → afiche_<carpeta>_<NNN>.jpg)."""
+        with self._lock, self._con:
+            cur = self._con.execute(
+                "UPDATE OR REPLACE afiches SET nombre_final = ?, actualizado = ? "
+                "WHERE carpeta = ? AND nombre_final = ?",
+                (nombre_final, time.time(), carpeta, nombre_previo))
+        return cur.rowcount
+
+    def eliminar(self, carpeta, nombre_final):
+        with self._lock, self._con:
+            self._con.execute("DELETE FROM afiches WHERE carpeta = ? AND nombre_final = ?",
+                              (carpeta, nombre_final))
+
+    # --- consultas ---
+    def _where(self, filtros, prefijo=""):
+        desconocidos = set(filtros) - set(FILTROS)
+        if desconocidos:
+            raise ValueError(f"Filtros no soportados: {', '.join(sorted(desconocidos))}")
+        activos = [(k, v) for k, v in filtros.items() if v is not None]
+        if not activos:
+            return "", []
+        return " WHERE " + " AND ".join(f"{prefijo}{k} = ?" for k, _ in activos), [v for _, v in activos]
+
+    def buscar(self, limite=None, metadatos=False, **filtros):
+        """[dict] de los afiches que cumplen todos los filtros (pais=, decada=, carpeta=, ideologia=).
+        Con metadatos=True agrega dimensiones, formato, EXIF, histograma, etc. sin abrir imágenes."""
+        where, params = self._where(filtros, "a.")
+        campos = [f"a.{c}" for c in CAMPOS_EXPORTACION]
+        desde = "afiches a"
+        if metadatos:
+            campos += [f"m.{c}" for c in CAMPOS_METADATOS]
+            desde += " LEFT JOIN metadatos m ON m.contenido = a.contenido"
+        sql = f"SELECT {', '.join(campos)} FROM {desde}{where} ORDER BY a.carpeta, a.nombre_final"
+        if limite is not None:
+            sql += " LIMIT ?"
+            params.append(int(limite))
+        with self._lock:
+            return [dict(f) for f in self._con.execute(sql, params)]
+
+    def contar(self, **filtros):
+        where, params = self._where(filtros)
+        with self._lock:
+            return self._con.execute(f"SELECT COUNT(*) FROM afiches{where}", params).fetchone()[0]
+
+    def obtener(self, carpeta, nombre_final):
+        with self._lock:
+            fila = self._con.execute(
+                f"SELECT {', '.join(CAMPOS_EXPORTACION)} FROM afiches WHERE carpeta = ? AND nombre_final = ?",
+                (carpeta, nombre_final)).fetchone()
+        return dict(fila) if fila else None
+
+    def valores(self, campo):
+        """{valor: cantidad} de un campo filtrable (útil para poblar selectores)."""
+        if campo not in FILTROS:
+            raise ValueError(f"Campo no soportado: {campo}")
+        with self._lock:
+            return dict(self._con.execute(
+                f"SELECT {campo}, COUNT(*) FROM afiches GROUP BY {campo} ORDER BY {campo}").fetchall())
+
+    # --- metadatos por contenido ---
+    def archivos(self):
+        """[(id, ruta_absoluta, contenido, mtime, bytes)] de todos los afiches."""
+        with self._lock:
+            return self._con.execute(
+                "SELECT id, ruta_absoluta, contenido, archivo_mtime, archivo_bytes FROM afiches").fetchall()
+
+    def asignar_contenido(self, filas):
+        """filas: [(id, contenido, mtime, bytes)] tras hashear el archivo."""
+        with self._lock, self._con:
+            self._con.executemany("UPDATE afiches SET contenido = ?, archivo_mtime = ?, archivo_bytes = ? "
+                                  "WHERE id = ?", [(c, m, b, i) for i, c, m, b in filas])
+
+    def contenidos_con_metadatos(self):
+        with self._lock:
+            return {f[0] for f in self._con.execute("SELECT contenido FROM metadatos")}
+
+    def guardar_metadatos(self, registros):
+        ahora = time.time()
+        campos = ("contenido",) + CAMPOS_METADATOS + ("extraido",)
+        with self._lock, self._con:
+            self._con.executemany(
+                f"INSERT OR REPLACE INTO metadatos ({', '.join(campos)}) VALUES ({', '.join('?' * len(campos))})",
+                [tuple(r.get(c) for c in campos[:-1]) + (ahora,) for r in registros])
+
+    # --- exportación bajo demanda ---
+    def exportar(self, ruta, **filtros):
+        """Escribe JSON o CSV (según la extensión) de forma atómica; devuelve cuántas filas."""
+        registros = self.buscar(**filtros)
+        ruta = str(ruta)
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        tmp = ruta + ".tmp"
+        if ruta.endswith(".csv"):
+            with open(tmp, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=CAMPOS_EXPORTACION)
+                writer.writeheader()
+                writer.writerows(registros)
+        else:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(registros, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, ruta)
+        return len(registros)
+
+    def importar_json(self, ruta):
+        """Carga un poster_dataset_list.json existente (migración desde los volcados)."""
+        with open(ruta, "r", encoding="utf-8") as f:
+            return self.upsert(json.load(f))
+
+    def cerrar(self):
+        with self._lock:
+            self._con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta y exporta el catálogo de afiches.")
+    parser.add_argument("--catalog", type=str, default=RUTA_CATALOGO)
+    for campo in FILTROS:
+        parser.add_argument(f"--{campo}", type=str, default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--export", type=str, nargs="+", default=None,
+                        help="Archivo(s) .json/.csv a generar con los filtros dados.")
+    parser.add_argument("--import-json", type=str, default=None,
+                        help="Importa un poster_dataset_list.json existente.")
+    parser.add_argument("--values", choices=FILTROS, default=None, help="Lista valores y conteos de un campo.")
+    args = parser.parse_args()
+
+    filtros = {c: getattr(args, c) for c in FILTROS}
+    with CatalogoAfiches(args.catalog) as catalogo:
+        if args.import_json:
+            n = catalogo.importar_json(args.import_json)
+            print(f"📥 {n} afiches importados desde {args.import_json}")
+        if args.values:
+            for valor, n in catalogo.valores(args.values).items():
+                print(f"{valor or '---':<30}{n:>7}")
+        elif args.export:
+            for ruta in args.export:
+                n = catalogo.exportar(ruta, **filtros)
+                print(f"📘 {n} afiches exportados a {ruta}")
+        else:
+            for r in catalogo.buscar(limite=args.limit, **filtros):
+                print(f"{r['carpeta']}/{r['nombre_final']}  {r['pais'] or '---'}  {r['decada'] or '---'}  "
+                      f"{r['ideologia'] or '---'}")
+            print(f"🔎 {catalogo.contar(**filtros)} afiches")
+
+
+if __name__ == "__main__":
+    main()
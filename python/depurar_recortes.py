@@ -1,24 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+depurar_recortes.py
+Puntaje de calidad de recortes y cuarentena por umbrales.
+
+- Los recortes se cargan por lotes en pilas NumPy (N×LADO×LADO, escala de
+  grises) y se puntúan en un pool de procesos:
+    tinta      fracción de píxeles de la clase minoritaria (umbral por imagen)
+    contraste  desviación estándar de la luminancia (0–1)
+    nitidez    varianza del laplaciano (desenfoque → valores bajos)
+    aspecto    lado corto / lado largo del recorte original
+    borde      fracción del marco ocupada por tinta (letra cortada)
+- Los puntajes se guardan por hash de contenido en <root>/_depuracion.sqlite3;
+  un archivo con mismo mtime/tamaño no se relee, y un recorte duplicado o
+  movido reutiliza su puntaje. Un recorte que no se puede decodificar queda
+  con métricas NULL (no se vuelve a intentar) y va a cuarentena como "ilegible".
+- Los rechazados se mueven a <root>/eliminados/<carpeta>/ y cada movimiento
+  queda en una bitácora (tabla cuarentena). Cambiar un umbral reclasifica todo
+  desde la caché y devuelve a su lugar lo que ahora pasa, sin escanear carpetas.
+
+Uso:
+  python3 python/depurar_recortes.py                       # puntúa y aplica umbrales
+  python3 python/depurar_recortes.py --min-sharpness 40 --no-scan --dry-run
+  python3 python/depurar_recortes.py --restore             # devuelve todo
+"""
+
+import argparse
 import os
 import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from metadatos_afiches import hash_contenido
 
 # === CONFIGURACIÓN ===
 ROOT_DIR = os.path.join(os.path.dirname(__file__), "../recortes")
 ROOT_DIR = os.path.abspath(ROOT_DIR)
 ELIMINADOS_DIR = os.path.join(ROOT_DIR, "eliminados")
+NOMBRE_BASE = "_depuracion.sqlite3"
+EXTENSIONES = (".png", ".jpg", ".jpeg", ".webp")
+PROCESOS = None               # None = os.cpu_count()
+LADO = 64                     # px de la pila de análisis
+LOTE = 256                    # recortes por tarea del pool
+VERSION = 1                   # subirla invalida los puntajes si cambia el cálculo
+
+METRICAS = ("tinta", "contraste", "nitidez", "aspecto", "borde")
+# métrica: (mínimo, máximo); None = sin límite
+UMBRALES = {
+    "tinta": (0.02, None),
+    "contraste": (0.06, None),
+    "nitidez": (8.0, None),
+    "aspecto": (0.12, None),
+    "borde": (None, 0.45),
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS puntajes (
+    hash       TEXT PRIMARY KEY,
+    version    INTEGER NOT NULL,
+    tinta      REAL, contraste REAL, nitidez REAL, aspecto REAL, borde REAL
+);
+CREATE TABLE IF NOT EXISTS archivos (
+    ruta   TEXT PRIMARY KEY,
+    hash   TEXT NOT NULL,
+    mtime  REAL,
+    bytes  INTEGER
+);
+CREATE TABLE IF NOT EXISTS cuarentena (
+    ruta         TEXT PRIMARY KEY,
+    destino      TEXT NOT NULL,
+    hash         TEXT,
+    motivo       TEXT,
+    actualizado  REAL NOT NULL
+);
+"""
+
+
+# === PUNTAJE (procesos del pool) ===
+def cargar_pila(rutas):
+    """Pila float32 N×LADO×LADO en [0, 1], aspectos y máscara de archivos legibles."""
+    pila = np.zeros((len(rutas), LADO, LADO), dtype=np.float32)
+    aspectos = np.zeros(len(rutas), dtype=np.float32)
+    validos = np.zeros(len(rutas), dtype=bool)
+    for i, ruta in enumerate(rutas):
+        try:
+            with Image.open(ruta) as img:
+                ancho, alto = img.size
+                img.draft("L", (LADO, LADO))
+                pila[i] = np.asarray(img.convert("L").resize((LADO, LADO), Image.BILINEAR), dtype=np.float32)
+        except Exception:
+            continue
+        aspectos[i] = min(ancho, alto) / max(1, ancho, alto)
+        validos[i] = True
+    return pila / 255.0, aspectos, validos
+
+
+def mascara_tinta(pila):
+    """Máscara booleana N×H×W de la tinta: la clase minoritaria respecto del punto
+    medio de cada imagen (sirve para letra oscura sobre claro y al revés)."""
+    minimo, maximo = pila.min(axis=(1, 2)), pila.max(axis=(1, 2))
+    corte = ((minimo.astype(np.float32) + maximo) / 2)[:, None, None]
+    oscuros = pila < corte
+    invertir = oscuros.mean(axis=(1, 2)) > 0.5
+    return np.where(invertir[:, None, None], ~oscuros, oscuros)
+
+
+def puntuar_pila(pila, aspectos):
+    """Métricas vectorizadas sobre la pila completa: {métrica: array N}."""
+    tinta = mascara_tinta(pila)
+    lap = (pila[:, :-2, 1:-1] + pila[:, 2:, 1:-1] + pila[:, 1:-1, :-2] + pila[:, 1:-1, 2:]
+           - 4 * pila[:, 1:-1, 1:-1]) * 255.0
+    marco = np.concatenate([tinta[:, 0, :], tinta[:, -1, :], tinta[:, 1:-1, 0], tinta[:, 1:-1, -1]], axis=1)
+    return {
+        "tinta": tinta.mean(axis=(1, 2)),
+        "contraste": pila.std(axis=(1, 2)),
+        "nitidez": lap.var(axis=(1, 2)),
+        "aspecto": aspectos,
+        "borde": marco.mean(axis=1),
+    }
+
+
+def puntuar_lote(trabajos):
+    """[(hash, ruta)] → [(hash, {métrica: valor})], con valores None si el archivo
+    no se pudo leer. Corre en un proceso del pool."""
+    pila, aspectos, validos = cargar_pila([r for _, r in trabajos])
+    metricas = puntuar_pila(pila, aspectos)
+    return [(h, {m: round(float(metricas[m][i]), 5) if validos[i] else None for m in METRICAS})
+            for i, (h, _) in enumerate(trabajos)]
+
+
+def clasificar(valores, umbrales=UMBRALES):
+    """valores: {métrica: array N}. Devuelve un array N de motivos ('' = pasa;
+    'ilegible' si el recorte no tiene métricas)."""
+    n = len(next(iter(valores.values()))) if valores else 0
+    motivos = np.full(n, "", dtype=object)
+    for metrica in METRICAS:
+        motivos[np.isnan(np.asarray(valores[metrica], dtype=np.float64))] = "ilegible"
+    for metrica in METRICAS:
+        minimo, maximo = umbrales.get(metrica, (None, None))
+        x = valores[metrica]
+        if minimo is not None:
+            motivos[(motivos == "") & (x < minimo)] = f"{metrica}<{minimo:g}"
+        if maximo is not None:
+            motivos[(motivos == "") & (x > maximo)] = f"{metrica}>{maximo:g}"
+    return motivos
+
+
+# === BASE Y CUARENTENA ===
+class DepuradorRecortes:
+    """Caché de puntajes por contenido + bitácora de cuarentena (una conexión, un lock)."""
+
+    def __init__(self, root=ROOT_DIR):
+        self.root = os.path.abspath(root)
+        self.eliminados = os.path.join(self.root, "eliminados")
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(os.path.join(self.root, NOMBRE_BASE), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.executescript(ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def listar(self):
+        """Recortes activos (excluye eliminados/ y carpetas con prefijo '_')."""
+        rutas = []
+        with os.scandir(self.root) as it:
+            carpetas = sorted((e for e in it if e.is_dir() and e.name != "eliminados"
+                               and not e.name.startswith("_")), key=lambda e: e.name)
+        for carpeta in carpetas:
+            with os.scandir(carpeta.path) as it:
+                rutas.extend((f"{carpeta.name}/{e.name}", e.stat()) for e in it
+                             if e.is_file() and e.name.lower().endswith(EXTENSIONES))
+        return rutas
 
-def restaurar_archivos():
-    """Mueve todos los archivos desde /recortes/eliminados de vuelta a sus carpetas originales."""
-    if not os.path.exists(ELIMINADOS_DIR):
+    def sincronizar(self, procesos=PROCESOS):
+        """Pone al día archivos y puntajes; devuelve (hasheados, puntuados)."""
+        with self._lock:
+            previos = {r: (h, m, b) for r, h, m, b in self._con.execute("SELECT ruta, hash, mtime, bytes FROM archivos")}
+            con_puntaje = {h for (h,) in self._con.execute("SELECT hash FROM puntajes WHERE version = ?", (VERSION,))}
+
+        presentes = self.listar()
+        cambiados = [r for r, st in presentes if previos.get(r, (None,))[1:] != (st.st_mtime, st.st_size)]
+        desaparecidos = set(previos) - {r for r, _ in presentes}
+
+        hashes = {r: h for r, (h, _, _) in previos.items() if r not in desaparecidos}
+        if not cambiados and not desaparecidos and con_puntaje.issuperset(hashes.values()):
+            return 0, 0  # nada cambió en disco: ni se abre el pool
+
+        filas, pendientes = [], {}
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            for ruta, h, mtime, n in pool.map(hash_contenido, [os.path.join(self.root, r) for r in cambiados],
+                                              chunksize=32):
+                if h is not None:
+                    filas.append((os.path.relpath(ruta, self.root).replace("\\", "/"), h, mtime, n))
+            hashes.update((r, h) for r, h, _, _ in filas)
+            for r, h in hashes.items():
+                if h not in con_puntaje:
+                    pendientes.setdefault(h, os.path.join(self.root, r))
+
+            # un trabajo por lote de contenidos desconocidos: cada proceso arma una pila NumPy
+            trabajos = list(pendientes.items())
+            lotes = [trabajos[i:i + LOTE] for i in range(0, len(trabajos), LOTE)]
+            resultados = [res for lote in pool.map(puntuar_lote, lotes) for res in lote]
+
+        with self._lock, self._con:
+            self._con.executemany("DELETE FROM archivos WHERE ruta = ?", [(r,) for r in desaparecidos])
+            self._con.executemany("INSERT OR REPLACE INTO archivos (ruta, hash, mtime, bytes) VALUES (?, ?, ?, ?)",
+                                  filas)
+            self._con.executemany(
+                f"INSERT OR REPLACE INTO puntajes (hash, version, {', '.join(METRICAS)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(METRICAS))})",
+                [(h, VERSION, *(p[m] for m in METRICAS)) for h, p in resultados])
+        return len(filas), len(resultados)
+
+    def puntajes(self):
+        """Rutas (activas y en cuarentena), hashes y {métrica: array} desde la caché."""
+        consulta = (f"SELECT t.ruta, t.hash, {', '.join('p.' + m for m in METRICAS)} FROM "
+                    "(SELECT ruta, hash FROM archivos UNION ALL SELECT ruta, hash FROM cuarentena) t "
+                    "JOIN puntajes p ON p.hash = t.hash AND p.version = ?")
+        with self._lock:
+            filas = self._con.execute(consulta, (VERSION,)).fetchall()
+        valores = np.array([f[2:] for f in filas], dtype=np.float64).reshape(len(filas), len(METRICAS))
+        return [f[0] for f in filas], [f[1] for f in filas], {m: valores[:, i] for i, m in enumerate(METRICAS)}
+
+    def en_cuarentena(self):
+        with self._lock:
+            return {r: d for r, d in self._con.execute("SELECT ruta, destino FROM cuarentena")}
+
+    def _mover(self, origen, destino):
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        shutil.move(origen, destino)
+
+    def aplicar(self, rutas, hashes, motivos, simular=False):
+        """Mueve a cuarentena los rechazados y devuelve los que ahora pasan: (cuarentenados, restaurados)."""
+        actuales = self.en_cuarentena()
+        cuarentenar, restaurar = [], []
+        for ruta, h, motivo in zip(rutas, hashes, motivos):
+            if motivo and ruta not in actuales:
+                cuarentenar.append((ruta, h, motivo))
+            elif not motivo and ruta in actuales:
+                restaurar.append(ruta)
+        if simular:
+            return len(cuarentenar), len(restaurar)
+
+        for ruta, h, motivo in cuarentenar:
+            destino = f"eliminados/{ruta}"
+            # se registra antes de mover: una interrupción deja la fila, que reconciliar() resuelve
+            with self._lock, self._con:
+                self._con.execute("INSERT OR REPLACE INTO cuarentena (ruta, destino, hash, motivo, actualizado) "
+                                  "VALUES (?, ?, ?, ?, ?)", (ruta, destino, h, motivo, time.time()))
+                self._con.execute("DELETE FROM archivos WHERE ruta = ?", (ruta,))
+            self._mover(os.path.join(self.root, ruta), os.path.join(self.root, destino))
+        self._restaurar(restaurar, actuales)
+        return len(cuarentenar), len(restaurar)
+
+    def _restaurar(self, rutas, actuales):
+        for ruta in rutas:
+            origen, destino = os.path.join(self.root, actuales[ruta]), os.path.join(self.root, ruta)
+            if os.path.exists(origen):
+                self._mover(origen, destino)
+            with self._lock, self._con:
+                fila = self._con.execute("SELECT hash FROM cuarentena WHERE ruta = ?", (ruta,)).fetchone()
+                self._con.execute("DELETE FROM cuarentena WHERE ruta = ?", (ruta,))
+                # vuelve a 'archivos' con su hash: puntajes() lo sigue viendo sin escanear el disco
+                if fila is not None and fila[0] is not None and os.path.exists(destino):
+                    st = os.stat(destino)
+                    self._con.execute("INSERT OR REPLACE INTO archivos (ruta, hash, mtime, bytes) "
+                                      "VALUES (?, ?, ?, ?)", (ruta, fila[0], st.st_mtime, st.st_size))
+
+    def restaurar_todo(self):
+        actuales = self.en_cuarentena()
+        self._restaurar(list(actuales), actuales)
+        return len(actuales)
+
+    def reconciliar(self):
+        """Filas de cuarentena cuyo movimiento no llegó a ocurrir (el archivo sigue en su lugar)."""
+        huerfanas = [r for r, d in self.en_cuarentena().items()
+                     if not os.path.exists(os.path.join(self.root, d)) and os.path.exists(os.path.join(self.root, r))]
+        with self._lock, self._con:
+            self._con.executemany("DELETE FROM cuarentena WHERE ruta = ?", [(r,) for r in huerfanas])
+        return len(huerfanas)
+
+    def cerrar(self):
+        with self._lock:
+            self._con.close()
+
+
+def restaurar_archivos(root=ROOT_DIR):
+    """Devuelve a su carpeta todo lo que está en cuarentena (y lo que quedó en /eliminados de antes de la bitácora)."""
+    if not os.path.exists(os.path.join(root, "eliminados")):
         print("❌ No existe la carpeta /eliminados.")
         return
 
-    total_restaurados = 0
-    for carpeta in os.listdir(ELIMINADOS_DIR):
-        carpeta_path = os.path.join(ELIMINADOS_DIR, carpeta)
+    with DepuradorRecortes(root) as depurador:
+        total_restaurados = depurador.restaurar_todo()
+
+    eliminados = os.path.join(root, "eliminados")
+    for carpeta in os.listdir(eliminados):
+        carpeta_path = os.path.join(eliminados, carpeta)
         if not os.path.isdir(carpeta_path):
             continue
 
-        destino_original = os.path.join(ROOT_DIR, carpeta)
+        destino_original = os.path.join(root, carpeta)
         os.makedirs(destino_original, exist_ok=True)
 
         for archivo in os.listdir(carpeta_path):
@@ -32,7 +324,52 @@ def restaurar_archivos():
                 print(f"⚠️ Error moviendo {archivo}: {e}")
 
     print(f"\n✅ Restauración completada. Total de archivos devueltos: {total_restaurados}")
-    print("Puedes ajustar el umbral en depurar_recortes.py y volver a ejecutar.")
+    print("Puedes ajustar los umbrales (--min-*, --max-border) y volver a ejecutar.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Puntúa recortes y pone en cuarentena los que no pasan los umbrales.")
+    parser.add_argument("--root", type=str, default=ROOT_DIR)
+    parser.add_argument("--processes", type=int, default=PROCESOS)
+    parser.add_argument("--min-ink", type=float, default=UMBRALES["tinta"][0])
+    parser.add_argument("--min-contrast", type=float, default=UMBRALES["contraste"][0])
+    parser.add_argument("--min-sharpness", type=float, default=UMBRALES["nitidez"][0])
+    parser.add_argument("--min-aspect", type=float, default=UMBRALES["aspecto"][0])
+    parser.add_argument("--max-border", type=float, default=UMBRALES["borde"][1])
+    parser.add_argument("--no-scan", action="store_true", help="Solo reclasifica desde la caché (sin mirar el disco).")
+    parser.add_argument("--dry-run", action="store_true", help="Informa sin mover archivos.")
+    parser.add_argument("--restore", action="store_true", help="Devuelve todo lo que está en cuarentena.")
+    args = parser.parse_args()
+
+    if args.restore:
+        restaurar_archivos(args.root)
+        return
+
+    umbrales = {"tinta": (args.min_ink, None), "contraste": (args.min_contrast, None),
+                "nitidez": (args.min_sharpness, None), "aspecto": (args.min_aspect, None),
+                "borde": (None, args.max_border)}
+    t0 = time.perf_counter()
+    with DepuradorRecortes(args.root) as depurador:
+        depurador.reconciliar()
+        if not args.no_scan:
+            hasheados, puntuados = depurador.sincronizar(args.processes)
+            print(f"🧮 {hasheados} archivos hasheados, {puntuados} puntuados (el resto desde caché)")
+        rutas, hashes, valores = depurador.puntajes()
+        motivos = clasificar(valores, umbrales)
+        cuarentenados, restaurados = depurador.aplicar(rutas, hashes, motivos, simular=args.dry_run)
+
+    rechazados = [m for m in motivos if m]
+    por_metrica = {}
+    for m in rechazados:
+        clave = m.split("<")[0].split(">")[0]
+        por_metrica[clave] = por_metrica.get(clave, 0) + 1
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"🧹 {len(rechazados)}/{len(rutas)} recortes bajo umbral"
+          + (f" ({', '.join(f'{k}: {n}' for k, n in sorted(por_metrica.items()))})" if por_metrica else "")
+          + f" en {ms:.0f} ms")
+    print(f"{'🔎 Simulación: se moverían' if args.dry_run else '📦'} {cuarentenados} a cuarentena, "
+          f"{restaurados} de vuelta a su carpeta")
+
 
 if __name__ == "__main__":
-    restaurar_archivos()
+    main()
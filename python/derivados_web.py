@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+derivados_web.py
+Derivados livianos de los recortes publicados (assets/recortes_web).
+
+- Por cada recorte y tamaño (lado máximo, nunca amplía) prueba WebP sin
+  pérdida, PNG optimizado (con paleta si la imagen tiene ≤ 256 colores, sin
+  pérdida) y el original, y se queda con el más chico.
+- Se generan en un pool de procesos y se cachean por hash del recorte +
+  parámetros en .cache/derivados_web/: republicar la misma selección no
+  vuelve a codificar nada.
+- Los derivados se publican (enlace duro desde la caché) en
+  assets/recortes_web_opt/<LETRA>/<nombre>.<lado>.<ext>, conservando la letra en
+  la posición 2 de la ruta como espera viscoso.
+- recortes_web_index.json apunta a la mejor variante de TAMANO_INDICE;
+  recortes_web_variantes.json lista todas las variantes por recorte (srcset).
+
+Uso:
+  python3 python/derivados_web.py                 # desde la raíz del proyecto
+  python3 python/derivados_web.py --sizes 80 160 320
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+# === CONFIGURACIÓN ===
+CARPETA_ORIGEN = "assets/recortes_web"
+CARPETA_DERIVADOS = "assets/recortes_web_opt"
+CARPETA_CACHE = ".cache/derivados_web"
+JSON_INDICE = "assets/recortes_web_index.json"
+JSON_VARIANTES = "assets/recortes_web_variantes.json"
+TAMANOS = (80, 160)            # viscoso dibuja a 80 px; 160 para pantallas 2×
+TAMANO_INDICE = 160
+PROCESOS = None                # None = os.cpu_count()
+VERSION = 1                    # subirla invalida la caché si cambia la codificación
+EXTENSIONES = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def hash_archivo(ruta):
+    with open(ruta, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def clave_cache(h, lado):
+    return f"{h}_{lado}_v{VERSION}"
+
+
+def _codificar(img):
+    """Candidatos sin pérdida: {ext: bytes}."""
+    candidatos = {}
+    buf = io.BytesIO()
+    img.save(buf, "WEBP", lossless=True, method=6)
+    candidatos[".webp"] = buf.getvalue()
+
+    png = img
+    if img.mode in ("RGB", "RGBA", "L", "LA") and img.getcolors(256) is not None:
+        # quantize no acepta LA: se cuantiza como RGBA (con el único método que admite alfa)
+        fuente = img.convert("RGBA") if img.mode == "LA" else img
+        png = fuente.quantize(colors=256, method=Image.Quantize.FASTOCTREE if fuente.mode == "RGBA"
+                              else Image.Quantize.MEDIANCUT)
+        if png.convert(fuente.mode).tobytes() != fuente.tobytes():
+            png = img  # la paleta no fue exacta: PNG normal
+    buf = io.BytesIO()
+    png.save(buf, "PNG", optimize=True)
+    candidatos[".png"] = buf.getvalue()
+    return candidatos
+
+
+def generar(args):
+    """Genera la mejor variante de un recorte a un lado máximo. Corre en un proceso del pool."""
+    ruta, h, lado, dir_cache = args
+    with Image.open(ruta) as img:
+        img.load()
+        original = img.size
+        if max(img.size) > lado:
+            img = img.copy()
+            img.thumbnail((lado, lado), Image.LANCZOS)
+        candidatos = _codificar(img)
+        if img.size == original:
+            with open(ruta, "rb") as f:
+                candidatos[os.path.splitext(ruta)[1].lower()] = f.read()
+        ext, datos = min(candidatos.items(), key=lambda kv: len(kv[1]))
+        ancho, alto = img.size
+    destino = os.path.join(dir_cache, h[:2], clave_cache(h, lado) + ext)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = destino + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(datos)
+    os.replace(tmp, destino)
+    return clave_cache(h, lado), {"archivo": destino, "ext": ext, "ancho": ancho, "alto": alto,
+                                  "bytes": len(datos)}
+
+
+def cargar_cache(dir_cache):
+    ruta = os.path.join(dir_cache, "manifiesto.json")
+    if os.path.exists(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return {k: v for k, v in cache.items() if os.path.exists(v["archivo"])}
+    return {}
+
+
+def guardar_json(ruta, datos, **kwargs):
+    """Escritura atómica; devuelve False si el contenido no cambió."""
+    contenido = json.dumps(datos, **kwargs)
+    if os.path.exists(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            if f.read() == contenido:
+                return False
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    os.replace(tmp, ruta)
+    return True
+
+
+def publicar(origen, destino):
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copy2(origen, destino)
+
+
+def generar_derivados(rutas, tamanos=TAMANOS, tamano_indice=TAMANO_INDICE, carpeta_origen=CARPETA_ORIGEN,
+                      carpeta_derivados=CARPETA_DERIVADOS, dir_cache=CARPETA_CACHE, procesos=PROCESOS):
+    """Genera/publica derivados de `rutas` (rutas web bajo carpeta_origen).
+
+    Devuelve (indice, variantes, stats): indice = [ruta de la mejor variante de
+    tamano_indice], variantes = {ruta original: {lado: {ruta, ancho, alto, bytes}}}.
+    """
+    tamanos = sorted(set(tamanos) | {tamano_indice})
+    cache = cargar_cache(dir_cache)
+    hashes = {r: hash_archivo(r) for r in rutas}
+    trabajos = [(r, h, lado, dir_cache) for r, h in hashes.items() for lado in tamanos
+                if clave_cache(h, lado) not in cache]
+    if trabajos:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            for clave, datos in pool.map(generar, trabajos, chunksize=16):
+                cache[clave] = datos
+        guardar_json(os.path.join(dir_cache, "manifiesto.json"), cache)
+
+    indice, variantes, objetivo = [], {}, set()
+    bytes_origen = bytes_indice = 0
+    for ruta, h in hashes.items():
+        relativa = os.path.relpath(ruta, carpeta_origen).replace("\\", "/")
+        base = os.path.splitext(relativa)[0]
+        variantes[ruta] = {}
+        previa = None
+        for lado in tamanos:
+            d = cache[clave_cache(h, lado)]
+            if previa is not None and (previa["ancho"], previa["alto"]) == (d["ancho"], d["alto"]):
+                variantes[ruta][lado] = previa  # recorte más chico que `lado`: misma variante
+                continue
+            web = f"{carpeta_derivados}/{base}.{lado}{d['ext']}"
+            objetivo.add(web)
+            previa = variantes[ruta][lado] = {"ruta": web, "ancho": d["ancho"], "alto": d["alto"],
+                                              "bytes": d["bytes"]}
+            if not os.path.exists(web) or os.path.getsize(web) != d["bytes"]:
+                os.makedirs(os.path.dirname(web), exist_ok=True)
+                if os.path.exists(web):
+                    os.remove(web)  # el recorte cambió de contenido bajo el mismo nombre
+                publicar(d["archivo"], web)
+        mejor = variantes[ruta][tamano_indice]
+        indice.append(mejor["ruta"])
+        bytes_origen += os.path.getsize(ruta)
+        bytes_indice += mejor["bytes"]
+
+    # derivados que ya no corresponden a la selección
+    eliminados = 0
+    if os.path.isdir(carpeta_derivados):
+        for raiz, _, archivos in os.walk(carpeta_derivados):
+            for nombre in archivos:
+                ruta = f"{raiz}/{nombre}".replace("\\", "/")
+                if ruta not in objetivo:
+                    os.remove(ruta)
+                    eliminados += 1
+
+    stats = {"codificados": len(trabajos), "eliminados": eliminados,
+             "bytes_origen": bytes_origen, "bytes_indice": bytes_indice}
+    return indice, variantes, stats
+
+
+def listar_origen(carpeta=CARPETA_ORIGEN):
+    rutas = []
+    with os.scandir(carpeta) as letras:
+        for letra in sorted((e for e in letras if e.is_dir()), key=lambda e: e.name):
+            with os.scandir(letra.path) as it:
+                rutas.extend(f"{carpeta}/{letra.name}/{e.name}" for e in sorted(it, key=lambda e: e.name)
+                             if e.is_file() and e.name.lower().endswith(EXTENSIONES))
+    return rutas
+
+
+def imprimir_resumen(stats):
+    antes, despues = stats["bytes_origen"], stats["bytes_indice"]
+    ahorro = 100 * (1 - despues / antes) if antes else 0
+    print(f"🪶 Derivados: {stats['codificados']} codificados, {stats['eliminados']} eliminados; "
+          f"peso del índice {antes / 1024:.0f} KB → {despues / 1024:.0f} KB ({ahorro:.0f}% menos)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera derivados web livianos de los recortes publicados.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(TAMANOS), help="Lados máximos en px.")
+    parser.add_argument("--index-size", type=int, default=TAMANO_INDICE, help="Variante a la que apunta el índice.")
+    parser.add_argument("--processes", type=int, default=PROCESOS)
+    args = parser.parse_args()
+
+    rutas = listar_origen()
+    indice, variantes, stats = generar_derivados(rutas, args.sizes, args.index_size, procesos=args.processes)
+    guardar_json(JSON_INDICE, indice, indent=2)
+    guardar_json(JSON_VARIANTES, variantes, indent=2, ensure_ascii=False)
+    imprimir_resumen(stats)
+    print(f"📄 Índice: {JSON_INDICE} · variantes: {JSON_VARIANTES}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+descargador.py
+Motor de descargas concurrentes compartido por los scrapers de afiches.
+
+- Mantiene N descargas en vuelo con un pool de hilos acotado.
+- Limita el ritmo por host con un token bucket (en vez de un sleep global).
+- Aplica backoff adaptativo ante 429/5xx: pausa exponencial (o Retry-After)
+  y baja la tasa del host; la recupera poco a poco con cada respuesta sana.
+- Reutiliza conexiones con una requests.Session por hilo.
+"""
+
+import hashlib
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from PIL import ImageFile
+from requests.adapters import HTTPAdapter
+
+# === CONFIGURACIÓN ===
+CONCURRENCIA = 8              # descargas simultáneas
+TASA_POR_HOST = 2.5           # solicitudes por segundo por host
+RAFAGA_POR_HOST = 4           # tokens acumulables por host
+TASA_MINIMA = 0.2             # piso de la tasa tras varios 429/5xx
+REINTENTOS = 3                # reintentos ante 429/5xx o errores de red
+BACKOFF_BASE = 1.0            # segundos de la primera pausa
+BACKOFF_MAX = 60.0            # pausa máxima por host
+TIMEOUT = 12
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+CHUNK_BYTES = 16 * 1024
+MAX_BYTES_CABECERA = 512 * 1024  # sin dimensiones tras esto → no es una imagen legible
+CONTENT_TYPES_GENERICOS = {"application/octet-stream", "binary/octet-stream"}
+
+
+# === LIMITADOR ===
+class TokenBucket:
+    """Token bucket con tasa adaptable y pausas forzadas (backoff)."""
+
+    def __init__(self, tasa=TASA_POR_HOST, rafaga=RAFAGA_POR_HOST):
+        self.tasa_inicial = tasa
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self._tokens = float(rafaga)
+        self._ultimo = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._fallos = 0
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        """Bloquea hasta obtener un token."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                if ahora < self._pausa_hasta:
+                    espera = self._pausa_hasta - ahora
+                else:
+                    self._tokens = min(self.rafaga, self._tokens + (ahora - self._ultimo) * self.tasa)
+                    self._ultimo = ahora
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    espera = (1 - self._tokens) / self.tasa
+            time.sleep(espera)
+
+    def frenar(self, retry_after=None):
+        """Registra un 429/5xx: pausa el host y reduce su tasa a la mitad."""
+        with self._lock:
+            self._fallos += 1
+            if retry_after is None:
+                pausa = BACKOFF_BASE * (2 ** (self._fallos - 1)) * random.uniform(0.8, 1.2)
+            else:
+                pausa = retry_after
+            pausa = min(BACKOFF_MAX, pausa)
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + pausa)
+            self.tasa = max(TASA_MINIMA, self.tasa / 2)
+            self._tokens = 0.0
+            return pausa
+
+    def recuperar(self):
+        """Respuesta sana: olvida los fallos y sube la tasa de forma aditiva."""
+        with self._lock:
+            self._fallos = 0
+            self.tasa = min(self.tasa_inicial, self.tasa + self.tasa_inicial * 0.1)
+
+
+def host_de(url):
+    return urlsplit(url).netloc.lower()
+
+
+def leer_retry_after(valor):
+    """Interpreta Retry-After (segundos o fecha HTTP); None si no aplica."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+# === DESCARGADOR ===
+class Descargador:
+    """Pool de descargas con token bucket por host y backoff adaptativo."""
+
+    def __init__(self, concurrencia=CONCURRENCIA, tasa_por_host=TASA_POR_HOST,
+                 rafaga_por_host=RAFAGA_POR_HOST, headers=None, timeout=TIMEOUT,
+                 reintentos=REINTENTOS):
+        self.concurrencia = max(1, int(concurrencia))
+        self.tasa_por_host = tasa_por_host
+        self.rafaga_por_host = rafaga_por_host
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        self._local = threading.local()
+        self._sesiones = []
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrencia)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def bucket(self, url):
+        host = host_de(url)
+        with self._buckets_lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.tasa_por_host, self.rafaga_por_host)
+            return self._buckets[host]
+
+    def sesion(self):
+        """Session por hilo (requests.Session no es thread-safe)."""
+        s = getattr(self._local, "sesion", None)
+        if s is None:
+            s = requests.Session()
+            s.headers.update(self.headers)
+            adaptador = HTTPAdapter(pool_connections=self.concurrencia, pool_maxsize=self.concurrencia)
+            s.mount("http://", adaptador)
+            s.mount("https://", adaptador)
+            self._local.sesion = s
+            with self._buckets_lock:
+                self._sesiones.append(s)
+        return s
+
+    def get(self, url, **kwargs):
+        """GET respetando el ritmo del host; reintenta 429/5xx y errores de red.
+        Devuelve la última respuesta (o None si nunca hubo respuesta)."""
+        bucket = self.bucket(url)
+        kwargs.setdefault("timeout", self.timeout)
+        respuesta = None
+        for intento in range(self.reintentos + 1):
+            bucket.adquirir()
+            try:
+                respuesta = self.sesion().get(url, **kwargs)
+            except requests.RequestException:
+                respuesta = None
+                if intento < self.reintentos:
+                    bucket.frenar()
+                continue
+            if respuesta.status_code not in ESTADOS_REINTENTABLES:
+                bucket.recuperar()
+                return respuesta
+            if intento < self.reintentos:
+                bucket.frenar(leer_retry_after(respuesta.headers.get("Retry-After")))
+                respuesta.close()
+        return respuesta
+
+    def mapear(self, funcion, items):
+        """Ejecuta funcion(item) en el pool; entrega resultados según terminan."""
+        futuros = [self._pool.submit(funcion, item) for item in items]
+        for futuro in as_completed(futuros):
+            yield futuro.result()
+
+    def enviar(self, funcion, *args, **kwargs):
+        return self._pool.submit(funcion, *args, **kwargs)
+
+    def cerrar(self):
+        self._pool.shutdown(wait=True)
+        for s in self._sesiones:
+            s.close()
+
+
+# === DESCARGA EN STREAMING ===
+def content_type_ok(content_type):
+    """Acepta image/* y tipos genéricos; sin cabecera se decide por el contenido."""
+    if not content_type:
+        return True
+    ct = content_type.split(";")[0].strip().lower()
+    return ct.startswith("image/") or ct in CONTENT_TYPES_GENERICOS
+
+
+def stream_image(cliente, url, out_dir, min_w=0, min_h=0, headers=None, timeout=None):
+    """Descarga en streaming a un temporal de out_dir, validando sobre la marcha.
+
+    `cliente` es una requests.Session o un Descargador (ritmo por host + backoff).
+    `timeout` (conexión y entre bloques) por defecto es el del Descargador, o
+    TIMEOUT si el cliente es una sesión simple.
+    Se corta la transferencia apenas el Content-Type o las dimensiones de la
+    cabecera (PIL ImageFile.Parser) descalifican la imagen; el MD5 se calcula
+    incrementalmente.
+
+    Devuelve {"ok", "motivo", "status", "bytes", "hash", "tmp"}; si ok es False
+    la transferencia se cortó y no queda temporal en disco.
+    """
+    res = {"ok": False, "motivo": None, "status": None, "bytes": 0, "hash": None, "tmp": None}
+    if timeout is None:
+        timeout = getattr(cliente, "timeout", TIMEOUT)
+    r = cliente.get(url, headers=headers, stream=True, timeout=timeout)
+    if r is None:
+        raise requests.ConnectionError(f"sin respuesta: {url}")
+    with r:
+        res["status"] = r.status_code
+        if not r.ok:
+            res["motivo"] = "http"
+            return res
+        if not content_type_ok(r.headers.get("Content-Type")):
+            res["motivo"] = "content_type"
+            return res
+
+        parser = ImageFile.Parser()
+        dims = None
+        md5 = hashlib.md5()
+        tmp = tempfile.NamedTemporaryFile(dir=out_dir, prefix=".parcial-", delete=False)
+        try:
+            with tmp:
+                for chunk in r.iter_content(CHUNK_BYTES):
+                    if not chunk:
+                        continue
+                    res["bytes"] += len(chunk)
+                    md5.update(chunk)
+                    tmp.write(chunk)
+                    if dims is None:
+                        try:
+                            parser.feed(chunk)
+                        except Exception:
+                            res["motivo"] = "formato"
+                            break
+                        if parser.image is not None:
+                            dims = parser.image.size
+                            if dims[0] < min_w or dims[1] < min_h:
+                                res["motivo"] = "pequena"
+                                break
+                        elif res["bytes"] > MAX_BYTES_CABECERA:
+                            res["motivo"] = "formato"
+                            break
+            if res["motivo"] is None and res["bytes"] == 0:
+                res["motivo"] = "vacia"
+            elif res["motivo"] is None and dims is None:
+                res["motivo"] = "formato"
+        except Exception:
+            os.unlink(tmp.name)
+            raise
+        if res["motivo"] is not None:
+            os.unlink(tmp.name)
+            return res
+    res.update(ok=True, hash=md5.hexdigest(), tmp=Path(tmp.name))
+    return res
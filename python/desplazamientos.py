@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+desplazamientos.py
+Kernels de desplazamiento para los efectos ondas/glitch, sin bucles por fila.
+
+- desplazar_filas / desplazar_columnas: cada fila (o columna) rota en su eje
+  con semántica de np.roll, todas en una sola indexación (take_along_axis).
+- desplazar_2d: campo de desplazamiento (dx, dy) por píxel, con vuelta en los
+  bordes; usa cv2.remap si OpenCV está instalado, si no indexación avanzada.
+- Todas aceptan arreglos (..., H, W): un módulo, una pila N×H×W de módulos o
+  un lienzo completo. Con canales=True el último eje es de color (..., H, W, C).
+- ondas() y glitch() arman los desplazamientos como los efectos originales:
+  int(amp·sin(2π·y·freq)) por fila, y filas al azar que se acumulan si se
+  repiten (dos np.roll sobre la misma fila suman sus desplazamientos).
+
+Uso:
+  from desplazamientos import desplazar_filas, ondas
+  arr = desplazar_filas(arr, ondas(arr.shape[0], amp=8, freq=0.05))
+"""
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # opcional: sin OpenCV, desplazar_2d usa indexación avanzada
+    cv2 = None
+
+
+def _ejes(arr, canales):
+    """(eje de filas, eje de columnas) según haya o no eje de color al final."""
+    return (-3, -2) if canales else (-2, -1)
+
+
+def _tomar(arr, idx, eje, canales):
+    """take_along_axis difundiendo arr e idx (..., H, W) entre sí."""
+    if canales:
+        idx = idx[..., None]
+    forma = np.broadcast_shapes(arr.shape, idx.shape)
+    return np.take_along_axis(np.broadcast_to(arr, forma), np.broadcast_to(idx, forma), axis=eje)
+
+
+def desplazar_filas(arr, desp, canales=False):
+    """Rota cada fila y en `desp[..., y]` píxeles (positivo → derecha), como np.roll por fila.
+    desp tiene forma (..., H) y se difunde contra los ejes iniciales de arr."""
+    arr = np.asarray(arr)
+    ey, ex = _ejes(arr, canales)
+    w = arr.shape[ex]
+    desp = np.asarray(desp, dtype=np.intp)
+    idx = (np.arange(w) - desp[..., :, None]) % w            # (..., H, W)
+    return _tomar(arr, idx, ex, canales)
+
+
+def desplazar_columnas(arr, desp, canales=False):
+    """Rota cada columna x en `desp[..., x]` píxeles (positivo → abajo). desp tiene forma (..., W)."""
+    arr = np.asarray(arr)
+    ey, ex = _ejes(arr, canales)
+    h = arr.shape[ey]
+    desp = np.asarray(desp, dtype=np.intp)
+    idx = (np.arange(h)[:, None] - desp[..., None, :]) % h   # (..., H, W)
+    return _tomar(arr, idx, ey, canales)
+
+
+def desplazar_2d(arr, dx, dy, canales=False):
+    """out[y, x] = arr[(y - dy) % H, (x - dx) % W] para campos dx, dy (H×W, redondeados a entero)."""
+    arr = np.asarray(arr)
+    ey, ex = _ejes(arr, canales)
+    h, w = arr.shape[ey], arr.shape[ex]
+    dx = np.rint(np.broadcast_to(dx, (h, w))).astype(np.intp)
+    dy = np.rint(np.broadcast_to(dy, (h, w))).astype(np.intp)
+    fy = (np.arange(h)[:, None] - dy) % h
+    fx = (np.arange(w)[None, :] - dx) % w
+    if cv2 is not None and (arr.ndim == 2 or (canales and arr.ndim == 3 and arr.shape[-1] <= 4)):
+        return cv2.remap(arr, fx.astype(np.float32), fy.astype(np.float32),
+                         interpolation=cv2.INTER_NEAREST, borderMode=cv2.BORDER_WRAP)
+    return arr[..., fy, fx, :] if canales else arr[..., fy, fx]
+
+
+def ondas(n, amp, freq, fase=0.0):
+    """Desplazamientos enteros int(amp·sin(2π·i·freq + fase)) para i en 0..n-1.
+    amp/freq/fase pueden ser arreglos (N,) para una pila: el resultado es (N, n)."""
+    i = np.arange(n)
+    amp, freq, fase = (np.asarray(v, dtype=np.float64)[..., None] for v in (amp, freq, fase))
+    return np.trunc(amp * np.sin(2 * np.pi * i * freq + fase)).astype(np.intp)
+
+
+def glitch(n, filas, desp):
+    """Desplazamiento por fila para un glitch: cada fila elegida suma su desplazamiento."""
+    out = np.zeros(n, dtype=np.intp)
+    np.add.at(out, np.asarray(filas, dtype=np.intp), np.asarray(desp, dtype=np.intp))
+    return out
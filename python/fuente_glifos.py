@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fuente_glifos.py
+Fuente de glifos generados con decodificación por lotes y prefetch.
+
+- Cada letra tiene un búfer circular (deque con tope) de glifos listos,
+  uint8 64×64. Pedir un glifo es sacar uno del búfer.
+- Los búferes se rellenan decodificando LOTE latentes en una sola llamada al
+  decoder, en un hilo de fondo que despierta cuando alguno baja de `minimo`.
+  Solo se rellenan las letras que ya se pidieron: un decoder se sigue cargando
+  recién cuando hace falta (registro_modelos).
+- Si el búfer de la letra pedida está vacío, el lote se decodifica en el hilo
+  que pide (la primera vez, o si el consumo supera al prefetch).
+
+Uso:
+  from fuente_glifos import FuenteGlifos
+  GLIFOS = FuenteGlifos(MODELOS_DECODER)
+  letra, glifo = GLIFOS.siguiente()        # None si ningún decoder sirve
+"""
+
+import random
+import threading
+from collections import deque
+
+import numpy as np
+
+from registro_modelos import IMG_SIZE, LATENT_DIM, decodificar
+
+# === CONFIGURACIÓN ===
+LOTE = 256                    # latentes por llamada al decoder
+CAPACIDAD = 2 * LOTE          # glifos listos por letra, como máximo
+
+
+class FuenteGlifos:
+    """Glifos generados por letra, decodificados de a lotes y precargados en segundo plano."""
+
+    def __init__(self, registro, lote=LOTE, capacidad=CAPACIDAD, minimo=None,
+                 latent_dim=LATENT_DIM, lado=IMG_SIZE, semilla=None):
+        self.registro = registro
+        self.lote = lote
+        self.capacidad = max(capacidad, lote)
+        self.minimo = lote // 2 if minimo is None else minimo
+        self.latent_dim = latent_dim
+        self.lado = lado
+        self._rng = np.random.default_rng(semilla)
+        self._buferes = {}            # letra → deque de glifos
+        self._pedidas = set()         # letras que el hilo mantiene llenas
+        self._cond = threading.Condition()
+        self._hilo = None
+        self._activo = False
+        self.lotes = 0
+
+    # --- decodificación ---
+    def _decodificar(self, letra):
+        """Decodifica un lote de la letra y lo agrega a su búfer. Devuelve cuántos glifos agregó."""
+        modelo = self.registro.obtener(letra)
+        if modelo is None:
+            with self._cond:
+                self._pedidas.discard(letra)
+            return 0
+        with self._cond:
+            z = self._rng.standard_normal((self.lote, self.latent_dim), dtype=np.float32)
+        try:
+            glifos = decodificar(modelo, z, self.lado)
+        except Exception as e:
+            print(f"⚠️ Error al decodificar lote de {letra}: {e}")
+            with self._cond:
+                self._pedidas.discard(letra)
+            return 0
+        with self._cond:
+            self._buferes.setdefault(letra, deque(maxlen=self.capacidad)).extend(glifos)
+            self.lotes += 1
+        return len(glifos)
+
+    def _pendientes(self):
+        return [l for l in self._pedidas if len(self._buferes.get(l, ())) < self.minimo]
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                while self._activo and not self._pendientes():
+                    self._cond.wait()
+                if not self._activo:
+                    return
+                pendientes = self._pendientes()
+            for letra in pendientes:
+                self._decodificar(letra)
+
+    def _iniciar(self):
+        if self._hilo is None:
+            self._activo = True
+            self._hilo = threading.Thread(target=self._bucle, name="fuente_glifos", daemon=True)
+            self._hilo.start()
+
+    # --- consumo ---
+    def _tomar(self, letra):
+        """Saca un glifo del búfer de la letra (y la marca como pedida); None si está vacío."""
+        with self._cond:
+            self._pedidas.add(letra)
+            bufer = self._buferes.get(letra)
+            if not bufer:
+                return None
+            glifo = bufer.popleft()
+            if len(bufer) < self.minimo:
+                self._cond.notify()
+            return glifo
+
+    def siguiente(self, letra=None, rng=random):
+        """(letra, glifo uint8 lado×lado) de la letra indicada o de una al azar. Sin letra
+        indicada prueba otras si un decoder falla, como registro.aleatorio(); None si
+        ninguno sirve."""
+        if letra:
+            candidatas = [letra.upper()]
+        else:
+            candidatas = self.registro.letras()
+            rng.shuffle(candidatas)
+        if not candidatas:
+            return None
+        self._iniciar()
+        for letra in candidatas:
+            glifo = self._tomar(letra)
+            if glifo is None and self._decodificar(letra):
+                glifo = self._tomar(letra)
+            if glifo is not None:
+                return letra, glifo
+        return None
+
+    def llenar(self, letras=None):
+        """Decodifica de antemano un lote para cada letra (todas por defecto)."""
+        for letra in letras or self.registro.letras():
+            with self._cond:
+                self._pedidas.add(letra)
+            if len(self._buferes.get(letra, ())) < self.minimo:
+                self._decodificar(letra)
+
+    def cerrar(self):
+        with self._cond:
+            self._activo = False
+            self._cond.notify_all()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
@@ -11,16 +11,16 @@ Exporta:
 """
 
 import os, math, random, numpy as np
-from collections import defaultdict
 from PIL import Image, ImageOps, ImageEnhance, ImageDraw, ImageFilter
 
-# --- (opcional) soporte de decoders Keras 3 (SavedModel -> TFSMLayer) ---
-try:
-    import tensorflow as tf  # noqa
-    from keras.layers import TFSMLayer
-    KERAS_OK = True
-except Exception:
-    KERAS_OK = False
+from desplazamientos import desplazar_filas, glitch, ondas
+from modulos_recortes import ProveedorModulos
+from motor_composicion import Lienzo
+from paletas_recortes import cargar_paletas
+from ruido_gradiente import RuidoGradiente, uniformizar
+# --- (opcional) decoders Keras 3 (SavedModel -> TFSMLayer), cargados al primer uso ---
+from fuente_glifos import FuenteGlifos
+from registro_modelos import PaletasPerezosas, RegistroDecoders
 
 # =========================
 # Rutas / tamaños / control
@@ -39,6 +39,7 @@ IMG_SIZE   = 64        # módulo base
 LATENT_DIM = 64
 COMPOSICIONES_POR_CORRIDA = 10
 MODO_FIJO = None       # "trama" | "ondas" | "duotono" | "topologico" | "modular" | "organico" | "textura_tipografica" | None
+PRECARGAR_MODELOS = False  # True: carga y calienta todos los decoders antes de la primera composición
 
 # Rango de tiles por modo
 TRAMA_TILE   = (18, 44)
@@ -49,6 +50,9 @@ MODU_TILE    = (28, 64)
 ORGA_TILE    = (24, 50)
 # Escala libre para “textura_tipografica”
 ESCALA_VARIACION = (0.4, 4.5)
+# Campo de flujo (topologico): resolución y margen fuera del lienzo, en px
+PASO_CAMPO   = 8
+MARGEN_CAMPO = 1200
 
 # =========================
 # Utilidades de color / paletas
@@ -62,79 +66,36 @@ def random_duotono():
     return clamp_color_tuple(tuple(c1)), clamp_color_tuple(tuple(c2))
 
 def extraer_paletas():
-    """Paletas por carpeta de /recortes_letras (para modular color)."""
-    paletas = defaultdict(list)
-    if not os.path.exists(LETRAS_DIR): return paletas
-    for carpeta in os.listdir(LETRAS_DIR):
-        ruta = os.path.join(LETRAS_DIR, carpeta)
-        if not os.path.isdir(ruta): continue
-        archivos = [f for f in os.listdir(ruta) if f.lower().endswith((".png", ".jpg", ".jpeg"))]
-        if not archivos: continue
-        colores = []
-        for archivo in random.sample(archivos, min(5, len(archivos))):
-            try:
-                img = Image.open(os.path.join(ruta, archivo)).convert("RGB")
-                arr = np.array(img.resize((32, 32))).reshape(-1, 3)
-                k = 12 if len(arr) >= 12 else len(arr)
-                muestras = arr[np.random.choice(len(arr), k, replace=False)]
-                for c in muestras:
-                    colores.append(clamp_color_tuple(c))
-            except Exception:
-                pass
-        if colores:
-            paletas[carpeta] = colores
-    print(f"🎨 Paletas cromáticas generadas para {len(paletas)} carpetas.")
+    """Paletas por carpeta de /recortes_letras (para modular color), desde el índice persistente."""
+    paletas = cargar_paletas(LETRAS_DIR)
+    print(f"🎨 Paletas cromáticas cargadas para {len(paletas)} carpetas.")
     return paletas
 
-PALETAS = extraer_paletas()
+PALETAS = PaletasPerezosas(extraer_paletas)
 
 # =========================
 # Carga de decoders (opcional)
 # =========================
 def cargar_todos_los_modelos():
-    if not (KERAS_OK and os.path.exists(MODELOS_DIR)): return {}
-    modelos = {}
-    for carpeta in sorted(os.listdir(MODELOS_DIR)):
-        if not carpeta.startswith("decoder_"): continue
-        letra = carpeta.split("_")[-1].upper()
-        ruta = os.path.join(MODELOS_DIR, carpeta)
-        try:
-            print(f"🧠 Cargando modelo {letra} desde {ruta}")
-            modelos[letra] = TFSMLayer(ruta, call_endpoint="serving_default")
-        except Exception as e:
-            print(f"⚠️ No se pudo cargar {letra}: {e}")
-    print(f"✅ {len(modelos)} modelos cargados.")
-    return modelos
+    """Registro perezoso: TensorFlow se importa y cada decoder se carga cuando se pide."""
+    return RegistroDecoders(MODELOS_DIR, latent_dim=LATENT_DIM)
 
 MODELOS_DECODER = cargar_todos_los_modelos()
+GLIFOS_GENERADOS = FuenteGlifos(MODELOS_DECODER, latent_dim=LATENT_DIM, lado=IMG_SIZE)  # lotes + prefetch
 
 # =========================
 # Módulos (recortes/generados)
 # =========================
+MODULOS = ProveedorModulos(LETRAS_DIR)  # listado una vez + LRU de módulos decodificados
+
 def obtener_modulo_desde_recortes():
-    if not os.path.exists(LETRAS_DIR): return None
-    carpetas = [c for c in os.listdir(LETRAS_DIR) if os.path.isdir(os.path.join(LETRAS_DIR, c))]
-    if not carpetas: return None
-    carpeta = random.choice(carpetas)
-    ruta = os.path.join(LETRAS_DIR, carpeta)
-    pngs = [f for f in os.listdir(ruta) if f.lower().endswith(".png")]
-    if not pngs: return None
-    try:
-        return Image.open(os.path.join(ruta, random.choice(pngs))).convert("L")
-    except Exception:
-        return None
+    elegido = MODULOS.aleatorio()
+    return elegido[0] if elegido else None
 
 def obtener_modulo_generado():
-    if not MODELOS_DECODER: return None
-    modelo = random.choice(list(MODELOS_DECODER.values()))
-    z = np.random.normal(size=(1, LATENT_DIM)).astype(np.float32)
-    try:
-        out = modelo(z, training=False)
-        if isinstance(out, dict): out = list(out.values())[0]
-        arr = np.clip(out.numpy()[0] * 255, 0, 255).astype(np.uint8).reshape(IMG_SIZE, IMG_SIZE)
-        return Image.fromarray(arr, mode="L")
-    except Exception:
-        return None
+    elegido = GLIFOS_GENERADOS.siguiente() if MODELOS_DECODER else None
+    if elegido is None: return None
+    return Image.fromarray(elegido[1], mode="L")
 
 def obtener_modulo():
     """Letra L (grayscale), tamaño libre (no se normaliza aquí)."""
@@ -154,23 +115,18 @@ def fx_halftone(img, block=4):
 
 def fx_ondas(img):
     arr = np.array(img)
-    h, w = arr.shape[:2]
-    nueva = np.zeros_like(arr)
     freq = random.uniform(0.02, 0.08)
     amp  = random.randint(4, 15)
-    for y in range(h):
-        shift = int(amp * math.sin(2 * math.pi * y * freq))
-        nueva[y] = np.roll(arr[y], shift, axis=0)
-    return Image.fromarray(nueva)
+    return Image.fromarray(desplazar_filas(arr, ondas(arr.shape[0], amp, freq), canales=arr.ndim == 3))
 
 def fx_glitch(img):
     arr = np.array(img)
-    h, w = arr.shape[:2]
+    h = arr.shape[0]
+    filas, desp = [], []
     for _ in range(random.randint(4, 12)):
-        y = random.randint(0, h - 1)
-        shift = random.randint(-18, 18)
-        arr[y] = np.roll(arr[y], shift, axis=0)
-    return Image.fromarray(arr)
+        filas.append(random.randint(0, h - 1))
+        desp.append(random.randint(-18, 18))
+    return Image.fromarray(desplazar_filas(arr, glitch(h, filas, desp), canales=arr.ndim == 3))
 
 def ajustar_L(imgL):
     """Aleatorización ligera sobre la forma en L."""
@@ -194,20 +150,16 @@ def colorizar_paleta(imgL, paleta):
 # =========================
 # Helpers
 # =========================
-def paste_modulo_alpha(lienzo_rgba, modRGBA, modL, x, y):
-    mask = modL.convert("L").point(lambda p: 255 if p > 128 else 0)
-    # aseguremos alfa de módulo según máscara (respetando alfa propio)
-    A = mask
-    m = modRGBA.copy()
-    m.putalpha(A)
-    lienzo_rgba.alpha_composite(m, (x, y))
-
-def perlin2(x, y, seed=0):
-    """Ruido pseudo-Perlin 2D simple reproducible."""
-    xi = int(x * 73856093)
-    yi = int(y * 19349663)
-    random.seed(xi ^ yi ^ int(seed))
-    return random.uniform(-1.0, 1.0)
+def paste_modulo_alpha(lienzo, modRGBA, modL, x, y):
+    """Estampa el módulo con alfa binaria (modL > 128) en el lienzo NumPy; mismo resultado
+    que putalpha + alpha_composite."""
+    lienzo.estampar(np.asarray(modRGBA.convert("RGBA")), x, y, mascara=np.asarray(modL.convert("L")) > 128)
+
+def muestrear_campo(campo, x, y, margen=MARGEN_CAMPO, paso=PASO_CAMPO):
+    """Valor del campo precalculado en el píxel (x, y) del lienzo (fuera del margen: el borde)."""
+    j = min(max(int((y + margen) // paso), 0), campo.shape[0] - 1)
+    i = min(max(int((x + margen) // paso), 0), campo.shape[1] - 1)
+    return float(campo[j, i])
 
 # =========================
 # Modos
@@ -304,12 +256,15 @@ def modo_topologico(lienzo_rgba, paletas):
     trayectas = random.randint(16, 36)
     paleta_global = random.choice(list(paletas.values())) if paletas else None
     seed = random.randint(0, 10000)
+    # campo de flujo de todo el lienzo (más margen) en una sola evaluación
+    campo = RuidoGradiente(seed).grilla(ANCHO_PX + 2*MARGEN_CAMPO, ALTO_PX + 2*MARGEN_CAMPO, 1/80.0,
+                                        origen=(-MARGEN_CAMPO, -MARGEN_CAMPO), paso=PASO_CAMPO, octavas=2)
 
     for _ in range(trayectas):
         x, y = random.randint(0, ANCHO_PX), random.randint(0, ALTO_PX)
         ang = random.uniform(0, math.pi*2)
         for s in range(pasos_por_trayecta):
-            v = perlin2((x+s*3)/80.0, (y+s*3)/80.0, seed=seed)
+            v = muestrear_campo(campo, x+s*3, y+s*3)
             ang += v * 0.8
             step = tile * random.uniform(0.6, 1.2)
             x += int(math.cos(ang) * step)
@@ -377,12 +332,15 @@ def modo_organico(lienzo_rgba, paletas):
     seed = random.randint(0, 10000)
     th   = random.uniform(-0.15, 0.25)
     warp = random.uniform(60.0, 120.0)
+    # máscara orgánica: una evaluación para toda la grilla de celdas, uniformizada
+    # para que th deje (1 - th)/2 de las celdas (37–57 %), como con el ruido anterior
+    mascara = uniformizar(RuidoGradiente(seed).grilla(cols*tile, rows*tile, 1/warp, origen=(200, -150),
+                                                      paso=tile, octavas=3))
 
     for j in range(rows):
         for i in range(cols):
             x, y = i*tile, j*tile
-            v = perlin2((x+200)/warp, (y-150)/warp, seed=seed)
-            if v < th: continue
+            if mascara[j, i] < th: continue
             modL = ajustar_L(obtener_modulo() or Image.new("L", (IMG_SIZE, IMG_SIZE), 255))
             size = int(tile * random.uniform(0.8, 1.2))
             modL = modL.resize((size, size), Image.LANCZOS)
@@ -393,7 +351,7 @@ def modo_organico(lienzo_rgba, paletas):
                 modL    = modL.rotate(ang,   expand=True)
             paste_modulo_alpha(lienzo_rgba, modRGBA, modL, x, y)
 
-def modo_textura_tipografica(lienzo_rgba):
+def modo_textura_tipografica(lienzo):
     color_a, color_b = random_duotono()
     n_letras  = random.randint(180, 420)
     base_scale= random.uniform(0.8, 2.2)
@@ -413,15 +371,15 @@ def modo_textura_tipografica(lienzo_rgba):
         x = random.randint(-int(size*0.8), ANCHO_PX - int(size*0.2))
         y = random.randint(-int(size*0.8), ALTO_PX  - int(size*0.2))
         alpha = random.randint(100, 255)
-        letraRGBA.putalpha(alpha)
-        lienzo_rgba.alpha_composite(letraRGBA, (x, y))
+        lienzo.estampar(np.asarray(letraRGBA), x, y, alfa=alpha)
 
-    # postprocesos suaves
+    # postprocesos suaves (sobre la imagen PIL)
+    img = None
     if random.random() < 0.30:
-        lienzo_rgba = lienzo_rgba.filter(ImageFilter.GaussianBlur(radius=random.uniform(0.5, 2.0)))
+        img = lienzo.imagen().filter(ImageFilter.GaussianBlur(radius=random.uniform(0.5, 2.0)))
     if random.random() < 0.30:
-        lienzo_rgba = ImageOps.posterize(lienzo_rgba.convert("RGB"), bits=random.choice([2,3,4])).convert("RGBA")
-    return lienzo_rgba
+        img = ImageOps.posterize((img or lienzo.imagen()).convert("RGB"), bits=random.choice([2,3,4])).convert("RGBA")
+    return lienzo if img is None else Lienzo.desde_imagen(img)
 
 # =========================
 # Ensamblado por composición
@@ -439,7 +397,7 @@ def efectos_globales_rgba(img_rgba):
     return out
 
 def generar_composicion():
-    lienzo = Image.new("RGBA", (ANCHO_PX, ALTO_PX), (0,0,0,0))
+    lienzo = Lienzo(ANCHO_PX, ALTO_PX)
     modo = MODO_FIJO or random.choice(
         ["trama", "ondas", "duotono", "topologico", "modular", "organico", "textura_tipografica"]
     )
@@ -451,14 +409,16 @@ def generar_composicion():
     elif modo == "organico":            modo_organico(lienzo, PALETAS)
     elif modo == "textura_tipografica": lienzo = modo_textura_tipografica(lienzo)
 
-    lienzo = efectos_globales_rgba(lienzo)
-    return lienzo
+    return efectos_globales_rgba(lienzo.imagen())
 
 # =========================
 # Exportación (PNG transparente)
 # =========================
 def exportar_composiciones(n=COMPOSICIONES_POR_CORRIDA):
     os.makedirs(SALIDA_DIR, exist_ok=True)
+    if PRECARGAR_MODELOS:
+        MODELOS_DECODER.precargar()
+        GLIFOS_GENERADOS.llenar()
     existentes = [f for f in os.listdir(SALIDA_DIR) if f.lower().startswith("composicion_")]
     nums = []
     for nm in existentes:
@@ -8,7 +8,6 @@ Versión: experimental + efectos ópticos + paletas cromáticas
 import os
 import random
 import numpy as np
-from collections import defaultdict
 from PIL import (
     Image,
     ImageOps,
@@ -17,8 +16,12 @@ from PIL import (
     ImageChops,
     ImageFilter
 )
-import tensorflow as tf
-from keras.layers import TFSMLayer
+from desplazamientos import desplazar_filas, glitch, ondas
+from fuente_glifos import FuenteGlifos
+from modulos_recortes import ProveedorModulos
+from paletas_recortes import cargar_paletas
+from registro_modelos import PaletasPerezosas, RegistroDecoders
+from texturas import CacheTexturas
 
 # === CONFIGURACIÓN GENERAL ===
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -34,93 +37,48 @@ ANCHO_PX = int(ANCHO_CM / 2.54 * DPI)
 ALTO_PX = int(ALTO_CM / 2.54 * DPI)
 
 MODO_EXPERIMENTAL = True  # 🔥 ACTIVADO por defecto
+PRECARGAR_MODELOS = False  # True: carga y calienta los 26 decoders antes de la primera composición
 
 
 # === CARGA DE MODELOS ===
 def cargar_todos_los_modelos():
-    modelos = {}
-    for carpeta in sorted(os.listdir(MODELOS_DIR)):
-        if carpeta.startswith("decoder_"):
-            letra = carpeta.split("_")[-1].upper()
-            ruta_modelo = os.path.join(MODELOS_DIR, carpeta)
-            try:
-                print(f"🧠 Cargando modelo para letra {letra} desde {ruta_modelo}")
-                modelos[letra] = TFSMLayer(ruta_modelo, call_endpoint="serving_default")
-            except Exception as e:
-                print(f"⚠️ No se pudo cargar modelo {letra}: {e}")
-    print(f"✅ {len(modelos)} modelos cargados correctamente.")
-    return modelos
+    """Registro de decoders: cada uno se carga (y calienta) la primera vez que se usa."""
+    return RegistroDecoders(MODELOS_DIR, latent_dim=LATENT_DIM)
 
 
 MODELOS_DECODER = cargar_todos_los_modelos()
+GLIFOS_GENERADOS = FuenteGlifos(MODELOS_DECODER, latent_dim=LATENT_DIM, lado=IMG_SIZE)
 
 
 # === SISTEMA DE PALETAS CROMÁTICAS ===
 def extraer_paletas():
-    """Analiza las carpetas de recortes y obtiene colores dominantes por serie."""
-    paletas = defaultdict(list)
-    if not os.path.exists(LETRAS_DIR):
-        return paletas
-
-    for carpeta in os.listdir(LETRAS_DIR):
-        ruta_carpeta = os.path.join(LETRAS_DIR, carpeta)
-        if not os.path.isdir(ruta_carpeta):
-            continue
-
-        colores = []
-        archivos = [f for f in os.listdir(ruta_carpeta) if f.lower().endswith((".png", ".jpg", ".jpeg"))]
-        for archivo in random.sample(archivos, min(5, len(archivos))):
-            try:
-                img = Image.open(os.path.join(ruta_carpeta, archivo)).convert("RGB")
-                thumb = img.resize((32, 32))
-                arr = np.array(thumb).reshape(-1, 3)
-                muestras = arr[np.random.choice(len(arr), 8, replace=False)]
-                for c in muestras:
-                    colores.append(tuple(c))
-            except:
-                continue
-
-        if colores:
-            paletas[carpeta] = colores
-    print(f"🎨 Paletas cromáticas generadas para {len(paletas)} carpetas.")
+    """Colores dominantes por serie, desde el índice persistente (paletas_recortes.py)."""
+    paletas = cargar_paletas(LETRAS_DIR)
+    print(f"🎨 Paletas cromáticas cargadas para {len(paletas)} carpetas.")
     return paletas
 
 
-PALETAS = extraer_paletas()
+PALETAS = PaletasPerezosas(extraer_paletas)
 
 
 # === GENERACIÓN DE LETRAS ===
-def generar_letra(modelos, latent_dim=LATENT_DIM):
-    if not modelos:
+def generar_letra(fuente=GLIFOS_GENERADOS):
+    """Glifo generado en L, tomado del búfer de la fuente (decodifica por lotes)."""
+    if not fuente.registro:
         raise ValueError("No hay modelos cargados.")
 
-    modelo_elegido = random.choice(list(modelos.values()))
-    z = np.random.normal(size=(1, latent_dim)).astype(np.float32)
+    elegido = fuente.siguiente()
+    if elegido is None:
+        raise RuntimeError("No se pudo generar imagen con ningún modelo.")
+    return Image.fromarray(elegido[1], mode="L")
 
-    try:
-        output = modelo_elegido(z, training=False)
-        if isinstance(output, dict):
-            output = list(output.values())[0]
-        img = output.numpy()[0]
-    except Exception as e:
-        raise RuntimeError(f"Error al generar imagen con modelo: {e}")
 
-    img = np.clip(img * 255, 0, 255).astype(np.uint8).reshape(IMG_SIZE, IMG_SIZE)
-    return Image.fromarray(img, mode="L")
+MODULOS = ProveedorModulos(LETRAS_DIR)
 
 
 def cargar_letra_recortada():
-    if not os.path.exists(LETRAS_DIR):
-        return None
-    carpetas = [f for f in os.listdir(LETRAS_DIR) if os.path.isdir(os.path.join(LETRAS_DIR, f))]
-    if not carpetas:
-        return None
-    carpeta = random.choice(carpetas)
-    ruta = os.path.join(LETRAS_DIR, carpeta)
-    archivos = [f for f in os.listdir(ruta) if f.lower().endswith(".png")]
-    if not archivos:
-        return None
-    return Image.open(os.path.join(ruta, random.choice(archivos))).convert("L"), carpeta
+    """(letra L, carpeta) al azar desde el proveedor en memoria; None si no hay recortes."""
+    return MODULOS.aleatorio()
 
 
 # === EFECTOS BASE ===
@@ -132,33 +90,12 @@ def aplicar_efectos(img):
     return img
 
 
+TEXTURAS = CacheTexturas()
+
+
 def generar_textura_anexa(tamaño):
-    tipo = random.choice(["ruido", "cuadricula", "trama", "papel"])
-    tex = Image.new("L", tamaño, 255)
-    px = tex.load()
-
-    if tipo == "ruido":
-        for y in range(tamaño[1]):
-            for x in range(tamaño[0]):
-                px[x, y] = int(random.gauss(128, 50))
-    elif tipo == "cuadricula":
-        step = random.randint(6, 18)
-        for y in range(0, tamaño[1], step):
-            for x in range(tamaño[0]):
-                px[x, y] = random.randint(100, 180)
-        for x in range(0, tamaño[0], step):
-            for y in range(tamaño[1]):
-                px[x, y] = random.randint(100, 180)
-    elif tipo == "trama":
-        for y in range(tamaño[1]):
-            for x in range(tamaño[0]):
-                val = 180 if (x + y) % random.randint(6, 12) == 0 else 255
-                px[x, y] = val
-    elif tipo == "papel":
-        for y in range(tamaño[1]):
-            for x in range(tamaño[0]):
-                px[x, y] = 240 + int(random.gauss(0, 10))
-    return tex
+    """Textura al azar (ruido, cuadricula, trama o papel), recortada de un tile pre-renderizado."""
+    return TEXTURAS.obtener(tamaño)
 
 
 # === EFECTOS EXPERIMENTALES ===
@@ -171,14 +108,9 @@ def efecto_halftone(img, block=4):
 
 def efecto_ondas(img):
     arr = np.array(img)
-    h, w = arr.shape[:2]
-    nueva = np.zeros_like(arr)
     freq = random.uniform(0.02, 0.08)
     amp = random.randint(4, 15)
-    for y in range(h):
-        shift = int(amp * np.sin(2 * np.pi * y * freq))
-        nueva[y] = np.roll(arr[y], shift, axis=0)
-    return Image.fromarray(nueva)
+    return Image.fromarray(desplazar_filas(arr, ondas(arr.shape[0], amp, freq), canales=arr.ndim == 3))
 
 
 def efecto_duotono_posterizado(img):
@@ -192,12 +124,12 @@ def efecto_duotono_posterizado(img):
 
 def efecto_glitch(img):
     arr = np.array(img)
-    h, w = arr.shape[:2]
+    h = arr.shape[0]
+    filas, desp = [], []
     for i in range(random.randint(5, 15)):
-        y = random.randint(0, h - 1)
-        shift = random.randint(-20, 20)
-        arr[y] = np.roll(arr[y], shift, axis=0)
-    return Image.fromarray(arr)
+        filas.append(random.randint(0, h - 1))
+        desp.append(random.randint(-20, 20))
+    return Image.fromarray(desplazar_filas(arr, glitch(h, filas, desp), canales=arr.ndim == 3))
 
 
 def efecto_morse(img):
@@ -232,7 +164,7 @@ def generar_composicion():
             letra, carpeta = letra_info
             paleta = PALETAS.get(carpeta, [(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))])
         else:
-            letra = generar_letra(MODELOS_DECODER)
+            letra = generar_letra(GLIFOS_GENERADOS)
             paleta = [(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))]
 
         letra = aplicar_efectos(letra)
@@ -283,6 +215,9 @@ def exportar_composiciones(n=10):
     continuando la numeración existente sin sobrescribir.
     """
     os.makedirs(SALIDA_DIR, exist_ok=True)
+    if PRECARGAR_MODELOS:
+        MODELOS_DECODER.precargar()
+        GLIFOS_GENERADOS.llenar()
     existentes = [
         f for f in os.listdir(SALIDA_DIR)
         if f.lower().startswith("composicion_") and f.lower().endswith(".jpg")
@@ -1,15 +1,148 @@
-import os, json
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+generar_recortes_index.py
+Indexador incremental de recortes de letras.
 
+- Recorre recortes_letras/<LETRA>/ con os.scandir y hace stat de cada
+  archivo: solo se vuelven a leer los nuevos o con mtime/tamaño distinto. El
+  mtime de la carpeta no alcanza para saltarla: sobrescribir un recorte en su
+  lugar (p. ej. volver a guardarlo con PIL) no lo cambia.
+- Emite registros estructurados (recortes_letras_registros.json):
+  letra, serie, afiche, crop, índice, dimensiones, bytes y hash de contenido,
+  parseados una sola vez del nombre
+  <LETRA>_<serie>_afiche_<carpeta>_<NNN>_crop_<CCC>_<IIII>.png
+- Mantiene recortes_letras_index.json (lista plana de rutas) para los
+  consumidores existentes. Ambos se reescriben solo si algo cambió.
+- Escribe además recortes_letras_index/ (indice_compacto.py): un manifiesto
+  con tabla de strings y un fragmento por letra, precomprimidos .gz/.br.
+
+Uso:
+  python3 python/generar_recortes_index.py            # incremental
+  python3 python/generar_recortes_index.py --full     # ignora la caché
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+from PIL import Image
+
+from indice_compacto import CARPETA_SHARDS, escribir_shards
+
+# === CONFIGURACIÓN ===
 ROOT = "recortes_letras"
-salida = []
+INDICE_PLANO = "recortes_letras_index.json"
+INDICE_REGISTROS = "recortes_letras_registros.json"
+EXTENSIONES = (".png", ".jpg", ".jpeg", ".webp")
+
+PATRON_RECORTE = re.compile(
+    r"^(?P<letra>[^_]+)_(?P<serie>.+?)_(?P<afiche>afiche_.+_\d{3,})_crop_(?P<crop>\d+)_(?P<indice>\d+)\.\w+$")
+
+
+def parsear_nombre(nombre):
+    """Campos del nombre de un recorte; None en los que no calzan con el patrón."""
+    m = PATRON_RECORTE.match(nombre)
+    if not m:
+        return {"serie": None, "afiche": None, "crop": None, "indice": None}
+    return {"serie": m.group("serie"), "afiche": m.group("afiche"),
+            "crop": int(m.group("crop")), "indice": int(m.group("indice"))}
+
+
+def leer_recorte(ruta, letra, nombre, st):
+    """Registro completo de un archivo (abre solo la cabecera para las dimensiones)."""
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    try:
+        with Image.open(ruta) as img:
+            ancho, alto = img.size
+    except Exception:
+        ancho = alto = None
+    registro = {"ruta": ruta, "letra": letra}
+    registro.update(parsear_nombre(nombre))
+    registro.update({"ancho": ancho, "alto": alto, "bytes": st.st_size, "mtime": st.st_mtime,
+                     "hash": hashlib.md5(datos).hexdigest()})
+    return registro
+
+
+def cargar_previo(ruta):
+    if not os.path.exists(ruta):
+        return {"carpetas": {}, "recortes": []}
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def escribir_atomico(ruta, datos, **kwargs):
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f, **kwargs)
+    os.replace(tmp, ruta)
+
+
+def indexar(root=ROOT, previo=None):
+    """Devuelve (índice, estadísticas). `previo` es el índice anterior (o None para uno completo)."""
+    previo = previo or {"carpetas": {}, "recortes": []}
+    por_carpeta = {}
+    for r in previo["recortes"]:
+        por_carpeta.setdefault(r["letra"], []).append(r)
+
+    carpetas, recortes = {}, []
+    stats = {"carpetas_reescaneadas": 0, "archivos_leidos": 0, "archivos_reutilizados": 0}
+    with os.scandir(root) as it:
+        letras = sorted((e for e in it if e.is_dir()), key=lambda e: e.name)
+
+    for entrada in letras:
+        letra = entrada.name
+        mtime_carpeta = entrada.stat().st_mtime
+        carpetas[letra] = mtime_carpeta
+        if previo["carpetas"].get(letra) != mtime_carpeta:
+            stats["carpetas_reescaneadas"] += 1
+        cache = {r["ruta"]: r for r in por_carpeta.get(letra, [])}
+        with os.scandir(entrada.path) as it:
+            archivos = sorted((e for e in it if e.is_file() and e.name.lower().endswith(EXTENSIONES)),
+                              key=lambda e: e.name)
+        for e in archivos:
+            ruta = f"{root}/{letra}/{e.name}"
+            st = e.stat()
+            anterior = cache.get(ruta)
+            if anterior is not None and (anterior["mtime"], anterior["bytes"]) == (st.st_mtime, st.st_size):
+                recortes.append(anterior)
+                stats["archivos_reutilizados"] += 1
+            else:
+                recortes.append(leer_recorte(ruta, letra, e.name, st))
+                stats["archivos_leidos"] += 1
+
+    return {"carpetas": carpetas, "recortes": recortes}, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice incremental de recortes de letras.")
+    parser.add_argument("--root", type=str, default=ROOT)
+    parser.add_argument("--flat", type=str, default=INDICE_PLANO, help="Lista plana de rutas (compatibilidad).")
+    parser.add_argument("--records", type=str, default=INDICE_REGISTROS, help="Registros estructurados + caché.")
+    parser.add_argument("--shards", type=str, default=CARPETA_SHARDS, help="Índice compacto por letra ('' lo omite).")
+    parser.add_argument("--full", action="store_true", help="Relee todos los archivos.")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    previo = None if args.full else cargar_previo(args.records)
+    indice, stats = indexar(args.root, previo)
+
+    sin_cambios = previo is not None and indice == previo and os.path.exists(args.flat)
+    if not sin_cambios:
+        escribir_atomico(args.records, indice, ensure_ascii=False)
+        escribir_atomico(args.flat, [r["ruta"] for r in indice["recortes"]], indent=2)
+    if args.shards and (not sin_cambios or not os.path.isdir(args.shards)):
+        escribir_shards(indice["recortes"], args.shards, args.root)
 
-for carpeta, _, archivos in os.walk(ROOT):
-    for f in archivos:
-        if f.lower().endswith((".png",".jpg",".jpeg",".webp")):
-            ruta_rel = os.path.join(carpeta, f)
-            salida.append(ruta_rel)
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"✅ {len(indice['recortes'])} recortes en {len(indice['carpetas'])} letras "
+          f"({stats['carpetas_reescaneadas']} carpetas modificadas, {stats['archivos_leidos']} archivos leídos) "
+          f"en {ms:.0f} ms" + (" — sin cambios" if sin_cambios else f" → {args.flat}, {args.records}" + (f", {args.shards}/" if args.shards else "")))
 
-with open("recortes_letras_index.json", "w") as out:
-    json.dump(salida, out, indent=2)
 
-print(f"✅ generado recortes_letras_index.json con {len(salida)} archivos")
+if __name__ == "__main__":
+    main()
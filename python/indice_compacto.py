@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+indice_compacto.py
+Formato compacto y fragmentado del índice de recortes.
+
+En vez de un único arreglo JSON con ~10k rutas largas y repetitivas:
+
+  recortes_letras_index/
+    manifest.json        tabla de strings (series, carpetas, extensiones) + una
+                         entrada por letra (archivo, cantidad, bytes, hash)
+    A.json, B.json, …    columnas de enteros por letra: serie, carpeta, número
+                         de afiche, crop, índice, extensión, ancho, alto
+    *.json.gz / .json.br variantes precomprimidas (br solo si está `brotli`)
+
+Cada nombre se reconstruye como
+  <LETRA>_<series[s]>_afiche_<carpetas[c]>_<afiche:03d>_crop_<crop:03d>_<indice:04d><ext>
+y los que no calzan con el patrón (o no se reconstruyen igual) van tal cual en
+"otros". Una página que muestra una letra baja el manifiesto y un fragmento de
+pocos KB. Los fragmentos que no cambiaron no se reescriben.
+
+generar_recortes_index.py lo reescribe junto con los demás índices; a mano:
+
+Uso:
+  python3 python/indice_compacto.py                       # desde los registros (o la lista plana)
+  python3 python/indice_compacto.py --flat recortes_letras_index.json
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# === CONFIGURACIÓN ===
+CARPETA_SHARDS = "recortes_letras_index"
+VERSION = 1
+COLUMNAS = ("serie", "carpeta", "afiche", "crop", "indice", "ext", "ancho", "alto")
+PATRON = re.compile(r"^(?P<letra>[^_]+)_(?P<serie>.+?)_afiche_(?P<carpeta>.+)_(?P<afiche>\d{3,})"
+                    r"_crop_(?P<crop>\d+)_(?P<indice>\d+)(?P<ext>\.\w+)$")
+
+
+def nombre_recorte(letra, serie, carpeta, afiche, crop, indice, ext):
+    return f"{letra}_{serie}_afiche_{carpeta}_{afiche:03d}_crop_{crop:03d}_{indice:04d}{ext}"
+
+
+class TablaStrings:
+    """Interna strings repetidos como enteros (en orden de aparición)."""
+
+    def __init__(self, valores=()):
+        self.valores = list(valores)
+        self._ids = {v: i for i, v in enumerate(self.valores)}
+
+    def id(self, valor):
+        if valor not in self._ids:
+            self._ids[valor] = len(self.valores)
+            self.valores.append(valor)
+        return self._ids[valor]
+
+
+def _serializar(datos):
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _escribir_si_cambio(ruta, datos):
+    """Escribe datos (+ .gz/.br) solo si el contenido cambió. Devuelve True si escribió."""
+    if os.path.exists(ruta):
+        with open(ruta, "rb") as f:
+            if f.read() == datos:
+                return False
+    variantes = {ruta: datos, ruta + ".gz": gzip.compress(datos, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes[ruta + ".br"] = brotli.compress(datos, quality=11)
+    for destino, contenido in variantes.items():
+        tmp = destino + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(contenido)
+        os.replace(tmp, destino)
+    return True
+
+
+def escribir_shards(recortes, carpeta=CARPETA_SHARDS, raiz="recortes_letras"):
+    """recortes: registros de generar_recortes_index (ruta, letra, ancho, alto, …).
+    Devuelve (manifiesto, fragmentos reescritos)."""
+    os.makedirs(carpeta, exist_ok=True)
+    previo = leer_manifiesto(carpeta)
+    # mismas ids que antes para que las letras sin cambios produzcan los mismos bytes
+    series = TablaStrings(previo["series"] if previo else ())
+    carpetas = TablaStrings(previo["carpetas"] if previo else ())
+    extensiones = TablaStrings(previo["extensiones"] if previo else ())
+
+    por_letra = {}
+    for r in recortes:
+        por_letra.setdefault(r["letra"], []).append(r)
+
+    fragmentos = {}
+    for letra in sorted(por_letra):
+        columnas = {c: [] for c in COLUMNAS}
+        otros = []
+        for r in por_letra[letra]:
+            nombre = os.path.basename(r["ruta"])
+            m = PATRON.match(nombre)
+            if m and m.group("letra") == letra:
+                valores = (m.group("serie"), m.group("carpeta"), int(m.group("afiche")),
+                           int(m.group("crop")), int(m.group("indice")), m.group("ext"))
+                if nombre_recorte(letra, *valores) == nombre:
+                    s, c, a, cr, i, e = valores
+                    for col, v in zip(COLUMNAS, (series.id(s), carpetas.id(c), a, cr, i, extensiones.id(e),
+                                                  r.get("ancho") or 0, r.get("alto") or 0)):
+                        columnas[col].append(v)
+                    continue
+            otros.append([nombre, r.get("ancho") or 0, r.get("alto") or 0])
+        fragmentos[letra] = {"letra": letra, "n": len(por_letra[letra]), **columnas, "otros": otros}
+
+    manifiesto = {"version": VERSION, "raiz": raiz, "series": series.valores, "carpetas": carpetas.valores,
+                  "extensiones": extensiones.valores, "columnas": list(COLUMNAS), "letras": {}}
+    reescritos = 0
+    for letra, fragmento in fragmentos.items():
+        datos = _serializar(fragmento)
+        archivo = f"{letra}.json"
+        reescritos += _escribir_si_cambio(os.path.join(carpeta, archivo), datos)
+        manifiesto["letras"][letra] = {"archivo": archivo, "n": fragmento["n"], "bytes": len(datos),
+                                       "hash": hashlib.md5(datos).hexdigest()[:12]}
+
+    # fragmentos de letras que ya no existen
+    for nombre in os.listdir(carpeta):
+        base = nombre.split(".")[0]
+        if nombre != "manifest.json" and not nombre.startswith("manifest.") and base not in fragmentos:
+            os.remove(os.path.join(carpeta, nombre))
+    _escribir_si_cambio(os.path.join(carpeta, "manifest.json"), _serializar(manifiesto))
+    return manifiesto, reescritos
+
+
+# === LECTURA ===
+def leer_manifiesto(carpeta=CARPETA_SHARDS):
+    ruta = os.path.join(carpeta, "manifest.json")
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def cargar_letra(letra, carpeta=CARPETA_SHARDS, manifiesto=None):
+    """[(ruta, ancho, alto)] de una letra, reconstruidas desde su fragmento."""
+    manifiesto = manifiesto or leer_manifiesto(carpeta)
+    entrada = manifiesto["letras"].get(letra)
+    if entrada is None:
+        return []
+    with open(os.path.join(carpeta, entrada["archivo"]), "r", encoding="utf-8") as f:
+        frag = json.load(f)
+    raiz = manifiesto["raiz"]
+    series, carpetas, exts = manifiesto["series"], manifiesto["carpetas"], manifiesto["extensiones"]
+    salida = [(f"{raiz}/{letra}/" + nombre_recorte(letra, series[s], carpetas[c], a, cr, i, exts[e]), w, h)
+              for s, c, a, cr, i, e, w, h in zip(*(frag[col] for col in COLUMNAS))]
+    salida.extend((f"{raiz}/{letra}/{nombre}", w, h) for nombre, w, h in frag["otros"])
+    return salida
+
+
+def cargar_todo(carpeta=CARPETA_SHARDS):
+    manifiesto = leer_manifiesto(carpeta)
+    return [t for letra in manifiesto["letras"] for t in cargar_letra(letra, carpeta, manifiesto)]
+
+
+def registros_desde_lista(rutas):
+    """Registros mínimos (ruta, letra) desde la lista plana recortes_letras/<L>/<archivo>."""
+    recortes = []
+    for ruta in rutas:
+        partes = ruta.replace("\\", "/").split("/")
+        if len(partes) > 2:
+            recortes.append({"ruta": ruta, "letra": partes[-2]})
+    return recortes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escribe el índice de recortes en fragmentos compactos por letra.")
+    parser.add_argument("--records", type=str, default="recortes_letras_registros.json")
+    parser.add_argument("--flat", type=str, default="recortes_letras_index.json",
+                        help="Lista plana, si no hay registros estructurados.")
+    parser.add_argument("--out", type=str, default=CARPETA_SHARDS)
+    args = parser.parse_args()
+
+    if os.path.exists(args.records):
+        with open(args.records, "r", encoding="utf-8") as f:
+            recortes = json.load(f)["recortes"]
+    else:
+        with open(args.flat, "r", encoding="utf-8") as f:
+            recortes = registros_desde_lista(json.load(f))
+    manifiesto, reescritos = escribir_shards(recortes, args.out)
+    total = sum(e["bytes"] for e in manifiesto["letras"].values())
+    print(f"🗂️ {len(manifiesto['letras'])} fragmentos ({reescritos} reescritos), {total / 1024:.0f} KB sin comprimir"
+          + ("" if brotli is not None else " — sin .br (instala `brotli`)"))
+
+
+if __name__ == "__main__":
+    main()
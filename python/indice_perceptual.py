@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+indice_perceptual.py
+Índice de casi-duplicados por hash perceptual (dHash / pHash) con BK-tree.
+
+- El MD5 solo detecta copias idénticas byte a byte; un mismo afiche
+  re-codificado o redimensionado por otro sitio pasa como imagen nueva.
+- Cada imagen se reduce a un hash de 64 bits; dos imágenes son casi-duplicadas
+  si la distancia de Hamming entre sus hashes es ≤ radio.
+- Los hashes se guardan en SQLite (por colección: "recortes", "afiches") junto
+  a mtime/tamaño, así que reindexar solo toca archivos nuevos o modificados.
+- Las búsquedas usan un BK-tree en memoria: sub-cuadrático para agrupar ~10k
+  recortes, y O(log n) típico para revisar una descarga nueva al scrapear.
+
+- Sin --index, con --posters se usa <posters>/indice_perceptual.sqlite3: el
+  mismo archivo que llenan los scrapers con --near-dup-radius. Si no, RUTA_INDICE.
+
+Uso:
+  python3 python/indice_perceptual.py --crops recortes_letras_index.json --posters poster_dataset --radius 6
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# === CONFIGURACIÓN ===
+NOMBRE_INDICE = "indice_perceptual.sqlite3"   # los scrapers lo crean en su --out-dir
+RUTA_INDICE = os.path.join("datasets", NOMBRE_INDICE)
+RADIO = 6                     # distancia de Hamming máxima (de 64 bits)
+ALGORITMO = "dhash"
+EXTENSIONES = (".png", ".jpg", ".jpeg", ".webp", ".tiff")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    coleccion  TEXT NOT NULL,
+    ruta       TEXT NOT NULL,
+    algoritmo  TEXT NOT NULL,
+    hash       TEXT NOT NULL,
+    mtime      REAL,
+    bytes      INTEGER,
+    PRIMARY KEY (coleccion, ruta, algoritmo)
+);
+"""
+
+
+# === HASHES ===
+def dhash(img, tam=8):
+    """Hash de diferencias: compara píxeles vecinos de una miniatura (tam+1)×tam."""
+    gris = img.convert("L").resize((tam + 1, tam), Image.LANCZOS)
+    a = np.asarray(gris, dtype=np.int16)
+    bits = (a[:, 1:] > a[:, :-1]).ravel()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def _matriz_dct(n):
+    k = np.arange(n)
+    m = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    m[0] *= 1 / np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+_DCT32 = _matriz_dct(32)
+
+
+def phash(img, tam=8):
+    """Hash perceptual: bajas frecuencias de la DCT 32×32 contra su mediana."""
+    gris = np.asarray(img.convert("L").resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    dct = _DCT32 @ gris @ _DCT32.T
+    bajas = dct[:tam, :tam].ravel()
+    mediana = np.median(bajas[1:])  # sin la componente continua
+    bits = bajas > mediana
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+HASHES = {"dhash": dhash, "phash": phash}
+
+
+def hash_archivo(ruta, algoritmo=ALGORITMO):
+    with Image.open(ruta) as img:
+        img.draft("L", (64, 64))  # JPEG: decodifica reducido
+        return HASHES[algoritmo](img)
+
+
+def distancia(a, b):
+    return (a ^ b).bit_count()
+
+
+# === BK-TREE ===
+class ArbolBK:
+    """BK-tree sobre distancia de Hamming. Nodo = [hash, ids, hijos{dist: nodo}]."""
+
+    def __init__(self):
+        self.raiz = None
+        self.n = 0
+
+    def agregar(self, h, ident):
+        self.n += 1
+        if self.raiz is None:
+            self.raiz = [h, [ident], {}]
+            return
+        nodo = self.raiz
+        while True:
+            d = distancia(h, nodo[0])
+            if d == 0:
+                nodo[1].append(ident)
+                return
+            hijo = nodo[2].get(d)
+            if hijo is None:
+                nodo[2][d] = [h, [ident], {}]
+                return
+            nodo = hijo
+
+    def buscar(self, h, radio):
+        """[(distancia, id)] de todos los elementos a distancia ≤ radio."""
+        if self.raiz is None:
+            return []
+        encontrados, pila = [], [self.raiz]
+        while pila:
+            nodo = pila.pop()
+            d = distancia(h, nodo[0])
+            if d <= radio:
+                encontrados.extend((d, ident) for ident in nodo[1])
+            for dh, hijo in nodo[2].items():
+                if d - radio <= dh <= d + radio:
+                    pila.append(hijo)
+        return sorted(encontrados)
+
+    def __len__(self):
+        return self.n
+
+
+# === ÍNDICE PERSISTENTE ===
+class IndicePerceptual:
+    """Hashes persistentes por colección + BK-tree en memoria por colección."""
+
+    def __init__(self, ruta=RUTA_INDICE, algoritmo=ALGORITMO):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.algoritmo = algoritmo
+        self._con = sqlite3.connect(str(self.ruta), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.executescript(ESQUEMA)
+        self._arboles = {}
+        self._hashes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def hashes(self, coleccion):
+        """{ruta: hash} de la colección (cargado una vez desde SQLite)."""
+        if coleccion not in self._hashes:
+            filas = self._con.execute(
+                "SELECT ruta, hash FROM hashes WHERE coleccion = ? AND algoritmo = ?",
+                (coleccion, self.algoritmo)).fetchall()
+            self._hashes[coleccion] = {ruta: int(hx, 16) for ruta, hx in filas}
+        return self._hashes[coleccion]
+
+    def arbol(self, coleccion):
+        if coleccion not in self._arboles:
+            arbol = ArbolBK()
+            for ruta, h in self.hashes(coleccion).items():
+                arbol.agregar(h, ruta)
+            self._arboles[coleccion] = arbol
+        return self._arboles[coleccion]
+
+    def agregar(self, coleccion, ruta, h, mtime=None, bytes=None):
+        hashes = self.hashes(coleccion)
+        ruta = str(ruta)
+        previo = hashes.get(ruta)
+        hashes[ruta] = h
+        if previo is None:
+            if coleccion in self._arboles:
+                self._arboles[coleccion].agregar(h, ruta)
+        elif previo != h:
+            self._arboles.pop(coleccion, None)  # el BK-tree no borra: se reconstruye al consultar
+        with self._con:
+            self._con.execute(
+                "INSERT OR REPLACE INTO hashes (coleccion, ruta, algoritmo, hash, mtime, bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (coleccion, ruta, self.algoritmo, f"{h:016x}", mtime, bytes))
+
+    def buscar(self, coleccion, h, radio=RADIO):
+        return self.arbol(coleccion).buscar(h, radio)
+
+    def renombrar(self, coleccion, renombres):
+        """Actualiza las rutas de archivos renombrados en disco.
+        renombres: {(nombre de carpeta, nombre viejo): nombre nuevo}. Devuelve cuántas rutas cambió."""
+        filas = self._con.execute("SELECT ruta FROM hashes WHERE coleccion = ?", (coleccion,)).fetchall()
+        cambios = []
+        for (ruta,) in filas:
+            p = Path(ruta)
+            nuevo = renombres.get((p.parent.name, p.name))
+            if nuevo is not None:
+                cambios.append((str(p.with_name(nuevo)), coleccion, ruta))
+        with self._con:
+            self._con.executemany("UPDATE OR REPLACE hashes SET ruta = ? WHERE coleccion = ? AND ruta = ?", cambios)
+        self._arboles.pop(coleccion, None)
+        self._hashes.pop(coleccion, None)
+        return len(cambios)
+
+    def revisar(self, coleccion, ruta, radio=RADIO, agregar=True):
+        """Hashea un archivo nuevo y devuelve sus casi-duplicados ya indexados.
+        Si no hay ninguno y agregar=True, queda indexado."""
+        h = hash_archivo(ruta, self.algoritmo)
+        similares = [(d, r) for d, r in self.buscar(coleccion, h, radio) if r != str(ruta)]
+        if agregar and not similares:
+            st = os.stat(ruta)
+            self.agregar(coleccion, ruta, h, st.st_mtime, st.st_size)
+        return h, similares
+
+    def actualizar(self, coleccion, rutas):
+        """Indexa solo archivos nuevos o con mtime/tamaño distinto. Devuelve cuántos hasheó."""
+        previos = {r: (m, b) for r, m, b in self._con.execute(
+            "SELECT ruta, mtime, bytes FROM hashes WHERE coleccion = ? AND algoritmo = ?",
+            (coleccion, self.algoritmo))}
+        nuevos = 0
+        for ruta in rutas:
+            ruta = str(ruta)
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue
+            if previos.get(ruta) == (st.st_mtime, st.st_size):
+                continue
+            try:
+                h = hash_archivo(ruta, self.algoritmo)
+            except Exception as e:
+                print(f"⚠️ No se pudo hashear {ruta}: {e}")
+                continue
+            self.agregar(coleccion, ruta, h, st.st_mtime, st.st_size)
+            nuevos += 1
+        return nuevos
+
+    def agrupar(self, coleccion, radio=RADIO):
+        """Grupos (≥ 2 elementos) de casi-duplicados vía BK-tree + union-find."""
+        hashes = self.hashes(coleccion)
+        padre = {r: r for r in hashes}
+
+        def raiz(x):
+            while padre[x] != x:
+                padre[x] = padre[padre[x]]
+                x = padre[x]
+            return x
+
+        for ruta, h in hashes.items():
+            for _, otra in self.buscar(coleccion, h, radio):
+                a, b = raiz(ruta), raiz(otra)
+                if a != b:
+                    padre[b] = a
+        grupos = defaultdict(list)
+        for r in hashes:
+            grupos[raiz(r)].append(r)
+        return sorted((sorted(g) for g in grupos.values() if len(g) > 1), key=len, reverse=True)
+
+    def cerrar(self):
+        self._con.close()
+
+
+def listar_imagenes(carpeta):
+    return [p for p in Path(carpeta).rglob("*") if p.suffix.lower() in EXTENSIONES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de casi-duplicados por hash perceptual.")
+    parser.add_argument("--index", type=str, default=None,
+                        help=f"Archivo SQLite del índice (por defecto <posters>/{NOMBRE_INDICE} o {RUTA_INDICE}).")
+    parser.add_argument("--algorithm", choices=sorted(HASHES), default=ALGORITMO)
+    parser.add_argument("--crops", type=str, default=None, help="recortes_letras_index.json a indexar.")
+    parser.add_argument("--posters", type=str, default=None, help="Carpeta de afiches scrapeados a indexar.")
+    parser.add_argument("--radius", type=int, default=RADIO, help="Distancia de Hamming máxima.")
+    parser.add_argument("--report", type=str, default=None, help="JSON de salida con los grupos.")
+    args = parser.parse_args()
+
+    ruta = args.index or (os.path.join(args.posters, NOMBRE_INDICE) if args.posters else RUTA_INDICE)
+    reporte = {}
+    with IndicePerceptual(ruta, args.algorithm) as indice:
+        colecciones = []
+        if args.crops:
+            with open(args.crops, "r", encoding="utf-8") as f:
+                rutas = json.load(f)
+            colecciones.append(("recortes", rutas))
+        if args.posters:
+            colecciones.append(("afiches", listar_imagenes(args.posters)))
+        for coleccion, rutas in colecciones:
+            nuevos = indice.actualizar(coleccion, rutas)
+            grupos = indice.agrupar(coleccion, args.radius)
+            print(f"🔎 {coleccion}: {len(rutas)} archivos, {nuevos} hasheados, "
+                  f"{len(grupos)} grupos de casi-duplicados "
+                  f"({sum(len(g) - 1 for g in grupos)} redundantes)")
+            reporte[coleccion] = grupos
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"📘 Reporte: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+metadatos_afiches.py
+Extracción en lote de metadatos de afiches hacia el catálogo (catalogo_afiches).
+
+Por afiche: ancho/alto, formato, bytes, fecha EXIF, histograma de color RGB
+(4×4×4 bins), colores dominantes y hash perceptual (pHash). Así los demás
+scripts leen hechos del catálogo en vez de volver a decodificar imágenes.
+
+- Caché por contenido (MD5 del archivo): un afiche duplicado o renombrado no se
+  vuelve a decodificar; un archivo con mismo mtime/tamaño ni siquiera se relee.
+- El hasheo y la decodificación corren en un pool de procesos; la decodificación
+  usa draft() de JPEG para trabajar sobre una versión reducida.
+
+Uso:
+  python3 python/metadatos_afiches.py --catalog datasets/catalogo_afiches.sqlite3 --processes 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from catalogo_afiches import CatalogoAfiches, RUTA_CATALOGO
+from indice_perceptual import phash
+
+# === CONFIGURACIÓN ===
+PROCESOS = None               # None = os.cpu_count()
+LADO_ANALISIS = 256           # px: reducción para histograma y pHash
+BINS = 4                      # por canal → 64 bins
+DOMINANTES = 5
+TAG_EXIF_IFD = 0x8769
+TAG_FECHA_ORIGINAL = 36867    # DateTimeOriginal
+TAG_FECHA = 306               # DateTime
+
+
+def hash_contenido(ruta):
+    """(ruta, md5 del archivo, mtime, bytes); md5 None si no se pudo leer."""
+    try:
+        st = os.stat(ruta)
+        h = hashlib.md5()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloque)
+        return ruta, h.hexdigest(), st.st_mtime, st.st_size
+    except OSError:
+        return ruta, None, None, None
+
+
+def fecha_exif(img):
+    try:
+        exif = img.getexif()
+    except Exception:
+        return None
+    fecha = exif.get_ifd(TAG_EXIF_IFD).get(TAG_FECHA_ORIGINAL) or exif.get(TAG_FECHA)
+    if not fecha:
+        return None
+    return str(fecha).strip("\x00 ") or None
+
+
+def histograma_color(rgb):
+    """Histograma conjunto RGB normalizado (BINS³) y colores dominantes en hex."""
+    q = (rgb >> (8 - int(np.log2(BINS)))).astype(np.int32)
+    idx = (q[..., 0] * BINS + q[..., 1]) * BINS + q[..., 2]
+    hist = np.bincount(idx.ravel(), minlength=BINS ** 3).astype(np.float64)
+    hist /= max(1.0, hist.sum())
+    paso = 256 // BINS
+    dominantes = []
+    for b in np.argsort(hist)[::-1][:DOMINANTES]:
+        if hist[b] <= 0:
+            break
+        r, g, bb = b // (BINS * BINS), (b // BINS) % BINS, b % BINS
+        dominantes.append({"color": "#{:02x}{:02x}{:02x}".format(*(c * paso + paso // 2 for c in (r, g, bb))),
+                           "fraccion": round(float(hist[b]), 4)})
+    return [round(float(x), 4) for x in hist], dominantes
+
+
+def extraer(args):
+    """Metadatos de un archivo. Corre en un proceso del pool."""
+    ruta, contenido = args
+    try:
+        with Image.open(ruta) as img:
+            ancho, alto = img.size
+            formato = img.format
+            fecha = fecha_exif(img)
+            img.draft("RGB", (LADO_ANALISIS, LADO_ANALISIS))
+            img = img.convert("RGB")
+            img.thumbnail((LADO_ANALISIS, LADO_ANALISIS))
+            hist, dominantes = histograma_color(np.asarray(img))
+            ph = phash(img)
+    except Exception as e:
+        return {"contenido": contenido, "error": str(e)}
+    return {
+        "contenido": contenido,
+        "ancho": ancho,
+        "alto": alto,
+        "formato": formato,
+        "bytes": os.path.getsize(ruta),
+        "fecha_exif": fecha,
+        "histograma": json.dumps(hist),
+        "dominantes": json.dumps(dominantes),
+        "phash": f"{ph:016x}",
+    }
+
+
+def extraer_lote(catalogo, procesos=PROCESOS):
+    """Completa los metadatos del catálogo; devuelve (hasheados, extraídos)."""
+    cambiados = []
+    for ident, ruta, contenido, mtime, n in catalogo.archivos():
+        if not ruta:
+            continue
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            continue
+        if contenido is None or (mtime, n) != (st.st_mtime, st.st_size):
+            cambiados.append((ident, ruta))
+
+    if not cambiados:
+        return 0, 0  # nada cambió en disco: ni se abre el pool
+
+    conocidos = catalogo.contenidos_con_metadatos()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        filas = []
+        pendientes = {}  # un trabajo por contenido desconocido (los duplicados comparten resultado)
+        for (ident, _), (ruta, h, mtime, n) in zip(
+                cambiados, pool.map(hash_contenido, [r for _, r in cambiados], chunksize=16)):
+            if h is None:
+                continue
+            filas.append((ident, h, mtime, n))
+            if h not in conocidos:
+                pendientes.setdefault(h, ruta)
+        catalogo.asignar_contenido(filas)
+
+        resultados = []
+        for res in pool.map(extraer, [(r, c) for c, r in pendientes.items()], chunksize=4):
+            if "error" in res:
+                print(f"⚠️ No se pudo analizar {pendientes[res['contenido']]}: {res['error']}")
+                continue
+            resultados.append(res)
+        catalogo.guardar_metadatos(resultados)
+    return len(filas), len(resultados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrae metadatos de afiches al catálogo en paralelo.")
+    parser.add_argument("--catalog", type=str, default=RUTA_CATALOGO)
+    parser.add_argument("--processes", type=int, default=PROCESOS)
+    args = parser.parse_args()
+
+    with CatalogoAfiches(args.catalog) as catalogo:
+        hasheados, extraidos = extraer_lote(catalogo, args.processes)
+    print(f"🧮 {hasheados} archivos hasheados, {extraidos} analizados (el resto desde caché)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+modulos_recortes.py
+Proveedor de módulos (recortes en escala de grises) para los generadores.
+
+- Lista recortes_letras una sola vez, en el primer pedido: carpetas con al
+  menos un .png y, por carpeta, la lista de archivos. Elegir un módulo al azar
+  es O(1): dos índices aleatorios, sin os.listdir por módulo.
+- Guarda los recortes ya decodificados (modo L) en un LRU acotado por bytes:
+  una composición que pide cientos de módulos solo abre cada PNG una vez.
+- refrescar() vuelve a listar (por ejemplo, tras depurar_recortes).
+
+Uso:
+  from modulos_recortes import ProveedorModulos
+  MODULOS = ProveedorModulos(LETRAS_DIR)
+  img, carpeta = MODULOS.aleatorio()       # None si no hay recortes
+"""
+
+import os
+import random
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+# === CONFIGURACIÓN ===
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LETRAS_DIR = os.path.join(BASE_DIR, "recortes_letras")
+LIMITE_MB = 128               # memoria máxima de módulos decodificados
+EXTENSIONES = (".png",)
+
+
+class ProveedorModulos:
+    """Recortes de letras en L, listados una vez y cacheados en un LRU acotado por memoria."""
+
+    def __init__(self, carpeta=LETRAS_DIR, limite_mb=LIMITE_MB, extensiones=EXTENSIONES):
+        self.carpeta = carpeta
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self.extensiones = extensiones
+        self._carpetas = None            # [nombre], solo las que tienen archivos
+        self._archivos = {}              # nombre → [archivo]
+        self._cache = OrderedDict()      # ruta → Image L
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = self.fallos = 0
+
+    # --- listado ---
+    def refrescar(self):
+        carpetas, archivos = [], {}
+        if os.path.isdir(self.carpeta):
+            with os.scandir(self.carpeta) as it:
+                subdirs = sorted(e.name for e in it if e.is_dir())
+            for nombre in subdirs:
+                with os.scandir(os.path.join(self.carpeta, nombre)) as it:
+                    lista = sorted(e.name for e in it if e.is_file() and e.name.lower().endswith(self.extensiones))
+                if lista:
+                    carpetas.append(nombre)
+                    archivos[nombre] = lista
+        with self._lock:
+            self._carpetas, self._archivos = carpetas, archivos
+            self._cache.clear()
+            self._bytes = 0
+
+    def carpetas(self):
+        if self._carpetas is None:
+            self.refrescar()
+        return self._carpetas
+
+    def __len__(self):
+        return sum(len(v) for v in self._archivos.values()) if self.carpetas() else 0
+
+    # --- caché ---
+    def cargar(self, carpeta, archivo):
+        """Recorte decodificado en L (una copia: quien lo recibe puede modificarlo); None si falla."""
+        ruta = os.path.join(self.carpeta, carpeta, archivo)
+        with self._lock:
+            img = self._cache.get(ruta)
+            if img is not None:
+                self._cache.move_to_end(ruta)
+                self.aciertos += 1
+                return img.copy()
+        try:
+            with Image.open(ruta) as origen:
+                img = origen.convert("L")
+        except Exception:
+            return None
+        tam = img.width * img.height
+        with self._lock:
+            self.fallos += 1
+            if tam <= self.limite_bytes and ruta not in self._cache:
+                self._cache[ruta] = img
+                self._bytes += tam
+                while self._bytes > self.limite_bytes:
+                    _, viejo = self._cache.popitem(last=False)
+                    self._bytes -= viejo.width * viejo.height
+        return img.copy()
+
+    def aleatorio(self, rng=random, carpeta=None):
+        """(img L, carpeta) de una carpeta al azar (o la indicada) y un archivo al azar; None si no hay."""
+        carpetas = self.carpetas()
+        if carpeta is None:
+            if not carpetas:
+                return None
+            carpeta = carpetas[rng.randrange(len(carpetas))]
+        archivos = self._archivos.get(carpeta)
+        if not archivos:
+            return None
+        img = self.cargar(carpeta, archivos[rng.randrange(len(archivos))])
+        return None if img is None else (img, carpeta)
+
+    def estadisticas(self):
+        return {"modulos": len(self._cache), "mb": round(self._bytes / 1024 / 1024, 1),
+                "aciertos": self.aciertos, "fallos": self.fallos}
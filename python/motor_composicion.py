@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+motor_composicion.py
+Lienzo RGBA en NumPy para estampar módulos sin pasar por PIL en cada sello.
+
+- El lienzo es un arreglo alto×ancho×4 uint8 en alfa directa, como una Image
+  RGBA, con una vista uint32 (un píxel = un entero) para copiar píxeles
+  completos.
+- Sellos con máscara binaria (el caso de paste_modulo_alpha): donde la
+  máscara es 1 el píxel queda con el color del sello y alfa 255, que es
+  exactamente lo que devuelve alpha_composite con alfa de origen 255. Es un
+  solo np.copyto enmascarado sobre un slice del lienzo: sin point(lambda),
+  copia del módulo, putalpha ni recorte/pegado del fondo.
+- Sellos con alfa fraccionaria (p. ej. alfa constante en textura_tipografica)
+  se mezclan con el núcleo C de Image.alpha_composite sobre la zona
+  recortada: la mezcla de PIL redondea en enteros con 7 bits de precisión y
+  reproducirla en NumPy (o premultiplicar el lienzo) es más lento o cambia
+  píxeles.
+- Posiciones negativas o fuera del lienzo se recortan, como alpha_composite.
+- El PNG resultante es idéntico al de la versión con Image.alpha_composite.
+
+Uso:
+  from motor_composicion import Lienzo
+  lienzo = Lienzo(ancho, alto)
+  lienzo.estampar(np.asarray(modRGBA), x, y, mascara=np.asarray(modL) > 128)
+  lienzo.estampar(np.asarray(letraRGBA), x, y, alfa=180)
+  img = lienzo.imagen()
+"""
+
+import numpy as np
+from PIL import Image
+
+
+class Lienzo:
+    """Lienzo RGBA (NumPy) sobre el que se estampan sellos en el orden de llamada."""
+
+    def __init__(self, ancho, alto, fondo=(0, 0, 0, 0)):
+        arr = np.empty((alto, ancho, 4), dtype=np.uint8)
+        arr[...] = fondo
+        self._usar(arr)
+
+    @classmethod
+    def desde_imagen(cls, img):
+        lienzo = cls.__new__(cls)
+        lienzo._usar(np.array(img.convert("RGBA")))
+        return lienzo
+
+    def _usar(self, arr):
+        self.arr = np.ascontiguousarray(arr)
+        self._px = self.arr.view(np.uint32)[..., 0]
+        self.sellos = 0
+
+    @property
+    def size(self):
+        return self.arr.shape[1], self.arr.shape[0]
+
+    def _zonas(self, w, h, x, y):
+        """(slices del lienzo, slices del sello) de la parte visible; None si no se ve nada."""
+        alto, ancho = self.arr.shape[:2]
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + w, ancho), min(y + h, alto)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return ((slice(y0, y1), slice(x0, x1)),
+                (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)))
+
+    # --- sellos ---
+    def estampar(self, rgba, x, y, mascara=None, alfa=None):
+        """Estampa rgba (h×w×3 o ×4) en (x, y). Alfa del sello: `mascara` booleana
+        (0/255), `alfa` entero constante, o el canal alfa propio de rgba (255 si es RGB)."""
+        rgba = np.asarray(rgba)
+        h, w = rgba.shape[:2]
+        if mascara is not None and mascara.shape != (h, w):
+            raise ValueError("La máscara no coincide con el tamaño del sello")
+        zonas = self._zonas(w, h, x, y)
+        if zonas is None:
+            return
+        destino, origen = zonas
+        self.sellos += 1
+        if mascara is not None or alfa == 255 or (alfa is None and rgba.shape[2] == 3):
+            # alfa 0/255: copia de píxeles completos (color del sello + alfa 255)
+            src = np.empty((h, w, 4), dtype=np.uint8)
+            src[..., :3] = rgba[..., :3]
+            src[..., 3] = 255
+            src = src.view(np.uint32)[..., 0][origen]
+            if mascara is None:
+                self._px[destino] = src
+            else:
+                np.copyto(self._px[destino], src, where=mascara[origen])
+            return
+        sello = Image.fromarray(np.ascontiguousarray(rgba[origen]))
+        if alfa is not None:
+            sello.putalpha(int(alfa))
+        zona = self.arr[destino]
+        zona[...] = np.asarray(Image.alpha_composite(Image.fromarray(zona), sello))
+
+    # --- salida ---
+    def imagen(self):
+        """Image RGBA del lienzo (copia)."""
+        return Image.fromarray(self.arr.copy())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+paletas_recortes.py
+Índice persistente de paletas por carpeta de recortes_letras, para los
+generadores de composiciones.
+
+- Por carpeta se decodifica una muestra fija de recortes (repartida en el
+  orden de los nombres, no al azar) a tamaño reducido: Image.draft deja que
+  los JPEG se decodifiquen directamente a 1/2, 1/4 u 1/8.
+- Los píxeles se agrupan con k-means en Lab (vectorizado en NumPy, semilla
+  derivada del nombre de la carpeta): la misma carpeta da siempre la misma
+  paleta. Cada color es el promedio RGB de su grupo, ordenados por peso.
+- El índice vive en .cache/paletas_recortes.json con una firma por carpeta
+  (nombre, tamaño y mtime de cada archivo); solo se recalculan las carpetas
+  cuya firma cambió, en un pool de procesos.
+
+Uso:
+  python3 python/paletas_recortes.py            # actualiza lo que cambió
+  python3 python/paletas_recortes.py --full     # recalcula todo
+
+  from paletas_recortes import cargar_paletas
+  paletas = cargar_paletas()                    # {carpeta: [(r, g, b), ...]}
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# === CONFIGURACIÓN ===
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LETRAS_DIR = os.path.join(BASE_DIR, "recortes_letras")
+RUTA_INDICE = os.path.join(BASE_DIR, ".cache", "paletas_recortes.json")
+EXTENSIONES = (".png", ".jpg", ".jpeg")
+MUESTRAS_POR_CARPETA = 48     # recortes decodificados por carpeta
+LADO_MUESTRA = 32             # cada recorte se reduce a LADO_MUESTRA²
+COLORES = 8                   # k de k-means
+ITERACIONES = 12
+PROCESOS = None               # None = os.cpu_count()
+VERSION = 1                   # subirla invalida el índice si cambia la extracción
+
+
+# === COLOR ===
+def rgb_a_lab(rgb):
+    """uint8 N×3 (sRGB, D65) → float32 N×3 Lab."""
+    c = rgb.astype(np.float32) / 255.0
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = c @ np.array([[0.4124, 0.2126, 0.0193],
+                        [0.3576, 0.7152, 0.1192],
+                        [0.1805, 0.0722, 0.9505]], dtype=np.float32)
+    xyz /= np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16.0 / 116.0)
+    return np.stack([116.0 * f[:, 1] - 16.0,
+                     500.0 * (f[:, 0] - f[:, 1]),
+                     200.0 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def kmeans(puntos, k, iteraciones=ITERACIONES, rng=None):
+    """k-means con inicio k-means++. Devuelve (etiquetas N, k efectivo)."""
+    rng = rng or np.random.default_rng()
+    n = len(puntos)
+    k = min(k, n)
+    centros = np.empty((k, puntos.shape[1]), dtype=np.float32)
+    centros[0] = puntos[rng.integers(n)]
+    d2 = ((puntos - centros[0]) ** 2).sum(1, dtype=np.float64)
+    for i in range(1, k):
+        total = d2.sum()
+        j = rng.choice(n, p=d2 / total) if total > 0 else rng.integers(n)
+        centros[i] = puntos[j]
+        d2 = np.minimum(d2, ((puntos - centros[i]) ** 2).sum(1, dtype=np.float64))
+    for _ in range(iteraciones):
+        dist = (puntos ** 2).sum(1)[:, None] - 2 * puntos @ centros.T + (centros ** 2).sum(1)[None, :]
+        etiquetas = dist.argmin(1)
+        cuentas = np.bincount(etiquetas, minlength=k)
+        nuevos = np.zeros_like(centros)
+        np.add.at(nuevos, etiquetas, puntos)
+        vivos = cuentas > 0
+        nuevos[vivos] /= cuentas[vivos, None]
+        nuevos[~vivos] = centros[~vivos]
+        if np.allclose(nuevos, centros, atol=0.05):
+            break
+        centros = nuevos
+    return etiquetas, k
+
+
+# === EXTRACCIÓN (procesos del pool) ===
+def listar_carpeta(ruta):
+    """[(nombre, tamaño, mtime_ns)] de las imágenes de la carpeta, ordenada."""
+    entradas = []
+    with os.scandir(ruta) as it:
+        for e in it:
+            if e.is_file() and e.name.lower().endswith(EXTENSIONES):
+                st = e.stat()
+                entradas.append((e.name, st.st_size, st.st_mtime_ns))
+    entradas.sort()
+    return entradas
+
+
+def firma_carpeta(entradas):
+    h = hashlib.md5(f"v{VERSION}".encode())
+    for nombre, tam, mtime in entradas:
+        h.update(f"{nombre}\0{tam}\0{mtime}\n".encode("utf-8", "surrogateescape"))
+    return h.hexdigest()
+
+
+def muestra_pixeles(rutas, lado=LADO_MUESTRA):
+    bloques = []
+    for ruta in rutas:
+        try:
+            with Image.open(ruta) as img:
+                img.draft("RGB", (lado * 2, lado * 2))
+                bloques.append(np.asarray(img.convert("RGB").resize((lado, lado), Image.BILINEAR)).reshape(-1, 3))
+        except Exception:
+            continue
+    return np.concatenate(bloques) if bloques else np.empty((0, 3), dtype=np.uint8)
+
+
+def paleta_carpeta(trabajo):
+    """(carpeta, ruta, nombres) → (carpeta, colores, pesos). Corre en un proceso del pool."""
+    carpeta, ruta, nombres = trabajo
+    if len(nombres) > MUESTRAS_POR_CARPETA:
+        pasos = np.linspace(0, len(nombres) - 1, MUESTRAS_POR_CARPETA).round().astype(int)
+        nombres = [nombres[i] for i in pasos]
+    rgb = muestra_pixeles([os.path.join(ruta, n) for n in nombres])
+    if len(rgb) == 0:
+        return carpeta, [], []
+    semilla = int.from_bytes(hashlib.md5(carpeta.encode("utf-8", "surrogateescape")).digest()[:8], "little")
+    etiquetas, k = kmeans(rgb_a_lab(rgb), COLORES, rng=np.random.default_rng(semilla))
+    cuentas = np.bincount(etiquetas, minlength=k)
+    sumas = np.zeros((k, 3), dtype=np.float64)
+    np.add.at(sumas, etiquetas, rgb)
+    orden = [i for i in np.argsort(-cuentas, kind="stable") if cuentas[i] > 0]
+    colores = [[int(v) for v in (sumas[i] / cuentas[i]).round()] for i in orden]
+    pesos = [round(float(cuentas[i]) / len(rgb), 4) for i in orden]
+    return carpeta, colores, pesos
+
+
+# === ÍNDICE ===
+def cargar_indice(ruta=RUTA_INDICE):
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def actualizar(letras_dir=LETRAS_DIR, ruta_indice=RUTA_INDICE, completo=False, procesos=PROCESOS):
+    """Recalcula las paletas de las carpetas nuevas o cambiadas. Devuelve (índice, recalculadas)."""
+    previo = {} if completo else cargar_indice(ruta_indice)
+    if not os.path.isdir(letras_dir):
+        return {}, 0
+    indice, trabajos = {}, []
+    with os.scandir(letras_dir) as it:
+        carpetas = sorted(e.name for e in it if e.is_dir())
+    for carpeta in carpetas:
+        ruta = os.path.join(letras_dir, carpeta)
+        entradas = listar_carpeta(ruta)
+        if not entradas:
+            continue
+        firma = firma_carpeta(entradas)
+        anterior = previo.get(carpeta)
+        if anterior and anterior.get("firma") == firma:
+            indice[carpeta] = anterior
+        else:
+            indice[carpeta] = {"firma": firma}
+            trabajos.append((carpeta, ruta, [n for n, _, _ in entradas]))
+
+    if len(trabajos) > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(paleta_carpeta, trabajos))
+    else:
+        resultados = [paleta_carpeta(t) for t in trabajos]
+    for carpeta, colores, pesos in resultados:
+        indice[carpeta].update({"colores": colores, "pesos": pesos})
+
+    if trabajos or set(indice) != set(previo):
+        os.makedirs(os.path.dirname(ruta_indice), exist_ok=True)
+        tmp = ruta_indice + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(indice, f, ensure_ascii=False)
+        os.replace(tmp, ruta_indice)
+    return indice, len(trabajos)
+
+
+def cargar_paletas(letras_dir=LETRAS_DIR, ruta_indice=RUTA_INDICE, verificar=True):
+    """{carpeta: [(r, g, b), ...]} ordenadas por peso. Con verificar=False solo lee el
+    índice en disco, sin revisar las carpetas (si no hay índice, lo construye)."""
+    indice = cargar_indice(ruta_indice) if not verificar else None
+    if not indice:
+        indice, _ = actualizar(letras_dir, ruta_indice)
+    return {c: [tuple(col) for col in d["colores"]] for c, d in indice.items() if d.get("colores")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de paletas por carpeta de recortes (k-means en Lab).")
+    parser.add_argument("--root", type=str, default=LETRAS_DIR)
+    parser.add_argument("--out", type=str, default=RUTA_INDICE)
+    parser.add_argument("--processes", type=int, default=PROCESOS)
+    parser.add_argument("--full", action="store_true", help="Recalcula todas las carpetas.")
+    args = parser.parse_args()
+
+    indice, recalculadas = actualizar(args.root, args.out, args.full, args.processes)
+    print(f"🎨 {len(indice)} paletas ({recalculadas} recalculadas) → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+paquete_glifos.py
+Paquete de glifos: todos los recortes de recortes_letras normalizados una sola
+vez a 64×64 en escala de grises, en un .npy que se abre con memoria mapeada.
+
+  datasets/paquete_glifos/
+    glifos.npy     uint8 N×64×64: el recorte ajustado al cuadro (sin deformar),
+                   relleno con la mediana de su borde
+    mascaras.npy   uint8 N×64×64: tinta binaria (0/255), misma regla que
+                   depurar_recortes.mascara_tinta
+    indice.json    columnas por glifo: ruta, letra, serie, afiche, hash, vigente
+
+- Reconstruir solo agrega al final los recortes nuevos (o cambiados: el glifo
+  viejo queda con vigente=0). Las cabeceras .npy se escriben con espacio fijo
+  para poder crecer el arreglo sin reescribirlo.
+- Los recortes se leen a partir de recortes_letras_registros.json
+  (generar_recortes_index.py) y se normalizan en un pool de procesos.
+- PaqueteGlifos da acceso aleatorio sin copia: paquete[i] es una vista del mapa.
+
+Uso:
+  python3 python/paquete_glifos.py                  # agrega lo nuevo
+  python3 python/paquete_glifos.py --full           # reconstruye desde cero
+
+  from paquete_glifos import PaqueteGlifos
+  with PaqueteGlifos() as p:
+      glifo, mascara, fila = p.aleatorio("A")
+"""
+
+import argparse
+import ast
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from depurar_recortes import mascara_tinta
+from generar_recortes_index import INDICE_REGISTROS, ROOT, cargar_previo, indexar
+
+# === CONFIGURACIÓN ===
+CARPETA_PAQUETE = "datasets/paquete_glifos"
+LADO = 64
+LOTE = 256                    # recortes por tarea del pool
+PROCESOS = None               # None = os.cpu_count()
+LARGO_CABECERA = 128          # bytes reservados para la cabecera .npy (v1.0)
+COLUMNAS = ("ruta", "letra", "serie", "afiche", "hash", "vigente")
+
+
+# === NORMALIZACIÓN (procesos del pool) ===
+def normalizar(ruta, lado=LADO):
+    """Recorte → uint8 lado×lado: ajustado sin deformar y centrado sobre su fondo."""
+    with Image.open(ruta) as img:
+        img.draft("L", (lado * 2, lado * 2))
+        gris = img.convert("L")
+    arr = np.asarray(gris)
+    fondo = int(np.median(np.concatenate([arr[0], arr[-1], arr[:, 0], arr[:, -1]])))
+    gris.thumbnail((lado, lado), Image.LANCZOS)
+    cuadro = Image.new("L", (lado, lado), fondo)
+    cuadro.paste(gris, ((lado - gris.width) // 2, (lado - gris.height) // 2))
+    return np.asarray(cuadro, dtype=np.uint8)
+
+
+def normalizar_lote(rutas):
+    """[ruta] → (glifos N×L×L, máscaras N×L×L, [ok]). Corre en un proceso del pool."""
+    glifos = np.zeros((len(rutas), LADO, LADO), dtype=np.uint8)
+    ok = []
+    for i, ruta in enumerate(rutas):
+        try:
+            glifos[i] = normalizar(ruta)
+            ok.append(True)
+        except Exception:
+            ok.append(False)
+    mascaras = mascara_tinta(glifos).astype(np.uint8) * 255
+    return glifos, mascaras, ok
+
+
+# === .NPY QUE CRECE ===
+def _cabecera(n, lado=LADO):
+    dic = repr({"descr": "|u1", "fortran_order": False, "shape": (n, lado, lado)}).encode("latin1")
+    relleno = LARGO_CABECERA - 10 - len(dic) - 1
+    if relleno < 0:
+        raise ValueError("Cabecera .npy demasiado larga")
+    return b"\x93NUMPY\x01\x00" + (LARGO_CABECERA - 10).to_bytes(2, "little") + dic + b" " * relleno + b"\n"
+
+
+def filas_en_archivo(ruta, lado=LADO):
+    """N según la cabecera (0 si no existe)."""
+    if not os.path.exists(ruta):
+        return 0
+    with open(ruta, "rb") as f:
+        f.seek(10)
+        return ast.literal_eval(f.read(LARGO_CABECERA - 10).decode("latin1").strip())["shape"][0]
+
+
+def agregar_filas(ruta, n_vigentes, bloques, lado=LADO):
+    """Recorta el archivo a n_vigentes filas, agrega los bloques y actualiza la cabecera.
+    Los datos se escriben antes que la cabecera: una interrupción deja filas sobrantes
+    que la próxima corrida descarta."""
+    tam = lado * lado
+    modo = "r+b" if os.path.exists(ruta) else "w+b"
+    with open(ruta, modo) as f:
+        f.truncate(LARGO_CABECERA + n_vigentes * tam)
+        f.seek(0, os.SEEK_END)
+        n = n_vigentes
+        for bloque in bloques:
+            f.write(np.ascontiguousarray(bloque, dtype=np.uint8).tobytes())
+            n += len(bloque)
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(0)
+        f.write(_cabecera(n, lado))
+    return n
+
+
+def cargar_indice(carpeta):
+    ruta = os.path.join(carpeta, "indice.json")
+    if not os.path.exists(ruta):
+        return {c: [] for c in COLUMNAS}
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def construir(carpeta=CARPETA_PAQUETE, root=ROOT, registros=INDICE_REGISTROS, completo=False, procesos=PROCESOS):
+    """Agrega al paquete los recortes nuevos o cambiados. Devuelve (agregados, total, vigentes)."""
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_glifos, ruta_mascaras = os.path.join(carpeta, "glifos.npy"), os.path.join(carpeta, "mascaras.npy")
+    indice = {c: [] for c in COLUMNAS} if completo else cargar_indice(carpeta)
+    n = len(indice["ruta"])
+    if min(filas_en_archivo(ruta_glifos), filas_en_archivo(ruta_mascaras)) < n:
+        raise RuntimeError(f"{carpeta}: el índice tiene más filas que los .npy; reconstruye con --full")
+
+    recortes, _ = indexar(root, cargar_previo(registros))
+    actual = {(r, h) for r, h, v in zip(indice["ruta"], indice["hash"], indice["vigente"]) if v}
+    nuevos = [r for r in recortes["recortes"] if (r["ruta"], r["hash"]) not in actual]
+    presentes = {(r["ruta"], r["hash"]) for r in recortes["recortes"]}
+    # recortes borrados o reemplazados: su glifo queda, pero ya no es vigente
+    indice["vigente"] = [int(bool(v) and (r, h) in presentes)
+                         for r, h, v in zip(indice["ruta"], indice["hash"], indice["vigente"])]
+
+    bloques_g, bloques_m, agregados = [], [], []
+    if nuevos:
+        lotes = [nuevos[i:i + LOTE] for i in range(0, len(nuevos), LOTE)]
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            for lote, (glifos, mascaras, ok) in zip(lotes, pool.map(normalizar_lote,
+                                                                    [[r["ruta"] for r in l] for l in lotes])):
+                ok = np.array(ok, dtype=bool)
+                bloques_g.append(glifos[ok])
+                bloques_m.append(mascaras[ok])
+                agregados.extend(r for r, bueno in zip(lote, ok) if bueno)
+
+    agregar_filas(ruta_glifos, n, bloques_g)
+    agregar_filas(ruta_mascaras, n, bloques_m)
+    for r in agregados:
+        for col in COLUMNAS[:-1]:
+            indice[col].append(r[col])
+        indice["vigente"].append(1)
+    tmp = os.path.join(carpeta, "indice.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(indice, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(carpeta, "indice.json"))
+    return len(agregados), len(indice["ruta"]), sum(indice["vigente"])
+
+
+# === LECTURA ===
+class PaqueteGlifos:
+    """Acceso de solo lectura al paquete: glifos y máscaras como memmap, sin copias."""
+
+    def __init__(self, carpeta=CARPETA_PAQUETE):
+        self.carpeta = carpeta
+        self.indice = cargar_indice(carpeta)
+        n = len(self.indice["ruta"])
+        # las filas sobrantes de una corrida interrumpida quedan fuera
+        self.glifos = np.load(os.path.join(carpeta, "glifos.npy"), mmap_mode="r")[:n]
+        self.mascaras = np.load(os.path.join(carpeta, "mascaras.npy"), mmap_mode="r")[:n]
+        letras = np.array(self.indice["letra"], dtype=object)
+        vigentes = np.array(self.indice["vigente"], dtype=bool)
+        self._por_letra = {l: np.flatnonzero((letras == l) & vigentes) for l in sorted(set(self.indice["letra"]))}
+        self._vigentes = np.flatnonzero(vigentes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def __len__(self):
+        return len(self.indice["ruta"])
+
+    def __getitem__(self, i):
+        return self.glifos[i]
+
+    def letras(self):
+        return list(self._por_letra)
+
+    def ids(self, letra=None):
+        """Ids vigentes (de una letra, o todos)."""
+        return self._vigentes if letra is None else self._por_letra.get(letra, np.empty(0, dtype=np.intp))
+
+    def fila(self, i):
+        return {c: self.indice[c][i] for c in COLUMNAS}
+
+    def aleatorio(self, letra=None, rng=random):
+        """(glifo, máscara, fila) de un glifo vigente al azar; None si no hay."""
+        ids = self.ids(letra)
+        if len(ids) == 0:
+            return None
+        i = int(ids[rng.randrange(len(ids))])
+        return self.glifos[i], self.mascaras[i], self.fila(i)
+
+    def cerrar(self):
+        # el mapa se libera cuando no quedan vistas vivas
+        self.glifos = self.mascaras = None
+
+def main():
+    parser = argparse.ArgumentParser(description="Empaqueta los recortes en un .npy de glifos 64×64 con memoria mapeada.")
+    parser.add_argument("--root", type=str, default=ROOT)
+    parser.add_argument("--records", type=str, default=INDICE_REGISTROS)
+    parser.add_argument("--out", type=str, default=CARPETA_PAQUETE)
+    parser.add_argument("--processes", type=int, default=PROCESOS)
+    parser.add_argument("--full", action="store_true", help="Reconstruye el paquete desde cero.")
+    args = parser.parse_args()
+
+    agregados, total, vigentes = construir(args.out, args.root, args.records, args.full, args.processes)
+    mb = total * LADO * LADO * 2 / 1e6
+    print(f"📦 {agregados} glifos agregados; {total} en el paquete ({vigentes} vigentes, {mb:.1f} MB) → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
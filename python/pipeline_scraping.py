@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pipeline_scraping.py
+Motor único de scraping por etapas: buscar → descargar → validar → guardar.
+
+Cada etapa corre en sus propios hilos y se comunica por colas acotadas
+(backpressure): las URLs fluyen a los descargadores mientras las páginas
+siguientes de resultados todavía se están pidiendo, y varias consultas se
+intercalan bajo un mismo planificador.
+
+Los buscadores son intercambiables (BackendBusqueda):
+  - poster_scraper.BackendDDGS          (DuckDuckGo vía ddgs)
+  - scraper_imagenes_up.BackendSerpAPI  (Google Imágenes vía SerpAPI)
+
+Uso directo:
+  python3 python/pipeline_scraping.py --backend ddgs "carteles chicha Perú" "afiches Unidad Popular Chile"
+"""
+
+import argparse
+import importlib
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from tqdm import tqdm
+
+from almacen_imagenes import AlmacenImagenes, NOMBRE_ALMACEN, EXT_FORMATO
+from bitacora import Bitacora, NOMBRE_BITACORA, parsear_duracion
+from catalogo_afiches import CatalogoAfiches, RUTA_CATALOGO, normalizar_nombre
+from descargador import Descargador, CONCURRENCIA, TASA_POR_HOST, stream_image
+
+# === CONFIGURACIÓN ===
+BUSQUEDAS_SIMULTANEAS = 2     # consultas intercaladas a la vez
+COLA_URLS = 256               # URLs en espera de descarga (backpressure sobre la búsqueda)
+COLA_GUARDADO = 64            # descargas validadas en espera de guardado
+FIN = object()                # centinela de fin de etapa
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".tiff", ".bmp", ".avif")
+
+# backend → (módulo, clase)
+BACKENDS = {
+    "ddgs": ("poster_scraper", "BackendDDGS"),
+    "serpapi": ("scraper_imagenes_up", "BackendSerpAPI"),
+}
+
+
+# === INTERFAZ DE BÚSQUEDA ===
+class BackendBusqueda:
+    """Interfaz común: buscar() entrega URLs a medida que llegan las páginas."""
+
+    nombre = "base"
+
+    def buscar(self, query, max_resultados):
+        raise NotImplementedError
+
+
+def carpeta_de_consulta(query):
+    return "_".join(query.lower().split())
+
+
+# === PIPELINE ===
+class PipelineScraping:
+    """Planificador global de las cuatro etapas."""
+
+    def __init__(self, backend, out_dir, descargador, bitacora=None, min_w=0, min_h=0,
+                 carpeta_por_consulta=True, busquedas_simultaneas=BUSQUEDAS_SIMULTANEAS,
+                 headers=None, observador=None, indice_perceptual=None, radio_casi_duplicado=6,
+                 almacen=None, catalogo=None):
+        self.backend = backend
+        self.out_dir = Path(out_dir)
+        self.descargador = descargador
+        self.bitacora = bitacora
+        self.min_w, self.min_h = min_w, min_h
+        self.carpeta_por_consulta = carpeta_por_consulta
+        self.busquedas_simultaneas = max(1, busquedas_simultaneas)
+        self.headers = headers
+        self.observador = observador  # observador(query, url, res, segundos) en la etapa de guardado
+        self._observador_fallo = False
+        self.indice_perceptual = indice_perceptual  # indice_perceptual.IndicePerceptual (opcional)
+        self.radio_casi_duplicado = radio_casi_duplicado
+        self.almacen = almacen  # almacen_imagenes.AlmacenImagenes (opcional): carpetas = vistas
+        self.catalogo = catalogo  # catalogo_afiches.CatalogoAfiches (opcional): upsert al terminar
+        self._para_catalogo = []
+        self._cola_urls = queue.Queue(maxsize=COLA_URLS)
+        self._cola_guardado = queue.Queue(maxsize=COLA_GUARDADO)
+        self._vistas = set()
+        self._vistas_lock = threading.Lock()
+        self._hashes = {}
+        self.stats = {}
+        self._barra = None
+
+    # --- utilidades ---
+    def carpeta(self, query):
+        return self.out_dir / carpeta_de_consulta(query) if self.carpeta_por_consulta else self.out_dir
+
+    def _contar(self, query, clave, n=1):
+        with self._vistas_lock:
+            self.stats[query][clave] += n
+
+    def _registrar(self, url, estado, **kw):
+        if self.bitacora is not None:
+            self.bitacora.registrar(url, estado, **kw)
+
+    # --- etapa 1: búsqueda ---
+    def _buscar(self, consultas):
+        while True:
+            try:
+                query, limite = consultas.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                for url in self.backend.buscar(query, limite):
+                    self._contar(query, "encontradas")
+                    with self._vistas_lock:
+                        repetida = url in self._vistas
+                        self._vistas.add(url)
+                    if repetida or (self.bitacora is not None and self.bitacora.debe_saltar(url)):
+                        self._contar(query, "omitidas")
+                        continue
+                    if self._barra is not None:
+                        with self._vistas_lock:
+                            self._barra.total += 1
+                            self._barra.refresh()
+                    self._cola_urls.put((query, url))
+            except Exception as e:
+                print(f"⚠️ Búsqueda fallida para '{query}': {e}")
+
+    # --- etapas 2 y 3: descarga + validación ---
+    def _descargar(self):
+        while True:
+            item = self._cola_urls.get()
+            if item is FIN:
+                return
+            query, url = item
+            t0 = time.perf_counter()
+            try:
+                res = stream_image(self.descargador, url, self.out_dir, self.min_w, self.min_h,
+                                   headers=self.headers)
+            except Exception:
+                res = None
+            self._cola_guardado.put((query, url, res, time.perf_counter() - t0))
+
+    # --- etapa 4: guardado ---
+    def _hashes_de(self, carpeta):
+        if carpeta not in self._hashes:
+            carpeta.mkdir(parents=True, exist_ok=True)
+            self._hashes[carpeta] = set(p.stem for p in carpeta.iterdir()
+                                        if p.suffix.lower() in EXTENSIONES)
+        return self._hashes[carpeta]
+
+    def _guardar(self):
+        while True:
+            item = self._cola_guardado.get()
+            if item is FIN:
+                return
+            query, url, res, segundos = item
+            try:
+                self._guardar_uno(query, url, res, segundos)
+            except Exception as e:
+                # un fallo de disco/sqlite no debe matar el único hilo de guardado:
+                # los descargadores quedarían bloqueados en put() con la cola llena
+                print(f"⚠️ Error al guardar {url}: {e}")
+                if res is not None and res.get("tmp") is not None and res["tmp"].exists():
+                    res["tmp"].unlink()
+                self._contar(query, "errores")
+                try:
+                    self._registrar(url, "error", motivo="guardado")
+                except Exception:
+                    pass
+
+    def _guardar_uno(self, query, url, res, segundos):
+        if self._barra is not None:
+            with self._vistas_lock:
+                self._barra.update(1)
+        if self.observador is not None:
+            try:
+                self.observador(query, url, res, segundos)
+            except Exception as e:
+                # un observador roto no debe afectar el guardado; se avisa una sola vez
+                if not self._observador_fallo:
+                    self._observador_fallo = True
+                    print(f"⚠️ Error en el observador (se ignoran los siguientes): {e!r}")
+        if res is None:
+            self._contar(query, "errores")
+            self._registrar(url, "error", motivo="sin_respuesta")
+            return
+        if not res["ok"]:
+            self._contar(query, "rechazadas")
+            self._registrar(url, "rechazada", http_status=res["status"], bytes=res["bytes"],
+                            motivo=res["motivo"])
+            return
+        carpeta = self.carpeta(query)
+        vistos = self._hashes_de(carpeta)
+        h = res["hash"]
+        destino = carpeta / f"{h}.jpg"
+        if h in vistos:
+            res["tmp"].unlink()
+            self._contar(query, "duplicadas")
+            self._registrar(url, "ok", hash=h, http_status=res["status"], bytes=res["bytes"],
+                            motivo="duplicada", ruta=str(destino))
+            return
+        ph = None
+        if self.indice_perceptual is not None:
+            try:
+                ph, similares = self.indice_perceptual.revisar(
+                    "afiches", res["tmp"], self.radio_casi_duplicado, agregar=False)
+            except Exception:
+                similares = []
+            if similares:
+                res["tmp"].unlink()
+                self._contar(query, "casi_duplicadas")
+                self._registrar(url, "rechazada", hash=h, http_status=res["status"],
+                                bytes=res["bytes"], motivo="casi_duplicada",
+                                ruta=similares[0][1])
+                return
+        if self.almacen is not None:
+            self.almacen.ingresar(res["tmp"], h)
+            destino = self.almacen.vincular(carpeta, h)
+        else:
+            os.replace(res["tmp"], destino)
+        vistos.add(h)
+        if ph is not None:
+            st = destino.stat()
+            self.indice_perceptual.agregar("afiches", destino, ph, st.st_mtime, st.st_size)
+        self._contar(query, "guardadas")
+        self._registrar(url, "ok", hash=h, http_status=res["status"], bytes=res["bytes"],
+                        ruta=str(destino))
+        self._para_catalogo.append((destino, h, url))
+
+    def _catalogar(self):
+        """Upsert de lo guardado en el catálogo (después de transcodificar: la vista puede
+        haber cambiado de extensión)."""
+        registros = []
+        for destino, h, url in self._para_catalogo:
+            if not (destino.is_symlink() or destino.exists()) and self.almacen is not None:
+                destino = destino.with_suffix(EXT_FORMATO[self.almacen.formato])
+            registros.append({"carpeta": normalizar_nombre(destino.parent.name), "nombre_final": destino.name,
+                              "nombre_original": destino.name, "hash": h, "url": url,
+                              "ruta_absoluta": os.path.abspath(destino)})
+        self.catalogo.upsert(registros)
+        self._para_catalogo = []
+
+    # --- ejecución ---
+    def ejecutar(self, queries, limite):
+        """Corre todas las consultas intercaladas; devuelve estadísticas por consulta."""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        consultas = queue.Queue()
+        for q in queries:
+            consultas.put((q, limite))
+            self.stats[q] = dict(encontradas=0, omitidas=0, guardadas=0, duplicadas=0,
+                                 casi_duplicadas=0, rechazadas=0, errores=0)
+
+        n_descarga = self.descargador.concurrencia
+        self._barra = tqdm(total=0, desc=f"Scraping ({self.backend.nombre})", unit="img")
+        buscadores = [threading.Thread(target=self._buscar, args=(consultas,), daemon=True)
+                      for _ in range(min(self.busquedas_simultaneas, len(queries)))]
+        descargadores = [threading.Thread(target=self._descargar, daemon=True) for _ in range(n_descarga)]
+        guardador = threading.Thread(target=self._guardar, daemon=True)
+        for t in buscadores + descargadores + [guardador]:
+            t.start()
+
+        for t in buscadores:
+            t.join()
+        for _ in descargadores:
+            self._cola_urls.put(FIN)
+        for t in descargadores:
+            t.join()
+        self._cola_guardado.put(FIN)
+        guardador.join()
+        self._barra.close()
+        self._barra = None
+        if self.almacen is not None:
+            try:
+                n = self.almacen.transcodificar()
+            except Exception as e:
+                # las vistas siguen apuntando a los originales: el catálogo se actualiza igual
+                print(f"⚠️ Transcodificación interrumpida: {e}")
+                n = 0
+            if n:
+                print(f"🗜️ {n} imágenes transcodificadas a {self.almacen.formato} en {self.almacen.raiz}")
+        if self.catalogo is not None and self._para_catalogo:
+            self._catalogar()
+
+        for q, s in self.stats.items():
+            print(f"→ {q}: {s['guardadas']} guardadas en {self.carpeta(q)} "
+                  f"({s['encontradas']} encontradas, {s['omitidas']} omitidas, "
+                  f"{s['duplicadas']} duplicadas, {s['casi_duplicadas']} casi-duplicadas, "
+                  f"{s['rechazadas']} rechazadas, {s['errores']} errores)")
+        return self.stats
+
+
+def abrir_indice_perceptual(radio, out_dir):
+    """Índice perceptual junto al dataset si se pidió --near-dup-radius; si no, None."""
+    if radio is None:
+        return None
+    from indice_perceptual import IndicePerceptual, NOMBRE_INDICE  # numpy solo si se usa
+    indice = IndicePerceptual(Path(out_dir) / NOMBRE_INDICE)
+    nuevos = indice.actualizar("afiches", (p for p in Path(out_dir).rglob("*.jpg")
+                                           if not p.relative_to(out_dir).parts[0].startswith("_")))
+    if nuevos:
+        print(f"🔎 Índice perceptual: {nuevos} afiches existentes indexados")
+    return indice
+
+
+def abrir_almacen(usar, out_dir):
+    """Almacén direccionado por contenido en <out_dir>/_almacen si se pidió; si no, None."""
+    if not usar:
+        return None
+    return AlmacenImagenes(Path(out_dir) / NOMBRE_ALMACEN)
+
+
+def abrir_catalogo(ruta):
+    """Catálogo de afiches en `ruta` si se pidió; si no, None."""
+    if not ruta:
+        return None
+    return CatalogoAfiches(ruta)
+
+
+def cargar_backend(nombre, **kwargs):
+    """Instancia un backend por nombre sin importar dependencias de los demás."""
+    modulo, clase = BACKENDS[nombre]
+    return getattr(importlib.import_module(modulo), clase)(**kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline de scraping buscar → descargar → validar → guardar.")
+    parser.add_argument("queries", nargs="+", help="Consultas a intercalar.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="ddgs")
+    parser.add_argument("--api-key", type=str, default=os.getenv("SERPAPI_KEY", ""),
+                        help="API key de SerpAPI (solo backend serpapi).")
+    parser.add_argument("--out-dir", type=str, default="poster_dataset")
+    parser.add_argument("--max", type=int, default=100, help="Máximo de resultados por consulta.")
+    parser.add_argument("--min-width", type=int, default=0)
+    parser.add_argument("--min-height", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCIA)
+    parser.add_argument("--rate-per-host", type=float, default=TASA_POR_HOST)
+    parser.add_argument("--parallel-queries", type=int, default=BUSQUEDAS_SIMULTANEAS)
+    parser.add_argument("--journal", type=str, default=None,
+                        help=f"Bitácora SQLite (default: <out-dir>/{NOMBRE_BITACORA}).")
+    parser.add_argument("--refresh-older-than", type=parsear_duracion, default=None)
+    parser.add_argument("--near-dup-radius", type=int, default=None,
+                        help="Descarta casi-duplicados (Hamming ≤ radio) vía indice_perceptual.")
+    parser.add_argument("--catalog", type=str, default=RUTA_CATALOGO,
+                        help="Catálogo SQLite de afiches a actualizar ('' para omitir).")
+    parser.add_argument("--store", action=argparse.BooleanOptionalAction, default=True,
+                        help="Guarda en el almacén por contenido (_almacen) con carpetas como vistas.")
+    args = parser.parse_args()
+
+    kwargs = {"api_key": args.api_key} if args.backend == "serpapi" else {}
+    backend = cargar_backend(args.backend, **kwargs)
+    journal = args.journal or str(Path(args.out_dir) / NOMBRE_BITACORA)
+    with Bitacora(journal, refrescar_despues=args.refresh_older_than) as bitacora, \
+            Descargador(concurrencia=args.concurrency, tasa_por_host=args.rate_per_host,
+                        headers=getattr(backend, "headers", None)) as descargador:
+        indice = abrir_indice_perceptual(args.near_dup_radius, args.out_dir)
+        almacen = abrir_almacen(args.store, args.out_dir)
+        catalogo = abrir_catalogo(args.catalog)
+        try:
+            pipeline = PipelineScraping(backend, args.out_dir, descargador, bitacora=bitacora,
+                                        min_w=args.min_width, min_h=args.min_height,
+                                        busquedas_simultaneas=args.parallel_queries,
+                                        indice_perceptual=indice,
+                                        radio_casi_duplicado=args.near_dup_radius or 0,
+                                        almacen=almacen, catalogo=catalogo)
+            pipeline.ejecutar(args.queries, args.max)
+        finally:
+            if indice is not None:
+                indice.cerrar()
+            if almacen is not None:
+                almacen.cerrar()
+            if catalogo is not None:
+                catalogo.cerrar()
+
+
+if __name__ == "__main__":
+    main()
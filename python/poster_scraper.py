@@ -3,20 +3,31 @@
 poster_scraper_ddgs.py
 Descarga masiva de imágenes desde DuckDuckGo (ddgs).
 Usado para recopilar afiches políticos, culturales y tipográficos (1930–2025).
+
+Las descargas corren en paralelo sobre descargador.Descargador: N imágenes en
+vuelo, ritmo limitado por host (token bucket) y backoff ante 429/5xx.
+Las consultas se intercalan en pipeline_scraping.PipelineScraping, con este
+script como backend de búsqueda (BackendDDGS).
+  python3 python/poster_scraper.py --concurrency 16 --parallel-queries 3
 """
 
 from ddgs import DDGS
 import requests
 from pathlib import Path
-from tqdm import tqdm
+import argparse
 import hashlib
 import time
 
+from descargador import Descargador, CONCURRENCIA, TASA_POR_HOST
+from bitacora import Bitacora, NOMBRE_BITACORA, parsear_duracion
+from pipeline_scraping import (BackendBusqueda, PipelineScraping, BUSQUEDAS_SIMULTANEAS,
+                               abrir_indice_perceptual, abrir_almacen, abrir_catalogo)
+from catalogo_afiches import RUTA_CATALOGO
+
 # === CONFIGURACIÓN ===
 OUT_DIR = "poster_dataset"
 IMAGES_PER_QUERY = 100        # máximo recomendado por consulta
-SLEEP_BETWEEN_QUERIES = 3.0   # segundos de espera entre consultas
-SLEEP_BETWEEN_IMAGES = 0.4    # segundos de espera entre descargas
+SLEEP_BETWEEN_RESULTS = 0.3   # pausa entre resultados de ddgs (rate-limit interno)
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; PosterScraper/1.0)"}
 
 
@@ -31,50 +42,96 @@ def make_dir(path):
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
-def download_image(url, dest_folder):
-    """Descarga una imagen y la guarda en disco."""
+def download_image(url, dest_folder, descargador=None, bitacora=None):
+    """Descarga una imagen y la guarda en disco (registrando el resultado en la bitácora)."""
+    if bitacora is not None and bitacora.debe_saltar(url):
+        return None
+    try:
+        if descargador is not None:
+            r = descargador.get(url)
+        else:
+            r = requests.get(url, headers=HEADERS, timeout=12)
+    except Exception:
+        r = None
+    if r is None:
+        if bitacora is not None:
+            bitacora.registrar(url, "error", motivo="sin_respuesta")
+        return None
+    if r.status_code != 200 or not r.content:
+        if bitacora is not None:
+            bitacora.registrar(url, "rechazada", http_status=r.status_code,
+                               motivo="http" if r.status_code != 200 else "vacia")
+        return None
+    h = md5_bytes(r.content)
+    dest = Path(dest_folder) / f"{h}.jpg"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=12)
-        if r.status_code != 200 or not r.content:
-            return None
-        h = md5_bytes(r.content)
-        dest = Path(dest_folder) / f"{h}.jpg"
-        if dest.exists():
-            return None  # ya existe
-        with open(dest, "wb") as f:
+        with open(dest, "xb") as f:  # "xb": atómico frente a otro hilo con el mismo hash
             f.write(r.content)
-        return str(dest)
+        guardada = str(dest)
+    except FileExistsError:
+        guardada = None  # ya existe
     except Exception:
+        if bitacora is not None:
+            bitacora.registrar(url, "error", http_status=r.status_code, motivo="escritura")
         return None
+    if bitacora is not None:
+        bitacora.registrar(url, "ok", hash=h, http_status=r.status_code, bytes=len(r.content),
+                           motivo=None if guardada else "duplicada", ruta=str(dest))
+    return guardada
+
+
+class BackendDDGS(BackendBusqueda):
+    """Backend de búsqueda sobre DuckDuckGo (ddgs): entrega URLs a medida que llegan."""
+
+    nombre = "ddgs"
+    headers = HEADERS
+
+    def buscar(self, query, max_resultados):
+        with DDGS() as ddgs:
+            for r in ddgs.images(query, max_results=max_resultados, safesearch="off"):
+                if "image" in r:
+                    yield r["image"]
+                time.sleep(SLEEP_BETWEEN_RESULTS)  # evita rate-limit interno
 
 
 def fetch_image_urls(query, max_results=50):
     """Obtiene URLs de imágenes desde DuckDuckGo (usando ddgs actual)."""
-    urls = []
-    with DDGS() as ddgs:
-        for r in ddgs.images(query, max_results=max_results, safesearch="off"):
-            if "image" in r:
-                urls.append(r["image"])
-            time.sleep(0.3)  # evita rate-limit interno
-    return urls
+    return list(BackendDDGS().buscar(query, max_results))
 
 
-def scrape_query(query, out_dir=OUT_DIR, limit=IMAGES_PER_QUERY):
+def scrape_query(query, out_dir=OUT_DIR, limit=IMAGES_PER_QUERY, descargador=None, bitacora=None):
     """Descarga todas las imágenes para una consulta."""
-    folder = Path(out_dir) / "_".join(query.lower().split())
-    make_dir(folder)
-    urls = fetch_image_urls(query, max_results=limit)
-    print(f"\n{query}: {len(urls)} imágenes encontradas")
-
-    for url in tqdm(urls, desc=f"Descargando {query}", unit="img"):
-        download_image(url, folder)
-        time.sleep(SLEEP_BETWEEN_IMAGES)
-
-    count = len(list(folder.glob("*.jpg")))
-    print(f"→ {count} guardadas en {folder}\n")
+    propio = descargador is None
+    if propio:
+        descargador = Descargador(headers=HEADERS)
+    try:
+        pipeline = PipelineScraping(BackendDDGS(), out_dir, descargador, bitacora=bitacora)
+        return pipeline.ejecutar([query], limit)[query]
+    finally:
+        if propio:
+            descargador.cerrar()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Descarga masiva de afiches desde DuckDuckGo (ddgs).")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCIA,
+                        help="Descargas simultáneas (default: %(default)s).")
+    parser.add_argument("--rate-per-host", type=float, default=TASA_POR_HOST,
+                        help="Solicitudes por segundo por host (default: %(default)s).")
+    parser.add_argument("--parallel-queries", type=int, default=BUSQUEDAS_SIMULTANEAS,
+                        help="Consultas intercaladas a la vez (default: %(default)s).")
+    parser.add_argument("--near-dup-radius", type=int, default=None,
+                        help="Descarta casi-duplicados perceptuales (Hamming ≤ radio, p.ej. 6).")
+    parser.add_argument("--journal", type=str, default=str(Path(OUT_DIR) / NOMBRE_BITACORA),
+                        help="Bitácora SQLite de URLs ya procesadas (default: %(default)s).")
+    parser.add_argument("--refresh-older-than", type=parsear_duracion, default=None,
+                        help="Re-descarga entradas más antiguas que esto (p.ej. 12h, 7d). Por defecto no expiran.")
+    parser.add_argument("--catalog", type=str, default=RUTA_CATALOGO,
+                        help="Catálogo SQLite de afiches a actualizar, '' para omitir (default: %(default)s).")
+    parser.add_argument("--store", action=argparse.BooleanOptionalAction, default=True,
+                        help="Almacén por contenido (_almacen) con carpetas como vistas (default: %(default)s).")
+    args = parser.parse_args()
+
     queries = [
         "afiches Unidad Popular Chile",
         "afiches Brigada Ramona Parra",
@@ -88,9 +145,27 @@ def main():
         "carteles tipográficos revolucionarios"
     ]
 
-    for q in queries:
-        scrape_query(q, out_dir=OUT_DIR, limit=IMAGES_PER_QUERY)
-        time.sleep(SLEEP_BETWEEN_QUERIES)
+    with Bitacora(args.journal, refrescar_despues=args.refresh_older_than) as bitacora, \
+            Descargador(concurrencia=args.concurrency, tasa_por_host=args.rate_per_host,
+                        headers=HEADERS) as descargador:
+        indice = abrir_indice_perceptual(args.near_dup_radius, OUT_DIR)
+        almacen = abrir_almacen(args.store, OUT_DIR)
+        catalogo = abrir_catalogo(args.catalog)
+        try:
+            pipeline = PipelineScraping(BackendDDGS(), OUT_DIR, descargador, bitacora=bitacora,
+                                        busquedas_simultaneas=args.parallel_queries,
+                                        indice_perceptual=indice,
+                                        radio_casi_duplicado=args.near_dup_radius or 0,
+                                        almacen=almacen, catalogo=catalogo)
+            pipeline.ejecutar(queries, IMAGES_PER_QUERY)
+        finally:
+            if indice is not None:
+                indice.cerrar()
+            if almacen is not None:
+                almacen.cerrar()
+            if catalogo is not None:
+                catalogo.cerrar()
+        print(f"📒 Bitácora: {bitacora.resumen()}")
 
 
 if __name__ == "__main__":
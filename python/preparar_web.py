@@ -1,106 +1,199 @@
+import argparse
+import hashlib
 import json
 import os
 import shutil
-import random
 
 # --- CONFIGURACIÓN ---
 LIMITE_POR_LETRA = 40  # Cantidad de imágenes por letra que se quedarán en la web
+SEMILLA = "abecedario-popular"  # Cambiarla renueva la selección completa
 
 # Rutas relativas desde la raíz del proyecto
 CARPETA_ORIGINAL_RECORTES = "recortes_letras"
 JSON_ORIGINAL = "recortes_letras_index.json"
+JSON_REGISTROS = "recortes_letras_registros.json"  # índice estructurado (generar_recortes_index.py)
 
 CARPETA_DESTINO = "assets/recortes_web"
 JSON_DESTINO = "assets/recortes_web_index.json"
 
-def main():
-    print(f"📍 Directorio actual de ejecución: {os.getcwd()}")
-    print(f"📖 Buscando archivo índice: {JSON_ORIGINAL}...")
+DERIVADOS = True  # índice apuntando a variantes WebP/PNG livianas (derivados_web.py)
 
-    # 1. Cargar el JSON original
-    try:
-        with open(JSON_ORIGINAL, 'r', encoding='utf-8') as f:
-            data_cruda = json.load(f)
-    except FileNotFoundError:
-        print(f"\n❌ ERROR CRÍTICO: No encuentro '{JSON_ORIGINAL}'.")
-        print("Asegúrate de ejecutar este script desde la raíz del proyecto, así:")
-        print("   python3 python/preparar_web.py")
-        return
+FICLONE = 0x40049409  # ioctl de Linux para reflinks (btrfs, xfs)
 
-    # 2. Agrupar las rutas por Letra
-    print("🔄 Analizando lista de archivos...")
+def cargar_grupos():
+    """{letra: [ruta, ...]} desde el índice estructurado o, si no existe, desde la lista plana."""
     grupos = {}
-    
+    if os.path.exists(JSON_REGISTROS):
+        print(f"📖 Leyendo índice estructurado: {JSON_REGISTROS}...")
+        with open(JSON_REGISTROS, 'r', encoding='utf-8') as f:
+            for r in json.load(f)["recortes"]:
+                grupos.setdefault(r["letra"], []).append(r["ruta"])
+        return grupos
+
+    print(f"📖 Buscando archivo índice: {JSON_ORIGINAL}...")
+    with open(JSON_ORIGINAL, 'r', encoding='utf-8') as f:
+        data_cruda = json.load(f)
+
     # data_cruda es una lista: ["recortes_letras/A/img1.png", "recortes_letras/B/img2.png"...]
     for ruta in data_cruda:
         # Normalizamos la ruta para evitar problemas de barras / o \
-        ruta_clean = ruta.replace('\\', '/')
-        partes = ruta_clean.split('/')
-        
+        partes = ruta.replace('\\', '/').split('/')
+
         # Estructura esperada: ["recortes_letras", "A", "archivo.png"]
-        # La letra debería estar en la posición 1
         if len(partes) > 2 and partes[0] == CARPETA_ORIGINAL_RECORTES:
-            letra = partes[1] # Aquí extraemos "A", "B", etc.
-            
-            if letra not in grupos:
-                grupos[letra] = []
-            grupos[letra].append(ruta)
-        elif len(partes) > 1: 
+            grupos.setdefault(partes[1], []).append(ruta)
+        elif len(partes) > 1:
             # Caso fallback por si la ruta es distinta pero tiene subcarpeta
             letra = partes[0] if partes[0] != CARPETA_ORIGINAL_RECORTES else partes[1]
-            if letra not in grupos:
-                grupos[letra] = []
-            grupos[letra].append(ruta)
+            grupos.setdefault(letra, []).append(ruta)
+    return grupos
 
-    # 3. Preparar carpeta de destino
-    if os.path.exists(CARPETA_DESTINO):
-        shutil.rmtree(CARPETA_DESTINO)
-    os.makedirs(CARPETA_DESTINO)
+def seleccionar(lista_rutas, limite, semilla):
+    """Los `limite` recortes con menor hash(semilla + nombre).
+
+    Determinista para una semilla, y estable: agregar o quitar un recorte solo
+    cambia a lo sumo un elemento de la selección (no re-baraja la letra entera).
+    """
+    def rango(ruta):
+        return hashlib.md5(f"{semilla}:{os.path.basename(ruta)}".encode("utf-8")).hexdigest()
+    return sorted(lista_rutas, key=rango)[:limite]
 
-    nuevo_indice_lista = [] 
-    total_copiados = 0
+def enlazar_o_copiar(origen, destino):
+    """Enlace duro si es el mismo sistema de archivos; si no, reflink; si no, copia."""
+    try:
+        os.link(origen, destino)
+        return "enlace"
+    except OSError:
+        pass
+    try:
+        import fcntl
+        with open(origen, "rb") as fo, open(destino, "wb") as fd:
+            fcntl.ioctl(fd.fileno(), FICLONE, fo.fileno())
+        shutil.copystat(origen, destino)
+        return "reflink"
+    except (ImportError, OSError):
+        pass  # sin soporte de reflink: copia normal (sobrescribe el archivo vacío)
+    shutil.copy2(origen, destino)
+    return "copia"
 
-    # 4. Copiar archivos seleccionados
-    print(f"⚡ Encontré {len(grupos)} categorías (letras). Iniciando copia...")
+def mismo_archivo(a, b):
+    try:
+        sa, sb = os.stat(a), os.stat(b)
+    except OSError:
+        return False
+    return (sa.st_dev, sa.st_ino) == (sb.st_dev, sb.st_ino) or \
+        (sa.st_size == sb.st_size and int(sa.st_mtime) == int(sb.st_mtime))
 
-    for letra, lista_rutas in grupos.items():
-        # Crear carpeta para la letra (ej: assets/recortes_web/A)
-        ruta_letra_destino = os.path.join(CARPETA_DESTINO, str(letra))
-        os.makedirs(ruta_letra_destino, exist_ok=True)
+def escribir_json_atomico(ruta, datos):
+    """Reemplaza el JSON de una vez (nunca queda a medias para el sitio) y solo si cambió."""
+    contenido = json.dumps(datos, indent=2)
+    if os.path.exists(ruta):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            if f.read() == contenido:
+                return False
+    tmp = ruta + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(contenido)
+    os.replace(tmp, ruta)
+    return True
 
-        # Barajar y cortar (random sampling)
-        seleccion = lista_rutas[:] 
-        random.shuffle(seleccion)
-        seleccion = seleccion[:LIMITE_POR_LETRA] 
+def sincronizar(grupos, limite, semilla, completo=False):
+    """Lleva CARPETA_DESTINO a la selección objetivo tocando solo lo que cambió."""
+    if completo and os.path.exists(CARPETA_DESTINO):
+        shutil.rmtree(CARPETA_DESTINO)
+    os.makedirs(CARPETA_DESTINO, exist_ok=True)
 
-        for ruta_vieja in seleccion:
-            # Verificar si el archivo existe físicamente antes de copiar
+    nuevo_indice_lista = []
+    conteo = {"agregados": 0, "actualizados": 0, "eliminados": 0, "sin_cambios": 0}
+    modos = {}
+
+    for letra in sorted(grupos):
+        ruta_letra_destino = os.path.join(CARPETA_DESTINO, str(letra))
+        objetivo = {}
+        for ruta_vieja in seleccionar(grupos[letra], limite, semilla):
+            # Verificar si el archivo existe físicamente antes de enlazar
             if os.path.exists(ruta_vieja):
-                nombre_archivo = os.path.basename(ruta_vieja)
-                
-                # Destino físico en disco
-                destino_final = os.path.join(ruta_letra_destino, nombre_archivo)
-                shutil.copy2(ruta_vieja, destino_final)
-                
-                # Guardar la ruta web para el JSON (usando siempre /)
-                # Formato: assets/recortes_web/A/archivo.png
-                nueva_ruta_web = f"{CARPETA_DESTINO}/{letra}/{nombre_archivo}"
-                nuevo_indice_lista.append(nueva_ruta_web)
-                total_copiados += 1
+                objetivo[os.path.basename(ruta_vieja)] = ruta_vieja
+
+        presentes = set(os.listdir(ruta_letra_destino)) if os.path.isdir(ruta_letra_destino) else set()
+        for nombre in sorted(presentes - set(objetivo)):
+            os.remove(os.path.join(ruta_letra_destino, nombre))
+            conteo["eliminados"] += 1
+
+        if objetivo:
+            os.makedirs(ruta_letra_destino, exist_ok=True)
+        for nombre_archivo, ruta_vieja in objetivo.items():
+            destino_final = os.path.join(ruta_letra_destino, nombre_archivo)
+            if nombre_archivo in presentes:
+                if mismo_archivo(ruta_vieja, destino_final):
+                    conteo["sin_cambios"] += 1
+                else:
+                    os.remove(destino_final)
+                    modo = enlazar_o_copiar(ruta_vieja, destino_final)
+                    modos[modo] = modos.get(modo, 0) + 1
+                    conteo["actualizados"] += 1
             else:
-                # Si no encuentra el archivo, lo ignora silenciosamente o avisa
-                # print(f"⚠️ Archivo no encontrado: {ruta_vieja}")
-                pass
+                modo = enlazar_o_copiar(ruta_vieja, destino_final)
+                modos[modo] = modos.get(modo, 0) + 1
+                conteo["agregados"] += 1
+            # Formato web (usando siempre /): assets/recortes_web/A/archivo.png
+            nuevo_indice_lista.append(f"{CARPETA_DESTINO}/{letra}/{nombre_archivo}")
+
+    # Letras que ya no están en el índice
+    for letra in sorted(set(os.listdir(CARPETA_DESTINO)) - set(str(l) for l in grupos)):
+        ruta_letra = os.path.join(CARPETA_DESTINO, letra)
+        if os.path.isdir(ruta_letra):
+            conteo["eliminados"] += len(os.listdir(ruta_letra))
+            shutil.rmtree(ruta_letra)
+
+    return nuevo_indice_lista, conteo, modos
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincroniza la selección de recortes publicada en la web.")
+    parser.add_argument("--limit", type=int, default=LIMITE_POR_LETRA, help="Recortes por letra.")
+    parser.add_argument("--seed", type=str, default=SEMILLA, help="Semilla de la selección.")
+    parser.add_argument("--full", action="store_true", help="Borra y recrea la carpeta destino (modo antiguo).")
+    parser.add_argument("--derivatives", action=argparse.BooleanOptionalAction, default=DERIVADOS,
+                        help="Publica derivados livianos y apunta el índice a ellos.")
+    args = parser.parse_args()
+
+    print(f"📍 Directorio actual de ejecución: {os.getcwd()}")
+
+    # 1. Cargar el índice y agrupar las rutas por letra
+    try:
+        grupos = cargar_grupos()
+    except FileNotFoundError:
+        print(f"\n❌ ERROR CRÍTICO: No encuentro '{JSON_ORIGINAL}'.")
+        print("Asegúrate de ejecutar este script desde la raíz del proyecto, así:")
+        print("   python3 python/preparar_web.py")
+        return
+
+    # 2. Diferencia contra lo que ya está en disco
+    print(f"🔄 Sincronizando {len(grupos)} categorías (letras) con semilla '{args.seed}'...")
+    nuevo_indice_lista, conteo, modos = sincronizar(grupos, args.limit, args.seed, completo=args.full)
+
+    # 3. Derivados web (caché por hash del recorte)
+    stats_derivados = None
+    if args.derivatives:
+        from derivados_web import generar_derivados, guardar_json, JSON_VARIANTES
+        nuevo_indice_lista, variantes, stats_derivados = generar_derivados(nuevo_indice_lista)
+        guardar_json(JSON_VARIANTES, variantes, indent=2, ensure_ascii=False)
 
-    # 5. Guardar el nuevo JSON
-    with open(JSON_DESTINO, 'w', encoding='utf-8') as f:
-        json.dump(nuevo_indice_lista, f, indent=2)
+    # 4. Guardar el nuevo JSON (atómico)
+    json_cambio = escribir_json_atomico(JSON_DESTINO, nuevo_indice_lista)
 
     print("-" * 30)
-    print(f"✅ ÉXITO. Se copiaron {total_copiados} imágenes.")
-    print(f"📂 Carpeta creada: {CARPETA_DESTINO}")
-    print(f"📄 Nuevo JSON generado: {JSON_DESTINO}")
-    print("👉 Recuerda subir estos nuevos archivos a GitHub.")
+    print(f"✅ ÉXITO. {len(nuevo_indice_lista)} imágenes publicadas: {conteo['agregados']} agregadas, "
+          f"{conteo['actualizados']} actualizadas, {conteo['eliminados']} eliminadas, "
+          f"{conteo['sin_cambios']} sin cambios.")
+    if modos:
+        print(f"🔗 Transferencia: {', '.join(f'{n} por {m}' for m, n in sorted(modos.items()))}")
+    if stats_derivados is not None:
+        from derivados_web import imprimir_resumen
+        imprimir_resumen(stats_derivados)
+    print(f"📄 JSON {'actualizado' if json_cambio else 'sin cambios'}: {JSON_DESTINO}")
+    if conteo["agregados"] or conteo["actualizados"] or conteo["eliminados"] or json_cambio:
+        print("👉 Recuerda subir estos cambios a GitHub.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
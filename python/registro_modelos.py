@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+registro_modelos.py
+Carga perezosa de los decoders (saved_models_temp/decoder_<letra>) y de las
+paletas para los generadores de composiciones.
+
+- Importar este módulo no importa TensorFlow: solo se lista la carpeta de
+  modelos. TF/Keras se importan al pedir el primer decoder.
+- Cada decoder se carga la primera vez que se pide y se calienta con un lote
+  de latentes en cero, así el primer módulo real no paga el trazado del grafo.
+- precargar() (o RegistroDecoders(precargar=True)) carga y calienta todos de
+  una vez, para corridas largas.
+- PaletasPerezosas se comporta como el dict de paletas, pero solo ejecuta la
+  extracción cuando alguien lo lee.
+
+Uso:
+  from registro_modelos import RegistroDecoders, PaletasPerezosas
+  MODELOS_DECODER = RegistroDecoders(MODELOS_DIR)
+  letra, modelo = MODELOS_DECODER.aleatorio()
+  glifos = decodificar(modelo, z)          # uint8 N×64×64
+"""
+
+import os
+import random
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+
+# === CONFIGURACIÓN ===
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELOS_DIR = os.path.join(BASE_DIR, "maquina-de-contrapropaganda", "saved_models_temp")
+IMG_SIZE = 64
+LATENT_DIM = 64
+LOTE_CALENTAMIENTO = 1        # latentes del lote de calentamiento
+
+
+def _cargar_tfsmlayer(ruta):
+    """Importa Keras recién aquí: el costo de TensorFlow lo paga quien use un decoder."""
+    import tensorflow as tf  # noqa: F401
+    from keras.layers import TFSMLayer
+    return TFSMLayer(ruta, call_endpoint="serving_default")
+
+
+def decodificar(modelo, z, lado=IMG_SIZE):
+    """Latentes N×D → glifos uint8 N×lado×lado."""
+    out = modelo(np.asarray(z, dtype=np.float32), training=False)
+    if isinstance(out, dict):
+        out = list(out.values())[0]
+    arr = out.numpy() if hasattr(out, "numpy") else np.asarray(out)
+    return np.clip(arr * 255, 0, 255).astype(np.uint8).reshape(-1, lado, lado)
+
+
+class RegistroDecoders(Mapping):
+    """Decoders por letra, cargados al primer uso. Es un Mapping letra → modelo:
+    registro["A"] carga el decoder si hace falta; len/bool/iter solo miran la carpeta."""
+
+    def __init__(self, carpeta=MODELOS_DIR, precargar=False, lote_calentamiento=LOTE_CALENTAMIENTO,
+                 latent_dim=LATENT_DIM, cargador=_cargar_tfsmlayer):
+        self.carpeta = carpeta
+        self.lote_calentamiento = lote_calentamiento
+        self.latent_dim = latent_dim
+        self._cargador = cargador
+        self._rutas = {}
+        if os.path.isdir(carpeta):
+            for nombre in sorted(os.listdir(carpeta)):
+                if nombre.startswith("decoder_"):
+                    self._rutas[nombre.split("_")[-1].upper()] = os.path.join(carpeta, nombre)
+        self._modelos = {}
+        self._fallidos = set()
+        self._lock = threading.Lock()
+        if precargar:
+            self.precargar()
+
+    # --- Mapping ---
+    def __getitem__(self, letra):
+        modelo = self.obtener(letra)
+        if modelo is None:
+            raise KeyError(letra)
+        return modelo
+
+    def __iter__(self):
+        return iter(self.letras())
+
+    def __len__(self):
+        return len(self.letras())
+
+    def letras(self):
+        """Letras con decoder disponible (las que fallaron al cargar quedan fuera)."""
+        return [l for l in self._rutas if l not in self._fallidos]
+
+    def cargados(self):
+        return list(self._modelos)
+
+    # --- carga ---
+    def obtener(self, letra):
+        """Decoder de la letra, cargado y calentado la primera vez; None si no existe o falló."""
+        letra = letra.upper()
+        modelo = self._modelos.get(letra)
+        if modelo is not None or letra not in self._rutas or letra in self._fallidos:
+            return modelo
+        with self._lock:
+            if letra in self._modelos:
+                return self._modelos[letra]
+            if letra in self._fallidos:
+                return None
+            ruta = self._rutas[letra]
+            try:
+                print(f"🧠 Cargando modelo {letra} desde {ruta}")
+                modelo = self._cargador(ruta)
+                if self.lote_calentamiento:
+                    decodificar(modelo, np.zeros((self.lote_calentamiento, self.latent_dim), dtype=np.float32))
+            except ImportError as e:
+                # sin TensorFlow/Keras no hay ningún decoder: no vale la pena probar los demás
+                print(f"⚠️ Decoders no disponibles: {e}")
+                self._fallidos.update(self._rutas)
+                return None
+            except Exception as e:
+                print(f"⚠️ No se pudo cargar {letra}: {e}")
+                self._fallidos.add(letra)
+                return None
+            self._modelos[letra] = modelo
+            return modelo
+
+    def aleatorio(self, rng=random):
+        """(letra, decoder) de una letra al azar; prueba otras si una falla. None si no hay ninguno."""
+        candidatas = self.letras()
+        rng.shuffle(candidatas)
+        for letra in candidatas:
+            modelo = self.obtener(letra)
+            if modelo is not None:
+                return letra, modelo
+        return None
+
+    def precargar(self, letras=None):
+        """Carga y calienta todos los decoders (o los de `letras`). Devuelve cuántos hay listos."""
+        for letra in letras or list(self._rutas):
+            self.obtener(letra)
+        print(f"✅ {len(self._modelos)} modelos cargados.")
+        return len(self._modelos)
+
+
+class PaletasPerezosas(Mapping):
+    """dict de paletas que llama a `extraer()` en la primera lectura y guarda el resultado."""
+
+    def __init__(self, extraer):
+        self._extraer = extraer
+        self._paletas = None
+        self._lock = threading.Lock()
+
+    def _datos(self):
+        if self._paletas is None:
+            with self._lock:
+                if self._paletas is None:
+                    self._paletas = dict(self._extraer())
+        return self._paletas
+
+    def cargadas(self):
+        return self._paletas is not None
+
+    def __getitem__(self, carpeta):
+        return self._datos()[carpeta]
+
+    def __iter__(self):
+        return iter(self._datos())
+
+    def __len__(self):
+        return len(self._datos())
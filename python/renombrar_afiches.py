@@ -1,33 +1,29 @@
 import os
-import unicodedata
-import csv
 import json
 import re
 
+from almacen_imagenes import AlmacenImagenes, NOMBRE_ALMACEN
+from catalogo_afiches import CatalogoAfiches, normalizar_nombre
+
 # === CONFIGURACIÓN ===
 ROOT_DIR = os.path.join(os.path.dirname(__file__), "../poster_dataset")
 ROOT_DIR = os.path.abspath(ROOT_DIR)
 
 VALID_EXT = (".png", ".jpg", ".jpeg", ".tiff")
 DRY_RUN = False  # True = simula, False = renombra realmente
-EXPORT_CSV = True
-EXPORT_JSON = True
+EXPORT_CSV = False   # los volcados se generan bajo demanda desde el catálogo
+EXPORT_JSON = False  # (o con: python3 python/catalogo_afiches.py --export ...)
+EXTRAER_METADATOS = True  # dimensiones, EXIF, colores y pHash de los afiches nuevos al catálogo
 
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "../datasets")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 CSV_PATH = os.path.join(OUTPUT_DIR, "poster_dataset_list.csv")
 JSON_PATH = os.path.join(OUTPUT_DIR, "poster_dataset_list.json")
+CATALOGO_PATH = os.path.join(OUTPUT_DIR, "catalogo_afiches.sqlite3")
+MANIFEST_NAME = "_manifiesto_renombrado.json"  # dentro de ROOT_DIR
 
 # === FUNCIONES ===
 
-def normalizar_nombre(nombre):
-    """Elimina tildes y ñ, reemplaza espacios y guiones por guiones bajos."""
-    nombre = nombre.lower()
-    nombre = unicodedata.normalize("NFD", nombre).encode("ascii", "ignore").decode("utf-8")
-    nombre = nombre.replace("ñ", "n")
-    nombre = nombre.replace(" ", "_").replace("-", "_")
-    return nombre
-
 def extraer_metadatos(nombre_carpeta):
     """Intenta inferir país y década a partir del nombre de la carpeta."""
     pais = None
@@ -56,67 +52,186 @@ def extraer_metadatos(nombre_carpeta):
 
     return pais, decada
 
+def inferir_ideologia(nombre_carpeta):
+    """Intenta inferir la corriente política a partir del nombre de la carpeta."""
+    # Corrientes más probables (puedes añadir más)
+    ideologias = {
+        "unidad_popular": "Unidad Popular",
+        "ramona_parra": "Unidad Popular",
+        "nueva_cancion": "Unidad Popular",
+        "dictadura": "Dictadura",
+        "revolucion": "Revolucionaria",
+        "propaganda": "Propaganda política",
+    }
+    for clave, valor in ideologias.items():
+        if clave in nombre_carpeta:
+            return valor
+    return None
+
+def cargar_manifiesto(ruta):
+    """Manifiesto de renombrado: contador por carpeta, nombres originales y renombres en curso."""
+    if os.path.exists(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"siguiente": {}, "originales": {}, "pendientes": []}
+
+def guardar_manifiesto(manifiesto, ruta):
+    """Escritura atómica (tmp + fsync + replace): un corte nunca deja el manifiesto a medias."""
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, ruta)
+
+def aplicar_pendientes(manifiesto, ruta_manifiesto):
+    """Fase 2 (y recuperación tras un corte): temporal → final para cada renombre planificado.
+
+    Cada entrada pasa por origen → temporal → final; según qué archivo exista se
+    retoma desde el punto en que quedó, así que es seguro re-ejecutarla.
+    """
+    for p in manifiesto["pendientes"]:
+        if os.path.exists(p["final"]):
+            continue
+        if os.path.exists(p["temporal"]):
+            os.rename(p["temporal"], p["final"])
+        elif os.path.exists(p["origen"]):
+            os.rename(p["origen"], p["final"])
+        else:
+            print(f"  ⚠️ Perdido durante el renombrado: {p['origen']}")
+    manifiesto["pendientes"] = []
+    guardar_manifiesto(manifiesto, ruta_manifiesto)
+
+def actualizar_referencias(root_dir, renombrados):
+    """Lleva los renombres a los índices que guardan rutas de afiches: las vistas del
+    almacén (<root>/_almacen) y el índice perceptual del scraping, si existen."""
+    if not renombrados:
+        return
+    renombres = {(os.path.basename(os.path.dirname(p["origen"])), os.path.basename(p["origen"])):
+                 os.path.basename(p["final"]) for p in renombrados}
+    ruta_almacen = os.path.join(root_dir, NOMBRE_ALMACEN)
+    if os.path.isdir(ruta_almacen):
+        with AlmacenImagenes(ruta_almacen) as almacen:
+            n = almacen.renombrar_vistas(renombres)
+        if n:
+            print(f"📦 {n} vistas del almacén actualizadas")
+    from indice_perceptual import IndicePerceptual, NOMBRE_INDICE  # numpy solo si se usa
+    ruta_indice = os.path.join(root_dir, NOMBRE_INDICE)
+    if os.path.exists(ruta_indice):
+        with IndicePerceptual(ruta_indice) as indice:
+            n = indice.renombrar("afiches", renombres)
+        if n:
+            print(f"🔎 {n} rutas del índice perceptual actualizadas")
+
 def renombrar_afiches(root_dir, dry_run=True):
-    """Recorre subcarpetas, renombra imágenes y genera metadatos enriquecidos."""
+    """Asigna nombres estables afiche_<carpeta>_<NNN> solo a los archivos nuevos.
+
+    Los que ya tienen nombre lo conservan; los nuevos reciben el siguiente número
+    de su carpeta (los números nunca se reutilizan). Los renombres van en dos
+    fases guiadas por MANIFEST_NAME, así que un corte a mitad se retoma en la
+    siguiente ejecución.
+    """
+    ruta_manifiesto = os.path.join(root_dir, MANIFEST_NAME)
+    manifiesto = cargar_manifiesto(ruta_manifiesto)
+    retomados = bool(manifiesto["pendientes"]) and not dry_run
+    if retomados:
+        print(f"♻️ Retomando {len(manifiesto['pendientes'])} renombres interrumpidos")
+        interrumpidos = list(manifiesto["pendientes"])
+        aplicar_pendientes(manifiesto, ruta_manifiesto)
+        actualizar_referencias(root_dir, interrumpidos)
+
     registros = []
+    plan = []
 
-    for carpeta in os.listdir(root_dir):
+    for carpeta in sorted(os.listdir(root_dir)):
         carpeta_path = os.path.join(root_dir, carpeta)
-        if not os.path.isdir(carpeta_path):
-            continue
+        if not os.path.isdir(carpeta_path) or carpeta.startswith("_"):
+            continue  # "_almacen" y similares no son carpetas de consulta
 
         carpeta_normalizada = normalizar_nombre(carpeta)
         pais, decada = extraer_metadatos(carpeta_normalizada)
-
-        print(f"\n📂 Carpeta: {carpeta_normalizada}")
-        if pais or decada:
-            print(f"   ↳ Metadatos detectados: {pais or '---'}, {decada or '---'}")
-
-        contador = 1
-        archivos = sorted(os.listdir(carpeta_path))
-
-        for archivo in archivos:
-            if archivo.lower().endswith(VALID_EXT):
-                ext = os.path.splitext(archivo)[1].lower()
-                nuevo_nombre = f"afiche_{carpeta_normalizada}_{contador:03d}{ext}"
-                origen = os.path.join(carpeta_path, archivo)
-                destino = os.path.join(carpeta_path, nuevo_nombre)
-
-                if dry_run:
-                    print(f"  🟡 Simulación: {archivo} → {nuevo_nombre}")
-                else:
-                    os.rename(origen, destino)
-                    print(f"  ✅ Renombrado: {archivo} → {nuevo_nombre}")
-
-                registros.append({
-                    "nombre_original": archivo,
-                    "nombre_final": nuevo_nombre,
-                    "carpeta": carpeta_normalizada,
-                    "pais": pais,
-                    "decada": decada,
-                    "ruta_relativa": os.path.relpath(destino, start=os.path.dirname(__file__)),
-                    "ruta_absoluta": os.path.abspath(destino)
-                })
-                contador += 1
-
-    if registros:
-        exportar_datasets(registros)
-
-    print("\n✨ Proceso completado. " +
-          ("(Simulación: sin cambios realizados)" if dry_run else "Cambios aplicados y datasets exportados."))
-
-def exportar_datasets(registros):
-    """Exporta los metadatos a CSV y JSON."""
+        ideologia = inferir_ideologia(carpeta_normalizada)
+        patron = re.compile(rf"^afiche_{re.escape(carpeta_normalizada)}_(\d{{3,}})\.[a-z]+$")
+
+        archivos = sorted(e.name for e in os.scandir(carpeta_path)
+                          if e.name.lower().endswith(VALID_EXT) and not e.name.startswith("."))
+        estables = {a: int(m.group(1)) for a in archivos if (m := patron.match(a))}
+        nuevos = [a for a in archivos if a not in estables]
+        siguiente = max([manifiesto["siguiente"].get(carpeta_normalizada, 1)] +
+                        [n + 1 for n in estables.values()])
+
+        if nuevos:
+            print(f"\n📂 Carpeta: {carpeta_normalizada} ({len(estables)} estables, {len(nuevos)} nuevos)")
+            if pais or decada:
+                print(f"   ↳ Metadatos detectados: {pais or '---'}, {decada or '---'}")
+
+        asignados = [(a, a) for a in estables]
+        for archivo in nuevos:
+            ext = os.path.splitext(archivo)[1].lower()
+            nuevo_nombre = f"afiche_{carpeta_normalizada}_{siguiente:03d}{ext}"
+            siguiente += 1
+            origen = os.path.join(carpeta_path, archivo)
+            destino = os.path.join(carpeta_path, nuevo_nombre)
+            plan.append({"origen": origen, "temporal": os.path.join(carpeta_path, f".renombrando-{nuevo_nombre}"),
+                         "final": destino, "clave": f"{carpeta_normalizada}/{nuevo_nombre}", "original": archivo})
+            print(f"  {'🟡 Simulación' if dry_run else '✅ Renombrado'}: {archivo} → {nuevo_nombre}")
+            asignados.append((archivo, nuevo_nombre))
+        manifiesto["siguiente"][carpeta_normalizada] = siguiente
+
+        for archivo, nombre_final in asignados:
+            destino = os.path.join(carpeta_path, nombre_final)
+            registros.append({
+                "nombre_original": manifiesto["originales"].get(f"{carpeta_normalizada}/{nombre_final}", archivo),
+                "nombre_final": nombre_final,
+                "carpeta": carpeta_normalizada,
+                "pais": pais,
+                "decada": decada,
+                "ideologia": ideologia,
+                "ruta_relativa": os.path.relpath(destino, start=os.path.dirname(__file__)),
+                "ruta_absoluta": os.path.abspath(destino)
+            })
+
+    if plan and not dry_run:
+        # Fase 0: el plan queda en disco antes de tocar ningún archivo
+        manifiesto["pendientes"] = plan
+        for p in plan:
+            manifiesto["originales"][p["clave"]] = p["original"]
+        guardar_manifiesto(manifiesto, ruta_manifiesto)
+        # Fase 1: origen → temporal (libera todos los nombres de origen)
+        for p in plan:
+            os.rename(p["origen"], p["temporal"])
+        # Fase 2: temporal → final
+        aplicar_pendientes(manifiesto, ruta_manifiesto)
+        actualizar_referencias(root_dir, plan)
+
+    if registros and not dry_run:
+        with CatalogoAfiches(CATALOGO_PATH) as catalogo:
+            # las filas que el scraping registró como <md5>.jpg siguen al archivo renombrado
+            for p in plan:
+                carpeta_normalizada, nombre_final = p["clave"].split("/", 1)
+                catalogo.renombrar(carpeta_normalizada, p["original"], nombre_final)
+            catalogo.upsert(registros)
+            if EXTRAER_METADATOS:
+                from metadatos_afiches import extraer_lote  # numpy solo si se usa
+                hasheados, extraidos = extraer_lote(catalogo)
+                if hasheados:
+                    print(f"\n🧮 Metadatos: {hasheados} archivos hasheados, {extraidos} analizados")
+            if plan or retomados:
+                exportar_datasets(catalogo)
+        print(f"\n🗂️ Catálogo actualizado: {CATALOGO_PATH}")
+
+    print(f"\n✨ Proceso completado: {len(plan)} archivos nuevos. " +
+          ("(Simulación: sin cambios realizados)" if dry_run else
+           "Cambios aplicados." if plan else "Nada que renombrar."))
+
+def exportar_datasets(catalogo):
+    """Exporta el catálogo a CSV y JSON (solo si EXPORT_CSV / EXPORT_JSON están activos)."""
     if EXPORT_CSV:
-        with open(CSV_PATH, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=registros[0].keys())
-            writer.writeheader()
-            writer.writerows(registros)
+        catalogo.exportar(CSV_PATH)
         print(f"\n🧾 CSV generado: {CSV_PATH}")
 
     if EXPORT_JSON:
-        with open(JSON_PATH, "w", encoding="utf-8") as f:
-            json.dump(registros, f, indent=2, ensure_ascii=False)
+        catalogo.exportar(JSON_PATH)
         print(f"📘 JSON generado: {JSON_PATH}")
 
 # === EJECUCIÓN ===
@@ -14,16 +14,31 @@ Variables de entorno recomendadas:
 Notas:
 - SerpAPI usa el parámetro 'ijn' para paginar Google Imágenes.
 - Este script deduplica por hash MD5 e impone tamaño mínimo (ancho x alto).
+- Las descargas son en streaming: los primeros KB alimentan un parser de
+  cabecera (PIL ImageFile.Parser) y la transferencia se corta apenas el
+  Content-Type o las dimensiones descalifican la imagen. El MD5 se calcula
+  mientras llegan los bytes.
+- Cada URL queda en la bitácora SQLite (--journal): las ya guardadas,
+  rechazadas o muertas no se vuelven a pedir hasta --refresh-older-than; los
+  fallos transitorios (red, HTTP 429/5xx) se reintentan pasada una hora.
+- La búsqueda es un backend (BackendSerpAPI) de pipeline_scraping: las URLs
+  de cada página pasan a los descargadores mientras se pide la siguiente, y
+  varias --query se intercalan.
 """
 
-import os, io, sys, time, hashlib, argparse
+import os, sys, time, argparse
 from pathlib import Path
-from typing import List, Dict
-from PIL import Image
+from typing import Iterator, List, Optional
 import requests
 from tqdm import tqdm
 from serpapi import GoogleSearch
 
+from bitacora import Bitacora, NOMBRE_BITACORA, parsear_duracion
+from descargador import Descargador, CONCURRENCIA, TASA_POR_HOST, stream_image
+from pipeline_scraping import (BackendBusqueda, PipelineScraping, BUSQUEDAS_SIMULTANEAS,
+                               abrir_indice_perceptual, abrir_almacen, abrir_catalogo)
+from catalogo_afiches import RUTA_CATALOGO
+
 DEFAULT_QUERY = "unidad popular afiches"
 DEFAULT_OUT = "poster_dataset_popular/google_afiches_up"
 DEFAULT_MAX = 100
@@ -31,88 +46,120 @@ DEFAULT_MIN_W = 400
 DEFAULT_MIN_H = 400
 UA = {"User-Agent": "Mozilla/5.0 (compatible; AbecedarioPopular/1.0)"}
 
-def md5_bytes(b: bytes) -> str:
-    return hashlib.md5(b).hexdigest()
-
 def ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
+class BackendSerpAPI(BackendBusqueda):
+    """Backend de búsqueda sobre Google Imágenes vía SerpAPI, con paginado por 'ijn'."""
+
+    nombre = "serpapi"
+    headers = UA
+    per_page_cap = 100  # SerpAPI suele devolver hasta ~100 imágenes por 'ijn'
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def buscar(self, query: str, max_resultados: int) -> Iterator[str]:
+        entregadas = 0
+        ijn = 0
+        while entregadas < max_resultados:
+            params = {
+                "engine": "google",
+                "q": query,
+                "tbm": "isch",
+                "ijn": str(ijn),
+                "api_key": self.api_key
+            }
+            search = GoogleSearch(params)
+            data = search.get_dict()
+            results = data.get("images_results", []) or []
+            # extrae "original" si existe; fallback a "thumbnail" si no
+            extracted = []
+            for item in results:
+                if "original" in item and item["original"]:
+                    extracted.append(item["original"])
+                elif "thumbnail" in item and item["thumbnail"]:
+                    extracted.append(item["thumbnail"])
+            if not extracted:
+                break  # no hay más páginas
+            for url in extracted[:max_resultados - entregadas]:
+                yield url
+                entregadas += 1
+            if len(results) < self.per_page_cap:  # página corta, probablemente fin
+                break
+            ijn += 1
+            time.sleep(0.8)  # cortesía para no saturar
+
 def fetch_google_images_serpapi(api_key: str, query: str, max_images: int) -> List[str]:
     """Obtiene URLs de imágenes desde Google Imágenes vía SerpAPI, con paginado por 'ijn'."""
-    urls = []
-    ijn = 0
-    per_page_cap = 100  # SerpAPI suele devolver hasta ~100 imágenes por 'ijn'
-    while len(urls) < max_images:
-        params = {
-            "engine": "google",
-            "q": query,
-            "tbm": "isch",
-            "ijn": str(ijn),
-            "api_key": api_key
-        }
-        search = GoogleSearch(params)
-        data = search.get_dict()
-        results = data.get("images_results", []) or []
-        # extrae "original" si existe; fallback a "thumbnail" si no
-        extracted = []
-        for item in results:
-            if "original" in item and item["original"]:
-                extracted.append(item["original"])
-            elif "thumbnail" in item and item["thumbnail"]:
-                extracted.append(item["thumbnail"])
-        if not extracted:
-            break  # no hay más páginas
-        urls.extend(extracted)
-        if len(results) < per_page_cap:  # página corta, probablemente fin
-            break
-        ijn += 1
-        time.sleep(0.8)  # cortesía para no saturar
-    return urls[:max_images]
-
-def image_min_dims_ok(img_bytes: bytes, min_w: int, min_h: int) -> bool:
-    """Valida que la imagen cumpla tamaño mínimo."""
-    try:
-        with Image.open(io.BytesIO(img_bytes)) as im:
-            w, h = im.size
-            return w >= min_w and h >= min_h
-    except Exception:
-        return False
-
-def download_images(urls: List[str], out_dir: Path, min_w: int, min_h: int) -> int:
-    """Descarga URLs, deduplica por MD5 y aplica filtro de tamaño mínimo."""
+    return list(BackendSerpAPI(api_key).buscar(query, max_images))
+
+def download_images(urls: List[str], out_dir: Path, min_w: int, min_h: int,
+                    bitacora: Optional[Bitacora] = None) -> int:
+    """Descarga URLs en streaming, deduplica por MD5 y aplica filtro de tamaño mínimo."""
     ensure_dir(out_dir)
     saved = 0
     seen_hashes = set(h.stem for h in out_dir.glob("*.jpg"))  # hashes ya guardados
-
-    for url in tqdm(urls, desc="Descargando", unit="img"):
-        try:
-            r = requests.get(url, headers=UA, timeout=12)
-            if not r.ok or not r.content:
+    if bitacora is not None:
+        pendientes = [u for u in urls if not bitacora.debe_saltar(u)]
+        if len(pendientes) < len(urls):
+            print(f"Omitidas por bitácora: {len(urls) - len(pendientes)}")
+        urls = pendientes
+
+    def registrar(url, estado, **kw):
+        if bitacora is not None:
+            bitacora.registrar(url, estado, **kw)
+
+    with requests.Session() as session:
+        for url in tqdm(urls, desc="Descargando", unit="img"):
+            try:
+                res = stream_image(session, url, out_dir, min_w, min_h, headers=UA)
+            except Exception:
+                registrar(url, "error", motivo="sin_respuesta")
                 continue
-            if not image_min_dims_ok(r.content, min_w, min_h):
+            if not res["ok"]:
+                registrar(url, "rechazada", http_status=res["status"], bytes=res["bytes"],
+                          motivo=res["motivo"])
                 continue
-            h = md5_bytes(r.content)
+            h = res["hash"]
+            path = out_dir / f"{h}.jpg"
             if h in seen_hashes:
+                res["tmp"].unlink()
+                registrar(url, "ok", hash=h, http_status=res["status"], bytes=res["bytes"],
+                          motivo="duplicada", ruta=str(path))
                 continue
-            path = out_dir / f"{h}.jpg"
-            with open(path, "wb") as f:
-                f.write(r.content)
+            os.replace(res["tmp"], path)
             seen_hashes.add(h)
             saved += 1
-        except Exception:
-            continue
-        time.sleep(0.15)  # ritmo razonable
+            registrar(url, "ok", hash=h, http_status=res["status"], bytes=res["bytes"], ruta=str(path))
+            time.sleep(0.15)  # ritmo razonable
     return saved
 
 def main():
     parser = argparse.ArgumentParser(description="Scraper Google Imágenes (SerpAPI) — Abecedario Popular")
     parser.add_argument("--api-key", type=str, default=os.getenv("SERPAPI_KEY", ""),
                         help="API key de SerpAPI (o variable SERPAPI_KEY).")
-    parser.add_argument("--query", type=str, default=DEFAULT_QUERY, help="Consulta de búsqueda.")
+    parser.add_argument("--query", type=str, nargs="+", default=[DEFAULT_QUERY],
+                        help="Consulta(s) de búsqueda; varias se intercalan.")
     parser.add_argument("--out-dir", type=str, default=DEFAULT_OUT, help="Carpeta de salida.")
     parser.add_argument("--max", type=int, default=DEFAULT_MAX, help="Cantidad máxima de imágenes.")
     parser.add_argument("--min-width", type=int, default=DEFAULT_MIN_W, help="Ancho mínimo en px.")
     parser.add_argument("--min-height", type=int, default=DEFAULT_MIN_H, help="Alto mínimo en px.")
+    parser.add_argument("--journal", type=str, default=None,
+                        help=f"Bitácora SQLite (default: <out-dir>/../{NOMBRE_BITACORA}).")
+    parser.add_argument("--refresh-older-than", type=parsear_duracion, default=None,
+                        help="Re-descarga entradas más antiguas que esto (p.ej. 12h, 7d). Por defecto no expiran.")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCIA, help="Descargas simultáneas.")
+    parser.add_argument("--rate-per-host", type=float, default=TASA_POR_HOST,
+                        help="Solicitudes por segundo por host.")
+    parser.add_argument("--parallel-queries", type=int, default=BUSQUEDAS_SIMULTANEAS,
+                        help="Consultas intercaladas a la vez.")
+    parser.add_argument("--near-dup-radius", type=int, default=None,
+                        help="Descarta casi-duplicados perceptuales (Hamming ≤ radio, p.ej. 6).")
+    parser.add_argument("--catalog", type=str, default=RUTA_CATALOGO,
+                        help="Catálogo SQLite de afiches a actualizar, '' para omitir (default: %(default)s).")
+    parser.add_argument("--store", action=argparse.BooleanOptionalAction, default=True,
+                        help="Almacén por contenido (_almacen) con carpetas como vistas (default: %(default)s).")
     args = parser.parse_args()
 
     if not args.api_key:
@@ -122,11 +169,31 @@ def main():
     out_dir = Path(args.out_dir)
     ensure_dir(out_dir)
 
-    print(f"Buscando en Google Imágenes: '{args.query}' (máx {args.max})")
-    urls = fetch_google_images_serpapi(api_key=args.api_key, query=args.query, max_images=args.max)
-    print(f"URLs obtenidas: {len(urls)}")
-
-    saved = download_images(urls, out_dir, args.min_width, args.min_height)
+    print(f"Buscando en Google Imágenes: {', '.join(repr(q) for q in args.query)} (máx {args.max} c/u)")
+    journal = Path(args.journal) if args.journal else out_dir.parent / NOMBRE_BITACORA
+    with Bitacora(journal, refrescar_despues=args.refresh_older_than) as bitacora, \
+            Descargador(concurrencia=args.concurrency, tasa_por_host=args.rate_per_host,
+                        headers=UA) as descargador:
+        indice = abrir_indice_perceptual(args.near_dup_radius, out_dir)
+        almacen = abrir_almacen(args.store, out_dir)
+        catalogo = abrir_catalogo(args.catalog)
+        try:
+            pipeline = PipelineScraping(BackendSerpAPI(args.api_key), out_dir, descargador,
+                                        bitacora=bitacora, min_w=args.min_width, min_h=args.min_height,
+                                        carpeta_por_consulta=False,
+                                        busquedas_simultaneas=args.parallel_queries,
+                                        indice_perceptual=indice,
+                                        radio_casi_duplicado=args.near_dup_radius or 0,
+                                        almacen=almacen, catalogo=catalogo)
+            stats = pipeline.ejecutar(args.query, args.max)
+        finally:
+            if indice is not None:
+                indice.cerrar()
+            if almacen is not None:
+                almacen.cerrar()
+            if catalogo is not None:
+                catalogo.cerrar()
+    saved = sum(s["guardadas"] for s in stats.values())
     print(f"Descargas guardadas: {saved} en {out_dir}")
 
 if __name__ == "__main__":
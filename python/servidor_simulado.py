@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+servidor_simulado.py
+Buscador de imágenes + CDN de imágenes falsos, locales y sin red externa.
+
+Sirve un corpus configurable (sintético o de una carpeta) y permite inyectar:
+  - latencia por solicitud (rango en ms)
+  - respuestas 429 con Retry-After
+  - cuerpos truncados (Content-Length mayor que lo enviado)
+  - duplicados (misma imagen bajo distinta URL)
+  - imágenes pequeñas (para probar el filtro de dimensiones)
+
+Rutas:
+  /search?q=<consulta>&page=<n>&per_page=<k>  → {"images": [url, ...], "next": bool}
+  /img/<id>.<ext>[?v=<alias>]                  → bytes de la imagen
+
+El buscador es determinista por consulta (misma consulta → mismas URLs).
+BackendSimulado lo conecta a pipeline_scraping como un backend más.
+
+Uso:
+  python3 python/servidor_simulado.py --port 8765 --images 400 --latency 20-150 --p429 0.05
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from PIL import Image
+
+from pipeline_scraping import BackendBusqueda
+
+# === CONFIGURACIÓN ===
+PUERTO = 8765
+IMAGENES = 300                # tamaño del corpus sintético
+RESULTADOS_POR_CONSULTA = 200
+POR_PAGINA = 50
+LATENCIA_MS = (5, 60)
+P_429 = 0.03
+P_TRUNCADA = 0.02
+P_DUPLICADA = 0.10
+P_PEQUENA = 0.30              # fracción del corpus sintético bajo 400 × 400
+RETRY_AFTER = 0.2             # segundos sugeridos en cada 429
+SEMILLA = 1234
+EXTENSIONES = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+
+
+# === CORPUS ===
+def generar_corpus(n=IMAGENES, p_pequena=P_PEQUENA, semilla=SEMILLA):
+    """Corpus sintético de afiches JPEG/PNG de tamaños variados (bytes, mime)."""
+    rng = random.Random(semilla)
+    corpus = []
+    for i in range(n):
+        if rng.random() < p_pequena:
+            w, h = rng.randint(80, 380), rng.randint(80, 380)
+        else:
+            w, h = rng.randint(420, 1200), rng.randint(420, 1600)
+        color = tuple(rng.randint(0, 255) for _ in range(3))
+        img = Image.new("RGB", (w, h), color)
+        # unas franjas para que el contenido no sea trivialmente comprimible
+        for y in range(0, h, rng.randint(8, 40)):
+            img.paste(tuple(rng.randint(0, 255) for _ in range(3)), (0, y, w, min(h, y + 4)))
+        buf = io.BytesIO()
+        if i % 3 == 0:
+            img.save(buf, "PNG")
+            corpus.append((buf.getvalue(), "image/png", ".png"))
+        else:
+            img.save(buf, "JPEG", quality=85)
+            corpus.append((buf.getvalue(), "image/jpeg", ".jpg"))
+    return corpus
+
+
+def cargar_corpus(carpeta, limite=None):
+    """Corpus desde una carpeta real de imágenes."""
+    mimes = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg",
+             ".webp": "image/webp", ".gif": "image/gif"}
+    corpus = []
+    for p in sorted(Path(carpeta).rglob("*")):
+        if p.suffix.lower() in EXTENSIONES:
+            corpus.append((p.read_bytes(), mimes[p.suffix.lower()], p.suffix.lower()))
+            if limite and len(corpus) >= limite:
+                break
+    return corpus
+
+
+# === SERVIDOR ===
+class _HTTPServerSilencioso(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # cortes del cliente (rechazos tempranos) son esperables
+
+
+class ServidorSimulado:
+    """Servidor HTTP en un hilo propio; usable como context manager."""
+
+    def __init__(self, corpus, puerto=0, latencia_ms=LATENCIA_MS, p_429=P_429,
+                 p_truncada=P_TRUNCADA, p_duplicada=P_DUPLICADA,
+                 resultados_por_consulta=RESULTADOS_POR_CONSULTA, semilla=SEMILLA):
+        self.corpus = corpus
+        self.latencia_ms = latencia_ms
+        self.p_429 = p_429
+        self.p_truncada = p_truncada
+        self.p_duplicada = p_duplicada
+        self.resultados_por_consulta = resultados_por_consulta
+        self.semilla = semilla
+        self._rng = random.Random(semilla)
+        self._rng_lock = threading.Lock()
+        self.contadores = {"busquedas": 0, "imagenes": 0, "429": 0, "truncadas": 0, "bytes": 0}
+        self._httpd = _HTTPServerSilencioso(("127.0.0.1", puerto), self._handler())
+        self._hilo = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def contar(self, clave, n=1):
+        with self._rng_lock:
+            self.contadores[clave] += n
+
+    def azar(self):
+        with self._rng_lock:
+            return self._rng.random()
+
+    def esperar(self):
+        lo, hi = self.latencia_ms
+        with self._rng_lock:
+            ms = self._rng.uniform(lo, hi)
+        time.sleep(ms / 1000.0)
+
+    def resultados(self, query):
+        """Lista determinista de URLs relativas para una consulta."""
+        semilla = int(hashlib.md5(f"{self.semilla}:{query}".encode("utf-8")).hexdigest()[:8], 16)
+        rng = random.Random(semilla)
+        ids = list(range(len(self.corpus)))
+        rng.shuffle(ids)
+        urls, usados = [], []
+        for k in range(self.resultados_por_consulta):
+            if usados and rng.random() < self.p_duplicada:
+                i = rng.choice(usados)
+                urls.append(f"/img/{i}{self.corpus[i][2]}?v={k}")
+            else:
+                i = ids[k % len(ids)]
+                usados.append(i)
+                urls.append(f"/img/{i}{self.corpus[i][2]}")
+        return urls
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, datos):
+                cuerpo = json.dumps(datos).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def do_GET(self):
+                partes = urlsplit(self.path)
+                qs = parse_qs(partes.query)
+                servidor.esperar()
+                if partes.path == "/search":
+                    servidor.contar("busquedas")
+                    query = qs.get("q", [""])[0]
+                    page = int(qs.get("page", ["0"])[0])
+                    per_page = int(qs.get("per_page", [str(POR_PAGINA)])[0])
+                    todas = servidor.resultados(query)
+                    pagina = todas[page * per_page:(page + 1) * per_page]
+                    self._json({"images": [servidor.url + u for u in pagina],
+                                "next": (page + 1) * per_page < len(todas)})
+                    return
+                if partes.path.startswith("/img/"):
+                    self._imagen(partes.path[len("/img/"):])
+                    return
+                self.send_error(404)
+
+            def _imagen(self, nombre):
+                try:
+                    i = int(nombre.split(".")[0])
+                    datos, mime, _ = servidor.corpus[i]
+                except (ValueError, IndexError):
+                    self.send_error(404)
+                    return
+                if servidor.azar() < servidor.p_429:
+                    servidor.contar("429")
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(RETRY_AFTER))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                servidor.contar("imagenes")
+                truncada = servidor.azar() < servidor.p_truncada
+                self.send_response(200)
+                self.send_header("Content-Type", mime)
+                self.send_header("Content-Length", str(len(datos)))
+                if truncada:
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                enviar = datos[:len(datos) // 2] if truncada else datos
+                try:
+                    self.wfile.write(enviar)
+                    servidor.contar("bytes", len(enviar))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # el cliente cortó la transferencia (rechazo temprano)
+                if truncada:
+                    servidor.contar("truncadas")
+                    self.close_connection = True
+
+        return Handler
+
+
+# === BACKEND PARA EL PIPELINE ===
+class BackendSimulado(BackendBusqueda):
+    """Backend de búsqueda contra el servidor simulado (paginado)."""
+
+    nombre = "simulado"
+    headers = {"User-Agent": "Mozilla/5.0 (compatible; BenchmarkScraper/1.0)"}
+
+    def __init__(self, base_url, por_pagina=POR_PAGINA):
+        self.base_url = base_url.rstrip("/")
+        self.por_pagina = por_pagina
+
+    def buscar(self, query, max_resultados):
+        entregadas, page = 0, 0
+        with requests.Session() as s:
+            while entregadas < max_resultados:
+                r = s.get(f"{self.base_url}/search",
+                          params={"q": query, "page": page, "per_page": self.por_pagina}, timeout=12)
+                r.raise_for_status()
+                datos = r.json()
+                for url in datos["images"][:max_resultados - entregadas]:
+                    yield url
+                    entregadas += 1
+                if not datos["next"] or not datos["images"]:
+                    break
+                page += 1
+
+
+def parsear_rango(texto):
+    """'20-150' → (20.0, 150.0); '50' → (50.0, 50.0)."""
+    partes = [float(x) for x in str(texto).split("-")]
+    return (partes[0], partes[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Buscador + CDN de imágenes simulados para pruebas offline.")
+    parser.add_argument("--port", type=int, default=PUERTO)
+    parser.add_argument("--corpus", type=str, default=None, help="Carpeta de imágenes reales (opcional).")
+    parser.add_argument("--images", type=int, default=IMAGENES, help="Tamaño del corpus sintético.")
+    parser.add_argument("--latency", type=parsear_rango, default=LATENCIA_MS, help="Latencia en ms, p.ej. 20-150.")
+    parser.add_argument("--p429", type=float, default=P_429)
+    parser.add_argument("--ptrunc", type=float, default=P_TRUNCADA)
+    parser.add_argument("--pdup", type=float, default=P_DUPLICADA)
+    parser.add_argument("--results", type=int, default=RESULTADOS_POR_CONSULTA, help="Resultados por consulta.")
+    args = parser.parse_args()
+
+    corpus = cargar_corpus(args.corpus, args.images) if args.corpus else generar_corpus(args.images)
+    servidor = ServidorSimulado(corpus, puerto=args.port, latencia_ms=args.latency, p_429=args.p429,
+                                p_truncada=args.ptrunc, p_duplicada=args.pdup,
+                                resultados_por_consulta=args.results)
+    print(f"🧪 Servidor simulado con {len(corpus)} imágenes en {servidor.url}")
+    print(f"   ↳ prueba: {servidor.url}/search?q=afiches&page=0")
+    try:
+        servidor._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
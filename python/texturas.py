@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+texturas.py
+Texturas anexas (ruido, cuadrícula, trama, papel) en NumPy, con caché de tiles.
+
+- textura() genera una textura completa con una sola operación por tipo, con
+  la misma distribución por píxel que los bucles originales de
+  generar_textura_anexa:
+    ruido       N(128, 50) truncado a entero y recortado a 0..255
+    cuadricula  fondo 255; filas y columnas múltiplos de `paso` (6..18) con
+                valores uniformes 100..180
+    trama       180 donde (x + y) % m == 0, con m uniforme 6..12 por píxel; si no 255
+    papel       240 + N(0, 10) truncado y recortado
+- CacheTexturas pre-renderiza VARIANTES tiles de LADO_TILE² por tipo (y por
+  paso, en la cuadrícula) y entrega recortes con desplazamiento al azar. En la
+  cuadrícula el desplazamiento es múltiplo del paso: la primera fila y la
+  primera columna siguen siendo línea, como en el original. La trama no se
+  cachea: su probabilidad depende de x + y desde la esquina (la diagonal 0
+  siempre es 180), así que un recorte desplazado cambiaría el patrón; se
+  genera directo, que ya es una sola operación.
+
+Uso:
+  from texturas import CacheTexturas
+  TEXTURAS = CacheTexturas()
+  tex = TEXTURAS.obtener((w, h))                  # Image L, tipo al azar
+"""
+
+import random
+
+import numpy as np
+from PIL import Image
+
+# === CONFIGURACIÓN ===
+TIPOS = ("ruido", "cuadricula", "trama", "papel")
+PASOS_CUADRICULA = (6, 18)
+LADO_TILE = 640               # cubre un módulo de 64 × 5.5 rotado 45° con expand
+VARIANTES = 4                 # tiles distintos por tipo
+
+
+def textura(tipo, tamaño, rng=None, paso=None):
+    """uint8 alto×ancho de la textura pedida."""
+    rng = rng or np.random.default_rng()
+    w, h = tamaño
+    if tipo == "ruido":
+        return np.clip(np.trunc(rng.normal(128, 50, (h, w))), 0, 255).astype(np.uint8)
+    if tipo == "papel":
+        return np.clip(240 + np.trunc(rng.normal(0, 10, (h, w))), 0, 255).astype(np.uint8)
+    if tipo == "trama":
+        diag = np.add.outer(np.arange(h), np.arange(w))
+        m = rng.integers(6, 13, (h, w))
+        return np.where(diag % m == 0, 180, 255).astype(np.uint8)
+    if tipo == "cuadricula":
+        paso = paso or int(rng.integers(PASOS_CUADRICULA[0], PASOS_CUADRICULA[1] + 1))
+        tex = np.full((h, w), 255, dtype=np.uint8)
+        tex[::paso, :] = rng.integers(100, 181, tex[::paso, :].shape)
+        tex[:, ::paso] = rng.integers(100, 181, tex[:, ::paso].shape)
+        return tex
+    raise ValueError(f"Tipo de textura desconocido: {tipo}")
+
+
+class CacheTexturas:
+    """Tiles de textura pre-renderizados (al primer uso) que se recortan en vez de regenerarse."""
+
+    def __init__(self, lado=LADO_TILE, variantes=VARIANTES, semilla=None):
+        self.lado = lado
+        self.variantes = variantes
+        self._rng = np.random.default_rng(semilla)
+        self._tiles = {}              # (tipo, paso) → [uint8 lado×lado]
+
+    def _tiles_de(self, tipo, paso):
+        clave = (tipo, paso)
+        tiles = self._tiles.get(clave)
+        if tiles is None:
+            tiles = [textura(tipo, (self.lado, self.lado), self._rng, paso) for _ in range(self.variantes)]
+            self._tiles[clave] = tiles
+        return tiles
+
+    def obtener_array(self, tamaño, tipo=None, rng=random):
+        """uint8 alto×ancho recortado de un tile; se genera directo si no cabe en el tile."""
+        tipo = tipo or rng.choice(TIPOS)
+        w, h = tamaño
+        paso = rng.randint(*PASOS_CUADRICULA) if tipo == "cuadricula" else None
+        if tipo == "trama" or w > self.lado or h > self.lado:
+            return textura(tipo, tamaño, self._rng, paso)
+        tile = self._tiles_de(tipo, paso)[rng.randrange(self.variantes)]
+        unidad = paso or 1
+        x0 = unidad * rng.randint(0, (self.lado - w) // unidad)
+        y0 = unidad * rng.randint(0, (self.lado - h) // unidad)
+        return tile[y0:y0 + h, x0:x0 + w]
+
+    def obtener(self, tamaño, tipo=None, rng=random):
+        """Image L de la textura (una copia del recorte del tile)."""
+        return Image.fromarray(np.ascontiguousarray(self.obtener_array(tamaño, tipo, rng)), mode="L")